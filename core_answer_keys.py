@@ -0,0 +1,102 @@
+# medicalpromax_backend/apps/core/answer_keys.py
+"""
+Answer-key cache for grading
+Maps question_id to its option ids, correct option ids and topic, so checking
+an answer does not need a round trip to the database. Lookups go through a
+bounded in-process LRU, then the shared cache, then one query for all misses.
+Local entries are keyed by a shared generation that every invalidation bumps,
+so an answer-key fix reaches all workers on their next lookup.
+"""
+
+from django.core.cache import cache
+
+from .cache import LocalLRUCache, bump_generation, get_generation
+from .models import QuestionOption
+
+
+SHARED_TIMEOUT = 60 * 60
+LOCAL_TIMEOUT = 60
+GENERATION_NAMESPACE = 'answer-keys'
+
+_local = LocalLRUCache(max_entries=50000, timeout=LOCAL_TIMEOUT)
+
+
+def _shared_key(question_id):
+    return f'answer-key:v2:{question_id}'
+
+
+def get_answer_keys(question_ids):
+    """Return {question_id: {'options': frozenset, 'correct': frozenset, 'topic': topic_id}}"""
+    keys = {}
+    missing = []
+    generation = get_generation(GENERATION_NAMESPACE)
+    
+    for question_id in set(question_ids):
+        entry = _local.get((generation, question_id))
+        if entry is None:
+            missing.append(question_id)
+        else:
+            keys[question_id] = entry
+    
+    if missing:
+        shared = cache.get_many([_shared_key(question_id) for question_id in missing])
+        for question_id in missing:
+            entry = shared.get(_shared_key(question_id))
+            if entry is not None:
+                keys[question_id] = _local_entry(generation, question_id, entry)
+        missing = [question_id for question_id in missing if question_id not in keys]
+    
+    if missing:
+        loaded = {question_id: {'options': [], 'correct': [], 'topic': None} for question_id in missing}
+        rows = QuestionOption.objects.filter(question_id__in=missing).values_list(
+            'question_id', 'id', 'is_correct', 'question__topic_id'
+        )
+        for question_id, option_id, is_correct, topic_id in rows:
+            loaded[question_id]['topic'] = topic_id
+            loaded[question_id]['options'].append(option_id)
+            if is_correct:
+                loaded[question_id]['correct'].append(option_id)
+        
+        cache.set_many(
+            {_shared_key(question_id): entry for question_id, entry in loaded.items()},
+            SHARED_TIMEOUT
+        )
+        for question_id, entry in loaded.items():
+            keys[question_id] = _local_entry(generation, question_id, entry)
+    
+    return keys
+
+
+def _local_entry(generation, question_id, entry):
+    local_entry = {
+        'options': frozenset(entry['options']),
+        'correct': frozenset(entry['correct']),
+        'topic': entry['topic'],
+    }
+    _local.set((generation, question_id), local_entry)
+    return local_entry
+
+
+def get_answer_key(question_id):
+    return get_answer_keys([question_id])[question_id]
+
+
+def is_correct_option(question_id, option_id):
+    """
+    Grade one selected option
+    Returns True/False, or None when the option does not belong to the question
+    """
+    entry = get_answer_key(question_id)
+    if option_id not in entry['options']:
+        return None
+    return option_id in entry['correct']
+
+
+def correct_option_ids(question_id):
+    return sorted(get_answer_key(question_id)['correct'])
+
+
+def invalidate_answer_key(question_id):
+    cache.delete(_shared_key(question_id))
+    # Orphans the local entries of every worker, not just this one
+    bump_generation(GENERATION_NAMESPACE)
@@ -0,0 +1,14 @@
+# medicalpromax_backend/apps/core/apps.py
+"""
+App configuration for core
+"""
+
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    name = 'apps.core'
+    verbose_name = 'محتوای آموزشی'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,219 @@
+# medicalpromax_backend/apps/core/cache.py
+"""
+Caching helpers shared by MedicalProMax apps
+Generation counters for namespace invalidation, a bounded in-process LRU and
+a tiered response cache implementing the TTL policy of the spec (section 6.1)
+"""
+
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from rest_framework import status
+from rest_framework.response import Response
+
+
+GENERATION_TIMEOUT = None
+GENERATION_LOCAL_TIMEOUT = 5
+
+# Seconds per resource; RESPONSE_CACHE_TTLS in settings overrides single entries
+DEFAULT_TTLS = {
+    'specialties': 60 * 60,
+    'exam_levels': 60 * 60,
+    'subspecialties': 60 * 60,
+    'courses': 60 * 60,
+    'chapters': 60 * 60,
+    'topics': 60 * 60,
+    'exams': 60 * 60,
+    'questions': 30 * 60,
+    'user_progress': 5 * 60,
+}
+
+
+def _generation_key(namespace):
+    return f'generation:{namespace}'
+
+
+def get_generation(namespace):
+    """
+    Current generation of a cache namespace
+    Embed it in cache keys; bumping it orphans every key of the namespace at once
+    """
+    key = _generation_key(namespace)
+    generation = cache.get(key)
+    if generation is None:
+        # A fresh timestamp never collides with a generation that was evicted
+        cache.add(key, time.time_ns(), GENERATION_TIMEOUT)
+        generation = cache.get(key)
+    return generation
+
+
+def get_generations(namespaces):
+    """Generations of several namespaces with one cache round trip"""
+    keys = {_generation_key(namespace): namespace for namespace in namespaces}
+    found = cache.get_many(list(keys))
+    return {
+        namespace: found[key] if key in found else get_generation(namespace)
+        for key, namespace in keys.items()
+    }
+
+
+def bump_generation(namespace):
+    key = _generation_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        generation = time.time_ns()
+        cache.set(key, generation, GENERATION_TIMEOUT)
+        return generation
+
+
+class LocalLRUCache:
+    """
+    Bounded in-process LRU cache with per-entry expiry
+    Each gunicorn worker keeps its own copy, so entries must be safe to serve
+    slightly stale for up to `timeout` seconds
+    """
+    
+    def __init__(self, max_entries=10000, timeout=60):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key, value, timeout=None):
+        expires_at = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+    
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    """
+    Local-memory tier in front of a shared Django cache
+    The shared tier is the file-based cache on low-memory VPSes; hot keys are
+    served from process memory for at most `local_timeout` seconds
+    """
+    
+    def __init__(self, alias='default', local_max_entries=2000, local_timeout=30):
+        self.alias = alias
+        self.local_timeout = local_timeout
+        self.local = LocalLRUCache(max_entries=local_max_entries, timeout=local_timeout)
+    
+    @property
+    def shared(self):
+        return caches[self.alias]
+    
+    def get(self, key, default=None):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        
+        value = self.shared.get(key)
+        if value is None:
+            return default
+        
+        self.local.set(key, value)
+        return value
+    
+    def set(self, key, value, timeout):
+        self.shared.set(key, value, timeout)
+        self.local.set(key, value, min(timeout, self.local_timeout))
+    
+    def generation(self, namespace):
+        """Generation of a namespace, re-read from the shared cache every few seconds"""
+        key = ('generation', namespace)
+        generation = self.local.get(key)
+        if generation is None:
+            generation = get_generation(namespace)
+            self.local.set(key, generation, GENERATION_LOCAL_TIMEOUT)
+        return generation
+    
+    def bump(self, namespace):
+        generation = bump_generation(namespace)
+        self.local.set(('generation', namespace), generation, GENERATION_LOCAL_TIMEOUT)
+        return generation
+
+
+response_cache = TieredCache(alias=getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default'))
+
+
+def resource_ttl(resource):
+    return getattr(settings, 'RESPONSE_CACHE_TTLS', {}).get(resource, DEFAULT_TTLS[resource])
+
+
+def invalidate_resource(resource, user_id=None):
+    """Drop every cached response of a resource, or only those of one user"""
+    namespace = resource if user_id is None else f'{resource}:user:{user_id}'
+    return response_cache.bump(namespace)
+
+
+class CachedResponseMixin:
+    """
+    Declarative response caching for GET views
+    
+    class SpecialtyListView(CachedResponseMixin, generics.ListAPIView):
+        cache_resource = 'specialties'
+    
+    Keys include the resource generation, the full path with query params and,
+    with cache_vary_on_user, the requesting user. Only 200 responses are stored.
+    """
+    cache_resource = None
+    cache_vary_on_user = False
+    
+    def get_cache_key(self, request):
+        namespace = self.cache_resource
+        user = 'anon'
+        if self.cache_vary_on_user and request.user.is_authenticated:
+            user = request.user.pk
+            namespace = f'{self.cache_resource}:user:{user}'
+        
+        generation = response_cache.generation(self.cache_resource)
+        if namespace != self.cache_resource:
+            generation = f'{generation}.{response_cache.generation(namespace)}'
+        
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        return f'resp:{self.cache_resource}:{generation}:{user}:{path}'
+    
+    def get(self, request, *args, **kwargs):
+        cache_key = self.get_cache_key(request)
+        
+        data = response_cache.get(cache_key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response_cache.set(cache_key, response.data, resource_ttl(self.cache_resource))
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,24 @@
+# medicalpromax_backend/apps/core/management/commands/backfill_question_tags.py
+"""
+Fill the normalized tag tables from Question.tags
+Usage: python manage.py backfill_question_tags [--chunk-size 2000]
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.core.cache import invalidate_resource
+from apps.core.question_index import invalidate_question_index
+from apps.core.tags import BACKFILL_CHUNK_SIZE, backfill_question_tags
+
+
+class Command(BaseCommand):
+    help = 'Sync Tag and QuestionTag rows with the tags JSON of every question'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=BACKFILL_CHUNK_SIZE, help='Questions per batch')
+    
+    def handle(self, *args, **options):
+        count = backfill_question_tags(chunk_size=options['chunk_size'])
+        invalidate_resource('questions')
+        invalidate_question_index()
+        self.stdout.write(self.style.SUCCESS(f'Synced tags of {count} questions'))
@@ -0,0 +1,80 @@
+# medicalpromax_backend/apps/core/management/commands/benchmark_serializers.py
+"""
+Parity check and microbenchmark of the values() fast path against the DRF serializers
+Usage: python manage.py benchmark_serializers [--limit 500] [--repeat 5]
+Exits with an error if any rendered row differs
+"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.core.fast_serializers import assemble_courses, assemble_questions, course_values, question_values
+from apps.core.models import Course, Question
+from apps.core.serializers import CourseSerializer, QuestionSerializer
+
+
+def _render(data):
+    return json.dumps(data, ensure_ascii=False).encode()
+
+
+class Command(BaseCommand):
+    help = 'Compare fast-path output with the DRF serializers byte for byte and time both'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help='Rows per endpoint')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per implementation')
+    
+    def handle(self, *args, **options):
+        limit = options['limit']
+        cases = [
+            (
+                'courses',
+                lambda: CourseSerializer(
+                    Course.objects.filter(is_active=True).select_related('specialty', 'exam_level', 'subspecialty')[:limit],
+                    many=True
+                ).data,
+                lambda: assemble_courses(course_values(Course.objects.filter(is_active=True))[:limit]),
+            ),
+            (
+                'questions',
+                lambda: QuestionSerializer(
+                    Question.objects.filter(is_active=True).prefetch_related('options', 'explanation')[:limit],
+                    many=True
+                ).data,
+                lambda: assemble_questions(question_values(Question.objects.filter(is_active=True))[:limit]),
+            ),
+        ]
+        
+        mismatches = 0
+        for name, serializer, fast in cases:
+            expected, fast_rows = serializer(), fast()
+            for expected_row, fast_row in zip(expected, fast_rows):
+                if _render(expected_row) != _render(fast_row):
+                    mismatches += 1
+                    self.stderr.write(f"{name}: row {expected_row.get('id')} differs")
+            if len(expected) != len(fast_rows):
+                mismatches += 1
+                self.stderr.write(f'{name}: {len(expected)} serializer rows, {len(fast_rows)} fast rows')
+            
+            timings = {}
+            for label, render in (('serializer', serializer), ('fast', fast)):
+                with CaptureQueriesContext(connection) as queries:
+                    render()
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    _render(render())
+                timings[label] = ((time.perf_counter() - started) * 1000 / options['repeat'], len(queries))
+            
+            self.stdout.write(
+                f"{name}: {len(expected)} rows | serializer {timings['serializer'][0]:.1f} ms, "
+                f"{timings['serializer'][1]} queries | fast {timings['fast'][0]:.1f} ms, "
+                f"{timings['fast'][1]} queries | {timings['serializer'][0] / max(timings['fast'][0], 0.001):.1f}x"
+            )
+        
+        if mismatches:
+            raise CommandError(f'{mismatches} mismatches between fast path and serializers')
+        self.stdout.write(self.style.SUCCESS('Fast path output is identical'))
@@ -0,0 +1,59 @@
+# medicalpromax_backend/apps/core/management/commands/import_questions.py
+"""
+Bulk import questions from CSV, JSON / JSON Lines or XLSX
+Usage: python manage.py import_questions bank.csv [--format csv] [--chunk-size 1000] [--dry-run]
+       python manage.py import_questions --backfill-hashes
+See apps.core.importer for the row columns
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.importer import (
+    IMPORT_CHUNK_SIZE, ImportFormatError, backfill_content_hashes, detect_format, import_questions, read_rows
+)
+
+
+class Command(BaseCommand):
+    help = 'Stream a question bank file into the database, skipping duplicate questions'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='File to import')
+        parser.add_argument('--format', choices=['csv', 'json', 'jsonl', 'xlsx'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Rows per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and count duplicates without writing')
+        parser.add_argument('--backfill-hashes', action='store_true', help='Hash existing questions so they are deduplicated')
+    
+    def handle(self, *args, **options):
+        if options['backfill_hashes']:
+            count = backfill_content_hashes(chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'Hashed {count} questions'))
+            if not options['path']:
+                return
+        if not options['path']:
+            raise CommandError('A file path is required')
+        
+        fmt = options['format'] or detect_format(options['path'])
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = import_questions(
+                    read_rows(stream, fmt),
+                    chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run'],
+                    log=self.stdout.write,
+                )
+        except (OSError, ImportFormatError) as e:
+            raise CommandError(str(e))
+        
+        for error in report.errors:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        if report.error_count > len(report.errors):
+            self.stderr.write(f'... {report.error_count - len(report.errors)} more errors')
+        
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}{report.created} created, {report.duplicates} duplicates, '
+            f'{report.error_count} errors in {time.perf_counter() - started:.1f}s'
+        ))
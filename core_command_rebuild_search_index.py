@@ -0,0 +1,20 @@
+# medicalpromax_backend/apps/core/management/commands/rebuild_search_index.py
+"""
+Rebuild the question full-text search index
+Usage: python manage.py rebuild_search_index [--chunk-size 2000]
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.core.search import REBUILD_CHUNK_SIZE, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the SQLite FTS5 search index over questions, options and explanations'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=REBUILD_CHUNK_SIZE, help='Questions per batch')
+    
+    def handle(self, *args, **options):
+        count = rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} questions'))
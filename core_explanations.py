@@ -0,0 +1,81 @@
+# medicalpromax_backend/apps/core/explanations.py
+"""
+Explanation cache
+Maps question_id to its explanation fields. Lookups go through a bounded
+in-process LRU, then the shared cache, then one query for all misses, so
+practice answers and result pages can show explanations without a join.
+Local entries are keyed by a shared generation that every invalidation bumps,
+so an edited explanation reaches all workers on their next lookup.
+"""
+
+from django.core.cache import cache
+
+from .cache import LocalLRUCache, bump_generation, get_generation
+from .models import QuestionExplanation
+
+
+SHARED_TIMEOUT = 60 * 60
+LOCAL_TIMEOUT = 60
+GENERATION_NAMESPACE = 'explanations'
+
+EXPLANATION_FIELDS = (
+    'explanation_text', 'explanation_html', 'wrong_options_notes',
+    'references', 'clinical_notes', 'exam_tips',
+)
+
+_local = LocalLRUCache(max_entries=5000, timeout=LOCAL_TIMEOUT)
+# Stored for questions without an explanation so they are not queried again
+_MISSING = {}
+
+
+def _shared_key(question_id):
+    return f'explanation:{question_id}'
+
+
+def get_explanations(question_ids):
+    """Return {question_id: {field: value}}; questions without an explanation are left out"""
+    explanations = {}
+    missing = []
+    generation = get_generation(GENERATION_NAMESPACE)
+
+    for question_id in set(question_ids):
+        entry = _local.get((generation, question_id))
+        if entry is None:
+            missing.append(question_id)
+        else:
+            explanations[question_id] = entry
+
+    if missing:
+        shared = cache.get_many([_shared_key(question_id) for question_id in missing])
+        for question_id in missing:
+            entry = shared.get(_shared_key(question_id))
+            if entry is not None:
+                _local.set((generation, question_id), entry)
+                explanations[question_id] = entry
+        missing = [question_id for question_id in missing if question_id not in explanations]
+
+    if missing:
+        loaded = {question_id: _MISSING for question_id in missing}
+        rows = QuestionExplanation.objects.filter(question_id__in=missing).values('question_id', *EXPLANATION_FIELDS)
+        for row in rows:
+            loaded[row.pop('question_id')] = row
+
+        cache.set_many(
+            {_shared_key(question_id): entry for question_id, entry in loaded.items()},
+            SHARED_TIMEOUT
+        )
+        for question_id, entry in loaded.items():
+            _local.set((generation, question_id), entry)
+            explanations[question_id] = entry
+
+    return {question_id: entry for question_id, entry in explanations.items() if entry}
+
+
+def get_explanation(question_id):
+    return get_explanations([question_id]).get(question_id)
+
+
+def invalidate_explanation(question_id):
+    cache.delete(_shared_key(question_id))
+    # Orphans the local entries of every worker, not just this one
+    bump_generation(GENERATION_NAMESPACE)
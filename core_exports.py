@@ -0,0 +1,192 @@
+# medicalpromax_backend/apps/core/exports.py
+"""
+Streaming exports
+Rows are read in primary-key order one bounded chunk at a time (keyset
+pagination) and encoded as NDJSON or CSV chunk by chunk, so memory stays flat
+whatever the table size. Related rows (options, explanations) are loaded with
+one query per chunk. Question exports use the importer's columns and can be
+imported again as they are.
+"""
+
+import csv
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .importer import EXPLANATION_FIELDS, MAX_OPTIONS
+from .models import Specialty, ExamLevel, Subspecialty, Course, Chapter, Topic, Question, QuestionOption, QuestionExplanation
+
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+HIERARCHY = ('specialty', 'exam_level', 'subspecialty', 'course', 'chapter', 'topic')
+QUESTION_FILTERS = {level: f'{level}_id' for level in HIERARCHY}
+QUESTION_FIELDS = (
+    'id', *QUESTION_FILTERS.values(), 'question_text', 'question_html', 'image_url', 'question_type',
+    'difficulty', 'tags', 'source', 'source_year', 'is_active', 'created_at',
+)
+QUESTION_COLUMNS = (
+    'id', *HIERARCHY, 'question_text', 'question_html', 'image_url', 'question_type', 'difficulty',
+    'tags', 'source', 'source_year', 'is_active', 'created_at',
+    *(f'option_{number}{suffix}' for number in range(1, MAX_OPTIONS + 1) for suffix in ('', '_html')),
+    'correct_option', 'explanation_text', *EXPLANATION_FIELDS,
+)
+
+
+# Reading
+
+def keyset_chunks(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """values() rows of `queryset` in id order, one LIMIT query per chunk"""
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values(*fields)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]['id']
+
+
+def export_filters(params, lookups, date_field):
+    """
+    ORM filters from query params: integer ids for each name in `lookups`,
+    and an inclusive date_from / date_to (YYYY-MM-DD) range on `date_field`
+    Raises ValueError with a message for the client
+    """
+    filters = {}
+    for name, lookup in lookups.items():
+        value = params.get(name)
+        if value in (None, ''):
+            continue
+        try:
+            filters[lookup] = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be a number')
+
+    for name, suffix, offset in (('date_from', 'gte', 0), ('date_to', 'lt', 1)):
+        value = params.get(name)
+        if not value:
+            continue
+        day = parse_date(str(value))
+        if day is None:
+            raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+        # Whole-day bounds on the raw column keep the index usable, unlike __date
+        start = datetime.combine(day + timedelta(days=offset), time.min)
+        filters[f'{date_field}__{suffix}'] = timezone.make_aware(start) if settings.USE_TZ else start
+    return filters
+
+
+# Encoding
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ';'.join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False, cls=DjangoJSONEncoder)
+    return value
+
+
+def ndjson_chunks(chunks):
+    for rows in chunks:
+        yield ''.join(json.dumps(row, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n' for row in rows)
+
+
+def csv_chunks(chunks, columns):
+    writer = csv.writer(_Echo())
+    # The BOM lets Excel detect UTF-8 and show Persian text correctly
+    yield '\ufeff' + writer.writerow(columns)
+    for rows in chunks:
+        yield ''.join(writer.writerow([_csv_value(row.get(column)) for column in columns]) for row in rows)
+
+
+def encode(chunks, fmt, columns):
+    """Text chunks of the export in `fmt`"""
+    if fmt == 'csv':
+        return csv_chunks(chunks, columns)
+    return ndjson_chunks(chunks)
+
+
+def stream_response(chunks, fmt, columns, filename):
+    """StreamingHttpResponse that downloads the export as `filename`.<fmt>"""
+    response = StreamingHttpResponse(
+        (text.encode() for text in encode(chunks, fmt, columns)),
+        content_type=CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    # Keep nginx from buffering the whole body before sending it
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Questions
+
+def _hierarchy_slugs():
+    return {
+        level: dict(model.objects.values_list('id', 'slug'))
+        for level, model in zip(HIERARCHY, (Specialty, ExamLevel, Subspecialty, Course, Chapter, Topic))
+    }
+
+
+def _question_row(row, slugs, options, explanation, flat):
+    record = {'id': row['id']}
+    for level, column in QUESTION_FILTERS.items():
+        record[level] = slugs[level].get(row[column])
+    record.update((field, row[field]) for field in QUESTION_FIELDS[1 + len(HIERARCHY):])
+
+    if flat:
+        for option in options:
+            record[f"option_{option['option_number']}"] = option['option_text']
+            record[f"option_{option['option_number']}_html"] = option['option_html']
+        record['correct_option'] = next((option['option_number'] for option in options if option['is_correct']), None)
+    else:
+        record['options'] = [
+            {'text': option['option_text'], 'html': option['option_html'], 'is_correct': option['is_correct']}
+            for option in options
+        ]
+
+    explanation = explanation or {}
+    record['explanation_text'] = explanation.get('explanation_text')
+    record.update((field, explanation.get(field)) for field in EXPLANATION_FIELDS)
+    return record
+
+
+def question_export_chunks(filters=None, chunk_size=EXPORT_CHUNK_SIZE, flat=False):
+    """
+    Lists of export rows, options and explanation included
+    flat=True spreads options over option_N columns for CSV
+    """
+    slugs = _hierarchy_slugs()
+    queryset = Question.objects.filter(**(filters or {}))
+    for rows in keyset_chunks(queryset, QUESTION_FIELDS, chunk_size):
+        ids = [row['id'] for row in rows]
+        options = defaultdict(list)
+        for option in QuestionOption.objects.filter(question_id__in=ids).order_by('question_id', 'option_number').values(
+            'question_id', 'option_number', 'option_text', 'option_html', 'is_correct'
+        ):
+            options[option['question_id']].append(option)
+        explanations = {
+            explanation['question_id']: explanation
+            for explanation in QuestionExplanation.objects.filter(question_id__in=ids).values(
+                'question_id', 'explanation_text', *EXPLANATION_FIELDS
+            )
+        }
+        yield [_question_row(row, slugs, options[row['id']], explanations.get(row['id']), flat) for row in rows]
@@ -0,0 +1,131 @@
+# medicalpromax_backend/apps/core/fast_serializers.py
+"""
+Read-only fast path for the hot core serializers
+Rows are read with values() and assembled into plain dicts with one query per
+nesting level, producing the same output as the DRF serializers (same keys,
+same order, same values) without building model instances or running field
+machinery per row. Field lists are taken from the serializers' Meta, so the two
+cannot drift apart.
+"""
+
+from rest_framework.response import Response
+
+from .models import ExamLevel, QuestionExplanation, QuestionOption, Specialty, Subspecialty
+from .serializers import (
+    CourseSerializer, ExamLevelSerializer, QuestionExplanationSerializer, QuestionOptionSerializer,
+    QuestionSerializer, SpecialtySerializer, SubspecialtySerializer
+)
+
+
+def _fields(serializer_class, nested=()):
+    return [field for field in serializer_class.Meta.fields if field not in nested]
+
+
+SPECIALTY_FIELDS = _fields(SpecialtySerializer)
+EXAM_LEVEL_FIELDS = _fields(ExamLevelSerializer, nested=('specialty',))
+SUBSPECIALTY_FIELDS = _fields(SubspecialtySerializer)
+COURSE_NESTED = ('specialty', 'exam_level', 'subspecialty')
+COURSE_FIELDS = _fields(CourseSerializer, nested=COURSE_NESTED)
+QUESTION_NESTED = ('options', 'explanation')
+QUESTION_FIELDS = _fields(QuestionSerializer, nested=QUESTION_NESTED)
+OPTION_FIELDS = _fields(QuestionOptionSerializer)
+EXPLANATION_FIELDS = _fields(QuestionExplanationSerializer)
+
+
+def _by_id(model, ids, fields, extra=()):
+    ids = {pk for pk in ids if pk is not None}
+    if not ids:
+        return {}
+    return {row['id']: row for row in model.objects.filter(id__in=ids).values(*fields, *extra)}
+
+
+def _ordered(row, layout):
+    """Copy of `row` with the serializer's key order"""
+    return {field: row[field] for field in layout}
+
+
+# Hierarchy
+
+def course_values(queryset):
+    """The values() queryset assemble_courses expects; can be paginated like any queryset"""
+    return queryset.prefetch_related(None).values(*COURSE_FIELDS, 'specialty_id', 'exam_level_id', 'subspecialty_id')
+
+
+def assemble_courses(rows):
+    """CourseSerializer output for course_values() rows: three more queries in total"""
+    rows = list(rows)
+
+    level_rows = _by_id(ExamLevel, (row['exam_level_id'] for row in rows), EXAM_LEVEL_FIELDS, extra=('specialty_id',))
+    # Exam levels nest their specialty again; both levels share one specialty query
+    specialties = _by_id(
+        Specialty,
+        [row['specialty_id'] for row in rows] + [row['specialty_id'] for row in level_rows.values()],
+        SPECIALTY_FIELDS
+    )
+    subspecialties = _by_id(Subspecialty, (row['subspecialty_id'] for row in rows), SUBSPECIALTY_FIELDS)
+
+    levels = {}
+    for pk, row in level_rows.items():
+        row['specialty'] = specialties.get(row['specialty_id'])
+        levels[pk] = _ordered(row, ExamLevelSerializer.Meta.fields)
+
+    courses = []
+    for row in rows:
+        row['specialty'] = specialties.get(row['specialty_id'])
+        row['exam_level'] = levels.get(row['exam_level_id'])
+        row['subspecialty'] = subspecialties.get(row['subspecialty_id'])
+        courses.append(_ordered(row, CourseSerializer.Meta.fields))
+    return courses
+
+
+# Questions
+
+def question_values(queryset):
+    """The values() queryset assemble_questions expects"""
+    return queryset.prefetch_related(None).values(*QUESTION_FIELDS)
+
+
+def assemble_questions(rows):
+    """QuestionSerializer output for question_values() rows: two more queries in total"""
+    rows = list(rows)
+    question_ids = [row['id'] for row in rows]
+
+    options = {question_id: [] for question_id in question_ids}
+    for option in QuestionOption.objects.filter(question_id__in=question_ids).order_by(
+        'question_id', 'option_number'
+    ).values('question_id', *OPTION_FIELDS):
+        options[option.pop('question_id')].append(option)
+
+    explanations = {}
+    for explanation in QuestionExplanation.objects.filter(question_id__in=question_ids).values(
+        'question_id', *EXPLANATION_FIELDS
+    ):
+        explanations[explanation.pop('question_id')] = explanation
+
+    questions = []
+    for row in rows:
+        row['options'] = options[row['id']]
+        row['explanation'] = explanations.get(row['id'])
+        questions.append(_ordered(row, QuestionSerializer.Meta.fields))
+    return questions
+
+
+class FastListMixin:
+    """
+    Serve a list view through a values()-based fast path
+
+    class CourseListView(FastListMixin, generics.ListAPIView):
+        fast_values = staticmethod(course_values)
+        fast_assemble = staticmethod(assemble_courses)
+    """
+    fast_values = None
+    fast_assemble = None
+
+    def list(self, request, *args, **kwargs):
+        rows = self.fast_values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.fast_assemble(page))
+
+        return Response(self.fast_assemble(rows))
@@ -0,0 +1,437 @@
+# medicalpromax_backend/apps/core/importer.py
+"""
+Streaming question-bank importer
+Reads CSV, JSON Lines / JSON or XLSX rows one at a time, resolves hierarchy
+slugs through maps preloaded once per import, and writes questions, options
+and explanations with bulk_create per chunk inside a transaction. Duplicates
+are skipped by a content hash over the normalized question and option texts,
+so re-importing a file is a no-op. Memory stays bounded by the chunk size.
+
+Row columns:
+    specialty, exam_level, subspecialty, course, chapter, topic   (slugs)
+    question_text, question_html, image_url, question_type, difficulty,
+    tags ("a;b" or a JSON list), source, source_year,
+    option_1 .. option_6, correct_option (option number),
+    explanation_text, explanation_html, wrong_options_notes, references,
+    clinical_notes, exam_tips
+JSON rows may instead carry "options": [{"text", "html", "is_correct"}].
+"""
+
+import csv
+import hashlib
+import io
+import itertools
+import json
+
+from django.db import IntegrityError, transaction
+
+from .cache import invalidate_resource
+from .models import (
+    Specialty, ExamLevel, Subspecialty, Course, Chapter, Topic,
+    Question, QuestionOption, QuestionExplanation
+)
+from .question_index import invalidate_question_index
+from .search import index_questions, normalize_persian
+from .tags import sync_question_tags
+
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_OPTIONS = 6
+MAX_REPORTED_ERRORS = 200
+
+QUESTION_TYPES = {choice for choice, _ in Question.QUESTION_TYPE_CHOICES}
+DIFFICULTIES = {choice for choice, _ in Question.DIFFICULTY_CHOICES}
+EXPLANATION_FIELDS = (
+    'explanation_html', 'wrong_options_notes', 'references', 'clinical_notes', 'exam_tips',
+)
+
+
+class ImportFormatError(ValueError):
+    """Unreadable import file"""
+
+
+class RowError(ValueError):
+    """Invalid row"""
+
+
+def content_hash(question_text, option_texts):
+    """Digest of the normalized question and option texts, in option order"""
+    parts = [normalize_persian(question_text)] + [normalize_persian(text) for text in option_texts]
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+# Readers
+
+def iter_csv(stream):
+    for row in csv.DictReader(stream):
+        yield row
+
+
+def iter_json(stream):
+    """JSON Lines are streamed; a single JSON array is loaded whole"""
+    first = stream.readline()
+    while first and not first.strip():
+        first = stream.readline()
+    if first.lstrip().startswith('['):
+        try:
+            rows = json.loads(first + stream.read())
+        except ValueError as e:
+            raise ImportFormatError(f'Invalid JSON: {e}')
+        yield from rows
+        return
+    for number, line in enumerate(itertools.chain([first], stream), start=1):
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ImportFormatError(f'Invalid JSON on line {number}: {e}')
+
+
+def iter_xlsx(binary_stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError('XLSX import needs openpyxl (pip install openpyxl)')
+
+    workbook = load_workbook(binary_stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        for values in rows:
+            if any(value is not None for value in values):
+                yield dict(zip(header, ('' if value is None else value for value in values)))
+    finally:
+        workbook.close()
+
+
+def read_rows(binary_stream, fmt):
+    """Rows of an uploaded or opened binary file in `fmt` (csv, json, jsonl, xlsx)"""
+    if fmt == 'xlsx':
+        return iter_xlsx(binary_stream)
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        return iter_csv(text)
+    if fmt in ('json', 'jsonl', 'ndjson'):
+        return iter_json(text)
+    raise ImportFormatError(f'Unsupported format: {fmt}')
+
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return {'jsonl': 'json', 'ndjson': 'json'}.get(extension, extension)
+
+
+# Hierarchy
+
+class HierarchyMap:
+    """Slug lookups for the whole hierarchy, loaded with one query per level"""
+
+    def __init__(self):
+        self.specialties = dict(Specialty.objects.values_list('slug', 'id'))
+        self.exam_levels = {
+            (specialty_id, slug): pk for pk, specialty_id, slug in ExamLevel.objects.values_list('id', 'specialty_id', 'slug')
+        }
+        self.subspecialties = {
+            (exam_level_id, slug): pk for pk, exam_level_id, slug in Subspecialty.objects.values_list('id', 'exam_level_id', 'slug')
+        }
+        self.courses = dict(Course.objects.values_list('slug', 'id'))
+        self.chapters = {
+            (course_id, slug): pk for pk, course_id, slug in Chapter.objects.values_list('id', 'course_id', 'slug')
+        }
+        self.topics = {
+            (chapter_id, slug): pk for pk, chapter_id, slug in Topic.objects.values_list('id', 'chapter_id', 'slug')
+        }
+
+    def resolve(self, row):
+        """Hierarchy ids for a row; raises RowError for unknown slugs"""
+        def lookup(table, key, name, required=False):
+            if not key[-1]:
+                if required:
+                    raise RowError(f'{name} is required')
+                return None
+            if any(part is None for part in key[:-1]):
+                raise RowError(f'{name} {key[-1]!r} needs its parent')
+            pk = table.get(key if len(key) > 1 else key[0])
+            if pk is None:
+                raise RowError(f'Unknown {name} {key[-1]!r}')
+            return pk
+
+        specialty_id = lookup(self.specialties, (_text(row, 'specialty'),), 'specialty', required=True)
+        exam_level_id = lookup(self.exam_levels, (specialty_id, _text(row, 'exam_level')), 'exam_level', required=True)
+        course_id = lookup(self.courses, (_text(row, 'course'),), 'course')
+        chapter_id = lookup(self.chapters, (course_id, _text(row, 'chapter')), 'chapter')
+        return {
+            'specialty_id': specialty_id,
+            'exam_level_id': exam_level_id,
+            'subspecialty_id': lookup(self.subspecialties, (exam_level_id, _text(row, 'subspecialty')), 'subspecialty'),
+            'course_id': course_id,
+            'chapter_id': chapter_id,
+            'topic_id': lookup(self.topics, (chapter_id, _text(row, 'topic')), 'topic'),
+        }
+
+
+# Row parsing
+
+def _text(row, key):
+    value = row.get(key)
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def _tags(value):
+    if isinstance(value, list):
+        return [str(tag).strip() for tag in value if str(tag).strip()]
+    value = str(value or '').strip()
+    if value.startswith('['):
+        try:
+            return _tags(json.loads(value))
+        except ValueError:
+            pass
+    return [tag.strip() for tag in value.replace('،', ';').replace(',', ';').split(';') if tag.strip()]
+
+
+def _options(row):
+    """[(text, html, is_correct)] in option order"""
+    if isinstance(row.get('options'), list):
+        return [
+            (str(option.get('text') or '').strip(), option.get('html') or None, bool(option.get('is_correct')))
+            for option in row['options']
+        ]
+
+    correct = _text(row, 'correct_option')
+    options = []
+    for number in range(1, MAX_OPTIONS + 1):
+        text = _text(row, f'option_{number}')
+        if text:
+            options.append((text, _text(row, f'option_{number}_html') or None, str(number) == correct))
+    return options
+
+
+def parse_row(row, hierarchy):
+    """Validated (question fields, options, explanation fields, hash) for one row"""
+    question_text = _text(row, 'question_text')
+    if not question_text:
+        raise RowError('question_text is required')
+
+    options = _options(row)
+    if len(options) > MAX_OPTIONS:
+        raise RowError(f'At most {MAX_OPTIONS} options are allowed')
+    question_type = _text(row, 'question_type') or 'multiple_choice'
+    if question_type not in QUESTION_TYPES:
+        raise RowError(f'Unknown question_type {question_type!r}')
+    if question_type != 'descriptive' and not any(is_correct for _, _, is_correct in options):
+        raise RowError('No correct option')
+
+    difficulty = _text(row, 'difficulty') or 'medium'
+    if difficulty not in DIFFICULTIES:
+        raise RowError(f'Unknown difficulty {difficulty!r}')
+
+    source_year = _text(row, 'source_year')
+    try:
+        source_year = int(float(source_year)) if source_year else None
+    except ValueError:
+        raise RowError('source_year must be a number')
+
+    image_url = _text(row, 'image_url') or None
+    question = {
+        **hierarchy.resolve(row),
+        'question_text': question_text,
+        'question_html': _text(row, 'question_html') or None,
+        'image_url': image_url,
+        'has_image': bool(image_url),
+        'question_type': question_type,
+        'difficulty': difficulty,
+        'tags': _tags(row.get('tags')),
+        'source': _text(row, 'source') or None,
+        'source_year': source_year,
+    }
+
+    explanation = None
+    if _text(row, 'explanation_text'):
+        explanation = {'explanation_text': _text(row, 'explanation_text')}
+        explanation.update({field: _text(row, field) or None for field in EXPLANATION_FIELDS})
+
+    return question, options, explanation, content_hash(question_text, [text for text, _, _ in options])
+
+
+# Import
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.duplicates = 0
+        self.errors = []
+        self.error_count = 0
+        self.question_ids = []
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'errors': self.error_count,
+            'error_details': self.errors,
+        }
+
+
+def _write_chunk(parsed, report, dry_run):
+    """Skip known hashes, then bulk-insert the rest of the chunk in one transaction"""
+    existing = set(Question.objects.filter(
+        content_hash__in=[item[3] for item in parsed]
+    ).values_list('content_hash', flat=True))
+
+    fresh = {}
+    for item in parsed:
+        if item[3] in existing or item[3] in fresh:
+            report.duplicates += 1
+        else:
+            fresh[item[3]] = item
+    if not fresh or dry_run:
+        # A dry run reports what would have been created
+        report.created += len(fresh)
+        return []
+
+    with transaction.atomic():
+        # The unique hash turns a concurrent import of the same question into a skipped row
+        Question.objects.bulk_create([
+            Question(content_hash=digest, **question) for digest, (question, _, _, _) in fresh.items()
+        ], ignore_conflicts=True)
+        # MySQL does not return primary keys from bulk_create; the hashes identify the new rows
+        ids = dict(Question.objects.filter(content_hash__in=list(fresh)).values_list('content_hash', 'id'))
+        # A conflicting insert waits for the other transaction, so rows it won are committed
+        # with their options or explanation by now; rows without either are the ones inserted here
+        claimed = set(QuestionOption.objects.filter(
+            question_id__in=list(ids.values())
+        ).values_list('question_id', flat=True).distinct())
+        claimed.update(QuestionExplanation.objects.filter(
+            question_id__in=list(ids.values())
+        ).values_list('question_id', flat=True))
+        ids = {digest: question_id for digest, question_id in ids.items() if question_id not in claimed}
+
+        options = []
+        explanations = []
+        for digest, question_id in ids.items():
+            _, question_options, explanation, _ = fresh[digest]
+            options.extend(
+                QuestionOption(
+                    question_id=question_id, option_number=number,
+                    option_text=text, option_html=html, is_correct=is_correct,
+                )
+                for number, (text, html, is_correct) in enumerate(question_options, start=1)
+            )
+            if explanation:
+                explanations.append(QuestionExplanation(question_id=question_id, **explanation))
+        QuestionOption.objects.bulk_create(options)
+        QuestionExplanation.objects.bulk_create(explanations)
+
+    sync_question_tags([(question_id, fresh[digest][0]['tags']) for digest, question_id in ids.items()])
+    report.created += len(ids)
+    report.duplicates += len(fresh) - len(ids)
+    return list(ids.values())
+
+
+def import_questions(rows, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False, log=None):
+    """
+    Import an iterable of row dicts; returns an ImportReport
+    Each chunk is committed on its own, so a failure keeps earlier chunks
+    """
+    hierarchy = HierarchyMap()
+    report = ImportReport()
+    parsed = []
+
+    def flush():
+        question_ids = _write_chunk(parsed, report, dry_run)
+        if question_ids:
+            index_questions(question_ids)
+            report.question_ids.extend(question_ids)
+        parsed.clear()
+        if log:
+            log(f'{report.rows} rows: {report.created} created, {report.duplicates} duplicates, {report.error_count} errors')
+
+    for line, row in enumerate(rows, start=1):
+        report.rows += 1
+        try:
+            if not isinstance(row, dict):
+                raise RowError('Row must be an object')
+            parsed.append(parse_row(row, hierarchy))
+        except RowError as e:
+            report.error(line, str(e))
+            continue
+        if len(parsed) >= chunk_size:
+            flush()
+    if parsed:
+        flush()
+
+    if report.created and not dry_run:
+        # bulk_create skips model signals; derived indexes are refreshed here
+        invalidate_question_index()
+        invalidate_resource('questions')
+    return report
+
+
+def _option_texts(question_ids):
+    """{question_id: [option texts in option order]}"""
+    options = {}
+    for question_id, text in QuestionOption.objects.filter(
+        question_id__in=question_ids
+    ).order_by('question_id', 'option_number').values_list('question_id', 'option_text'):
+        options.setdefault(question_id, []).append(text)
+    return options
+
+
+def refresh_content_hash(question_id):
+    """
+    Recompute a question's hash after it or its options changed
+    The hash is left empty when another question already holds it
+    """
+    question_text = Question.objects.filter(pk=question_id).values_list('question_text', flat=True).first()
+    if question_text is None:
+        return
+    digest = content_hash(question_text, _option_texts([question_id]).get(question_id, []))
+    if Question.objects.filter(content_hash=digest).exclude(pk=question_id).exists():
+        digest = None
+    try:
+        with transaction.atomic():
+            Question.objects.filter(pk=question_id).update(content_hash=digest)
+    except IntegrityError:
+        # Another question took the hash since the check
+        Question.objects.filter(pk=question_id).update(content_hash=None)
+
+
+def backfill_content_hashes(chunk_size=IMPORT_CHUNK_SIZE):
+    """Store content hashes on questions created outside the importer; duplicates stay unhashed"""
+    updated = 0
+    last_id = 0
+    while True:
+        questions = list(Question.objects.filter(
+            id__gt=last_id, content_hash__isnull=True
+        ).order_by('id').only('id', 'question_text')[:chunk_size])
+        if not questions:
+            return updated
+        last_id = questions[-1].id
+
+        options = _option_texts([question.id for question in questions])
+        digests = {
+            question.id: content_hash(question.question_text, options.get(question.id, []))
+            for question in questions
+        }
+        taken = set(Question.objects.filter(
+            content_hash__in=list(digests.values())
+        ).values_list('content_hash', flat=True))
+
+        hashed = []
+        for question in questions:
+            if digests[question.id] not in taken:
+                question.content_hash = digests[question.id]
+                taken.add(question.content_hash)
+                hashed.append(question)
+        Question.objects.bulk_update(hashed, ['content_hash'])
+        updated += len(hashed)
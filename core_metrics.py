@@ -0,0 +1,358 @@
+# medicalpromax_backend/apps/core/metrics.py
+"""
+Per-view request metrics and query budgets
+QueryMetricsMiddleware records, for every resolved view, the SQL query count,
+total database time, response rendering (JSON serialization) time, total
+duration and response size, and aggregates them into histograms that
+metrics_view exposes in Prometheus text format.
+
+Views may declare a query budget:
+
+    class ExamAnswerSubmitView(generics.CreateAPIView):
+        query_budget = 10
+
+Requests that exceed it are counted, logged, and with QUERY_BUDGET_STRICT
+(e.g. in test settings) raise QueryBudgetExceeded.
+
+Enable with 'apps.core.metrics.QueryMetricsMiddleware' in MIDDLEWARE, placed
+after the authentication middleware.
+
+Each worker process records into its own registry and a background thread
+publishes its cumulative totals to the shared cache every
+METRICS_PUBLISH_SECONDS. A scrape of any worker merges the snapshots of all
+workers, so /metrics is the same whichever worker answers. Totals of workers
+that stopped publishing (restarts, scale-down) are folded into a retired
+snapshot, so counters keep growing across worker restarts; at most the last
+publish interval of a dead worker is lost.
+"""
+
+from collections import defaultdict
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = 'medicalpromax_view'
+PUBLISH_SECONDS = getattr(settings, 'METRICS_PUBLISH_SECONDS', 15)
+# A worker that has not published for this long is considered gone
+WORKER_TIMEOUT = PUBLISH_SECONDS * 4
+COLLECT_LOCK_SECONDS = 2
+BUCKETS = {
+    'queries': (1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+    'db_seconds': (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    'render_seconds': (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5),
+    'duration_seconds': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    'response_bytes': (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+}
+HELP = {
+    'queries': 'SQL queries per request',
+    'db_seconds': 'Time spent executing SQL per request',
+    'render_seconds': 'Response rendering (serialization) time per request',
+    'duration_seconds': 'Total request duration',
+    'response_bytes': 'Response body size',
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more queries than its declared budget"""
+
+
+class Histogram:
+    """Cumulative-bucket histogram"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Histograms per (metric, view, method) plus over-budget counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.over_budget = defaultdict(int)
+
+    def observe(self, view, method, values):
+        with self._lock:
+            for metric, value in values.items():
+                key = (metric, view, method)
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram(BUCKETS[metric])
+                histogram.observe(value)
+
+    def count_over_budget(self, view, method):
+        with self._lock:
+            self.over_budget[view, method] += 1
+
+    def snapshot(self):
+        """Picklable copy of the totals: {'histograms': {key: (counts, sum, count)}, 'over_budget': {...}}"""
+        with self._lock:
+            return {
+                'histograms': {
+                    key: (list(histogram.counts), histogram.sum, histogram.count)
+                    for key, histogram in self.histograms.items()
+                },
+                'over_budget': dict(self.over_budget),
+            }
+
+
+def merge(snapshots):
+    """Sum registry snapshots; None entries are skipped"""
+    histograms = {}
+    over_budget = defaultdict(int)
+    for snapshot in snapshots:
+        if not snapshot:
+            continue
+        for key, (counts, total, count) in snapshot['histograms'].items():
+            if key in histograms:
+                merged_counts, merged_total, merged_count = histograms[key]
+                counts = [a + b for a, b in zip(merged_counts, counts)]
+                total += merged_total
+                count += merged_count
+            histograms[key] = (list(counts), total, count)
+        for key, count in snapshot['over_budget'].items():
+            over_budget[key] += count
+    return {'histograms': histograms, 'over_budget': dict(over_budget)}
+
+
+def render(snapshot):
+    """Prometheus text exposition format (version 0.0.4) of a snapshot"""
+    lines = []
+    for metric in BUCKETS:
+        name = f'{METRIC_PREFIX}_{metric}'
+        lines.append(f'# HELP {name} {HELP[metric]}')
+        lines.append(f'# TYPE {name} histogram')
+        for (key_metric, view, method), (counts, total, count) in sorted(snapshot['histograms'].items()):
+            if key_metric != metric:
+                continue
+            labels = f'view="{_escape(view)}",method="{method}"'
+            for bound, bucket_count in zip(BUCKETS[metric], counts):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {bucket_count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {total}')
+            lines.append(f'{name}_count{{{labels}}} {count}')
+
+    name = f'{METRIC_PREFIX}_over_query_budget_total'
+    lines.append(f'# HELP {name} Requests that exceeded the view query budget')
+    lines.append(f'# TYPE {name} counter')
+    for (view, method), count in sorted(snapshot['over_budget'].items()):
+        lines.append(f'{name}{{view="{_escape(view)}",method="{method}"}} {count}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+
+
+# Sharing across workers
+
+_WORKERS_KEY = 'metrics:workers'
+_RETIRED_KEY = 'metrics:retired'
+_LOCK_KEY = 'metrics:lock'
+
+_publisher = {'pid': None, 'worker_id': None}
+_publisher_lock = threading.Lock()
+
+
+def _snapshot_key(worker_id):
+    return f'metrics:worker:{worker_id}'
+
+
+def _alive_key(worker_id):
+    return f'metrics:alive:{worker_id}'
+
+
+def _acquire(wait=0.0):
+    """Take the shared metrics lock, polling for up to `wait` seconds"""
+    deadline = time.monotonic() + wait
+    while not cache.add(_LOCK_KEY, 1, COLLECT_LOCK_SECONDS * 5):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def publish(worker_id):
+    """Store this worker's totals and keep it registered as alive"""
+    cache.set(_snapshot_key(worker_id), registry.snapshot(), None)
+    cache.set(_alive_key(worker_id), 1, WORKER_TIMEOUT)
+    workers = cache.get(_WORKERS_KEY) or set()
+    # The set is only rewritten under the lock; when it is busy the next publish retries
+    if worker_id not in workers and _acquire():
+        try:
+            cache.set(_WORKERS_KEY, (cache.get(_WORKERS_KEY) or set()) | {worker_id}, None)
+        finally:
+            cache.delete(_LOCK_KEY)
+
+
+def _publish_forever(worker_id):
+    while True:
+        try:
+            publish(worker_id)
+        except Exception:
+            logger.exception('Publishing request metrics failed')
+        time.sleep(PUBLISH_SECONDS)
+
+
+def ensure_publisher():
+    """Start this process's publisher thread; forked workers each start their own"""
+    pid = os.getpid()
+    if _publisher['pid'] == pid:
+        return
+    with _publisher_lock:
+        if _publisher['pid'] == pid:
+            return
+        worker_id = f'{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}'
+        threading.Thread(target=_publish_forever, args=(worker_id,), daemon=True, name='metrics-publisher').start()
+        _publisher.update(pid=pid, worker_id=worker_id)
+
+
+def collect():
+    """
+    Merged totals of every worker, retired ones included
+    Workers that stopped publishing are folded into the retired snapshot first
+    """
+    locked = _acquire(wait=COLLECT_LOCK_SECONDS)
+    try:
+        workers = cache.get(_WORKERS_KEY) or set()
+        alive = cache.get_many([_alive_key(worker_id) for worker_id in workers])
+        gone = {worker_id for worker_id in workers if _alive_key(worker_id) not in alive}
+        snapshots = cache.get_many([_snapshot_key(worker_id) for worker_id in workers])
+        retired = cache.get(_RETIRED_KEY)
+
+        # Without the lock the totals are read as they are and folding waits for the next scrape
+        if gone and locked:
+            retired = merge([retired, *(snapshots.pop(_snapshot_key(worker_id), None) for worker_id in gone)])
+            cache.set(_RETIRED_KEY, retired, None)
+            cache.set(_WORKERS_KEY, workers - gone, None)
+            cache.delete_many([_snapshot_key(worker_id) for worker_id in gone])
+        return merge([retired, *snapshots.values()])
+    finally:
+        if locked:
+            cache.delete(_LOCK_KEY)
+
+
+class QueryRecorder:
+    """execute_wrapper collecting the query count and database time of a request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def view_label(request):
+    """Low-cardinality view name: the URL route pattern, or the view name"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.route or match.view_name or match._func_path
+
+
+def view_query_budget(request):
+    """The query_budget declared on the resolved view class, if any"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    view_class = getattr(match.func, 'view_class', None) or getattr(match.func, 'cls', None)
+    return getattr(view_class, 'query_budget', None)
+
+
+class QueryMetricsMiddleware:
+    """Record query, timing and size metrics for each resolved view"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        ensure_publisher()
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        view = view_label(request)
+        if view is None:
+            return response
+
+        registry.observe(view, request.method, {
+            'queries': recorder.count,
+            'db_seconds': recorder.seconds,
+            'render_seconds': getattr(response, '_metrics_render_seconds', 0.0),
+            'duration_seconds': duration,
+            'response_bytes': 0 if response.streaming else len(response.content),
+        })
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(recorder.count)
+
+        budget = view_query_budget(request)
+        if budget is not None and recorder.count > budget:
+            registry.count_over_budget(view, request.method)
+            message = f'{request.method} {view} ran {recorder.count} queries, budget is {budget}'
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns; time the render itself
+        render = response.render
+
+        def timed_render():
+            started = time.perf_counter()
+            try:
+                return render()
+            finally:
+                response._metrics_render_seconds = time.perf_counter() - started
+
+        response.render = timed_render
+        return response
+
+
+def metrics_view(request):
+    """
+    GET /api/metrics/
+    Prometheus text exposition of the per-view histograms, summed over all workers
+    Allowed for staff users, or with `Authorization: Bearer <METRICS_TOKEN>`
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorized = token and request.headers.get('Authorization') == f'Bearer {token}'
+    if not authorized and not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,149 @@
+# medicalpromax_backend/apps/core/navigation.py
+"""
+Precomputed navigation tree
+Specialty > ExamLevel > Subspecialty > Course > Chapter > Topic, built from one
+flat query per level. Each level is cached on its own generation, so an edit
+to one node only re-reads its level; the tree is reassembled in memory.
+"""
+
+from django.core.cache import cache
+
+from .cache import bump_generation, get_generations
+from .models import Specialty, ExamLevel, Subspecialty, Course, Chapter, Topic
+
+
+LEVEL_TIMEOUT = 60 * 60 * 24
+TREE_TIMEOUT = 60 * 60 * 24
+
+LEVELS = {
+    'specialties': (Specialty, ['id', 'slug', 'name_fa', 'name_en', 'icon', 'description', 'display_order']),
+    'exam_levels': (ExamLevel, ['id', 'specialty_id', 'slug', 'name_fa', 'name_en', 'icon',
+                                'requires_subspecialty', 'display_order']),
+    'subspecialties': (Subspecialty, ['id', 'specialty_id', 'exam_level_id', 'slug', 'name_fa', 'name_en',
+                                      'display_order']),
+    'courses': (Course, ['id', 'specialty_id', 'exam_level_id', 'subspecialty_id', 'slug', 'name_fa',
+                         'name_en', 'difficulty_level', 'display_order']),
+    'chapters': (Chapter, ['id', 'course_id', 'slug', 'name_fa', 'name_en', 'chapter_number',
+                           'estimated_study_time', 'display_order']),
+    'topics': (Topic, ['id', 'chapter_id', 'slug', 'name_fa', 'name_en', 'estimated_study_time',
+                       'standard_questions_count', 'display_order']),
+}
+
+LEVEL_BY_MODEL = {model: name for name, (model, fields) in LEVELS.items()}
+
+
+def _namespace(level):
+    return f'nav:{level}'
+
+
+def _load_level(level, generation):
+    """Flat rows of one level, cached until the level generation changes"""
+    key = f'nav-level:{level}:{generation}'
+    rows = cache.get(key)
+    if rows is None:
+        model, fields = LEVELS[level]
+        rows = list(model.objects.filter(is_active=True).order_by('display_order', 'id').values(*fields))
+        cache.set(key, rows, LEVEL_TIMEOUT)
+    return rows
+
+
+def _assemble(levels):
+    """Link flat level rows into nested nodes; cached rows are copied, never mutated"""
+    specialties = {}
+    for row in levels['specialties']:
+        specialties[row['id']] = {**row, 'exam_levels': []}
+
+    exam_levels = {}
+    for row in levels['exam_levels']:
+        parent = specialties.get(row['specialty_id'])
+        if parent is not None:
+            node = {**row, 'subspecialties': [], 'courses': []}
+            exam_levels[row['id']] = node
+            parent['exam_levels'].append(node)
+
+    subspecialties = {}
+    for row in levels['subspecialties']:
+        parent = exam_levels.get(row['exam_level_id'])
+        if parent is not None:
+            node = {**row, 'courses': []}
+            subspecialties[row['id']] = node
+            parent['subspecialties'].append(node)
+
+    courses = {}
+    for row in levels['courses']:
+        # Courses without a subspecialty hang directly under their exam level
+        if row['subspecialty_id']:
+            parent = subspecialties.get(row['subspecialty_id'])
+        else:
+            parent = exam_levels.get(row['exam_level_id'])
+        if parent is not None:
+            node = {**row, 'chapters': []}
+            courses[row['id']] = node
+            parent['courses'].append(node)
+
+    chapters = {}
+    for row in levels['chapters']:
+        parent = courses.get(row['course_id'])
+        if parent is not None:
+            node = {**row, 'topics': []}
+            chapters[row['id']] = node
+            parent['chapters'].append(node)
+
+    for row in levels['topics']:
+        parent = chapters.get(row['chapter_id'])
+        if parent is not None:
+            parent['topics'].append(dict(row))
+
+    return list(specialties.values())
+
+
+def get_navigation_tree():
+    """
+    Full navigation tree
+    Only levels whose generation changed since the last build are re-queried
+    """
+    generations = get_generations([_namespace(level) for level in LEVELS])
+    signature = ':'.join(str(generations[_namespace(level)]) for level in LEVELS)
+    key = f'nav-tree:{signature}'
+
+    tree = cache.get(key)
+    if tree is None:
+        tree = _assemble({
+            level: _load_level(level, generations[_namespace(level)])
+            for level in LEVELS
+        })
+        cache.set(key, tree, TREE_TIMEOUT)
+
+    return tree
+
+
+def _child(children, slug):
+    return next((child for child in children if child['slug'] == slug), None)
+
+
+def find_subtree(tree, specialty=None, exam_level=None, subspecialty=None, course=None):
+    """
+    Walk the tree by slugs and return the deepest requested node, or None
+    Courses are searched under the subspecialty when given, else under the exam level
+    """
+    if specialty is None:
+        return {'specialties': tree}
+
+    node = _child(tree, specialty)
+    if node is None or exam_level is None:
+        return node
+
+    node = _child(node['exam_levels'], exam_level)
+    if node is not None and subspecialty is not None:
+        node = _child(node['subspecialties'], subspecialty)
+    if node is not None and course is not None:
+        node = _child(node['courses'], course)
+
+    return node
+
+
+def invalidate_level(model):
+    """Mark the level of `model` as changed"""
+    level = LEVEL_BY_MODEL.get(model)
+    if level is not None:
+        bump_generation(_namespace(level))
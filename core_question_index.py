@@ -0,0 +1,355 @@
+# medicalpromax_backend/apps/core/question_index.py
+"""
+In-memory facet index over active questions
+Every question gets a slot; each facet value keeps a bitmap (a Python int)
+of the slots that carry it. Filters become bitwise AND/OR over a handful of
+bitmaps, so matching, counting and sampling never scan the questions table.
+
+Question saves and deletes are appended to a change log in the shared cache;
+each process replays the log to patch its index in place and only rebuilds
+from scratch when the log has a gap or the index is too old.
+"""
+
+import random
+import threading
+import time
+
+from django.core.cache import cache
+
+from .cache import response_cache
+from .models import Question
+from .tags import clean_tags
+
+
+FACETS = (
+    'specialty', 'exam_level', 'subspecialty', 'course', 'chapter', 'topic',
+    'difficulty', 'source_year', 'question_type',
+)
+MULTI_FACETS = ('tags', 'exam_type')
+INTEGER_FACETS = (
+    'specialty', 'exam_level', 'subspecialty', 'course', 'chapter', 'topic', 'source_year',
+)
+
+INDEX_NAMESPACE = 'question-index'
+INDEX_MAX_AGE = 60 * 60
+CHANGE_LOG_TIMEOUT = 60 * 60
+CHANGE_LOG_MAX_REPLAY = 1000
+SEQUENCE_LOCAL_TIMEOUT = 2
+
+_FIELDS = (
+    'id', 'specialty_id', 'exam_level_id', 'subspecialty_id', 'course_id', 'chapter_id', 'topic_id',
+    'difficulty', 'source_year', 'question_type', 'tags',
+)
+_SEQUENCE_KEY = 'question-index:sequence'
+
+
+if hasattr(int, 'bit_count'):
+    def popcount(bitmap):
+        return bitmap.bit_count()
+else:
+    def popcount(bitmap):
+        return bin(bitmap).count('1')
+
+
+def _bitmap(slots):
+    """Bitmap with the given slot bits set"""
+    if not slots:
+        return 0
+    data = bytearray(max(slots) // 8 + 1)
+    for slot in slots:
+        data[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(data, 'little')
+
+
+def iter_slots(bitmap):
+    """Positions of the set bits, lowest first"""
+    bits = bin(bitmap)[:1:-1]
+    position = bits.find('1')
+    while position != -1:
+        yield position
+        position = bits.find('1', position + 1)
+
+
+class QuestionFacetIndex:
+    """
+    Bitmap facet index
+    `bitmaps[facet][value]` holds the slots of active questions with that value;
+    `values[slot]` remembers what each slot was indexed under so it can be patched
+    """
+
+    def __init__(self, rows, exam_types, sequence=0):
+        self.slot_ids = []
+        self.slot_of = {}
+        self.values = []
+        self.all = 0
+        self.bitmaps = {facet: {} for facet in FACETS + MULTI_FACETS}
+        self.sequence = sequence
+        self.built_at = time.monotonic()
+
+        slots = {facet: {} for facet in FACETS + MULTI_FACETS}
+        for slot, row in enumerate(rows):
+            question_id, facet_values, tags = row[0], row[1:-1], clean_tags(row[-1])
+            self.slot_ids.append(question_id)
+            self.slot_of[question_id] = slot
+            self.values.append((facet_values, tags))
+            for facet, value in zip(FACETS, facet_values):
+                if value is not None:
+                    slots[facet].setdefault(value, []).append(slot)
+            for tag in tags:
+                slots['tags'].setdefault(tag, []).append(slot)
+
+        for question_id, exam_type in exam_types:
+            slot = self.slot_of.get(question_id)
+            if slot is not None:
+                slots['exam_type'].setdefault(exam_type, []).append(slot)
+
+        for facet, facet_slots in slots.items():
+            for value, value_slots in facet_slots.items():
+                self.bitmaps[facet][value] = _bitmap(value_slots)
+        self.all = (1 << len(self.slot_ids)) - 1
+
+    @classmethod
+    def build(cls, sequence=0):
+        """Load the index with two flat queries"""
+        from apps.exams.models import ExamQuestion
+
+        rows = Question.objects.filter(is_active=True).order_by('id').values_list(*_FIELDS).iterator(chunk_size=5000)
+
+        # Question origin (past year, authored, ...) comes from the non-combined exams it belongs to
+        exam_types = ExamQuestion.objects.filter(
+            exam__is_combined=False
+        ).values_list('question_id', 'exam__exam_type_classification__slug').distinct()
+
+        return cls(rows, exam_types, sequence=sequence)
+
+    # Incremental maintenance
+
+    def _set(self, facet, value, bit):
+        bitmaps = self.bitmaps[facet]
+        bitmaps[value] = bitmaps.get(value, 0) | bit
+
+    def _clear(self, facet, value, bit):
+        bitmaps = self.bitmaps[facet]
+        remaining = bitmaps.get(value, 0) & ~bit
+        if remaining:
+            bitmaps[value] = remaining
+        else:
+            bitmaps.pop(value, None)
+
+    def remove(self, question_id):
+        """Drop a question; its slot stays as a hole"""
+        slot = self.slot_of.pop(question_id, None)
+        if slot is None:
+            return
+        bit = 1 << slot
+        facet_values, tags = self.values[slot]
+        for facet, value in zip(FACETS, facet_values):
+            if value is not None:
+                self._clear(facet, value, bit)
+        for tag in tags:
+            self._clear('tags', tag, bit)
+        for exam_type in list(self.bitmaps['exam_type']):
+            self._clear('exam_type', exam_type, bit)
+        self.all &= ~bit
+        self.slot_ids[slot] = None
+        self.values[slot] = ((), ())
+
+    def upsert(self, row):
+        """Index a new or edited question from one `_FIELDS` row"""
+        question_id, facet_values, tags = row[0], row[1:-1], clean_tags(row[-1])
+        slot = self.slot_of.get(question_id)
+
+        if slot is None:
+            slot = len(self.slot_ids)
+            self.slot_ids.append(question_id)
+            self.values.append(((), ()))
+            self.slot_of[question_id] = slot
+        bit = 1 << slot
+
+        # Exam membership is not part of the row and is kept as is
+        old_values, old_tags = self.values[slot]
+        for facet, value in zip(FACETS, old_values):
+            if value is not None:
+                self._clear(facet, value, bit)
+        for tag in old_tags:
+            self._clear('tags', tag, bit)
+
+        for facet, value in zip(FACETS, facet_values):
+            if value is not None:
+                self._set(facet, value, bit)
+        for tag in tags:
+            self._set('tags', tag, bit)
+
+        self.values[slot] = (facet_values, tags)
+        self.all |= bit
+
+    def refresh(self, question_ids):
+        """Re-read a few questions and patch them in"""
+        rows = {row[0]: row for row in Question.objects.filter(
+            id__in=question_ids, is_active=True
+        ).values_list(*_FIELDS)}
+        for question_id in question_ids:
+            if question_id in rows:
+                self.upsert(rows[question_id])
+            else:
+                self.remove(question_id)
+
+    # Queries
+
+    def match(self, filters, exclude=None, require=None):
+        """
+        Bitmap of questions matching `filters`
+        `filters` maps facet -> iterable of accepted values; values are ORed
+        within a facet and facets are ANDed. Empty or missing facets match all.
+        `exclude` maps facet -> values whose questions are removed (NOT).
+        `require` maps facet -> values that must all be present (AND), for
+        multi-valued facets such as tags.
+        """
+        result = self.all
+        for facet, values in filters.items():
+            values = [value for value in (values or []) if value not in (None, '')]
+            if not values:
+                continue
+            facet_bitmaps = self.bitmaps[facet]
+            accepted = 0
+            for value in values:
+                accepted |= facet_bitmaps.get(value, 0)
+            result &= accepted
+        for facet, values in (require or {}).items():
+            for value in values or []:
+                result &= self.bitmaps[facet].get(value, 0)
+        for facet, values in (exclude or {}).items():
+            for value in values or []:
+                result &= ~self.bitmaps[facet].get(value, 0)
+        return result
+
+    def count(self, bitmap):
+        return popcount(bitmap)
+
+    def facet_counts(self, filters, facets=None):
+        """
+        Match counts for every value of every facet in one call
+        Each facet is counted against the other facets' filters only, so
+        selected values keep showing their alternatives
+        """
+        counts = {}
+        for facet in facets or FACETS + MULTI_FACETS:
+            base = self.match({name: values for name, values in filters.items() if name != facet})
+            facet_counts = {}
+            for value, bitmap in self.bitmaps[facet].items():
+                count = popcount(base & bitmap)
+                if count:
+                    facet_counts[value] = count
+            counts[facet] = facet_counts
+        return counts
+
+    def question_ids(self, bitmap):
+        return [self.slot_ids[slot] for slot in iter_slots(bitmap)]
+
+    def sample(self, bitmap, k, rng=None):
+        """
+        `k` random question ids from `bitmap`
+        Dense bitmaps are sampled by probing random slots; sparse ones by
+        enumerating their set bits, so neither path scans the whole bank
+        """
+        rng = rng or random
+        available = popcount(bitmap)
+        if k >= available:
+            ids = self.question_ids(bitmap)
+            rng.shuffle(ids)
+            return ids
+
+        if available * 10 >= len(self.slot_ids):
+            picked = set()
+            size = len(self.slot_ids)
+            while len(picked) < k:
+                slot = rng.randrange(size)
+                if bitmap >> slot & 1:
+                    picked.add(slot)
+            slots = list(picked)
+            rng.shuffle(slots)
+        else:
+            slots = rng.sample(list(iter_slots(bitmap)), k)
+
+        return [self.slot_ids[slot] for slot in slots]
+
+
+_index = None
+_index_generation = None
+_index_lock = threading.Lock()
+_sequence = {'value': None, 'read_at': 0.0}
+
+
+def _change_key(sequence):
+    return f'question-index:change:{sequence}'
+
+
+def _current_sequence():
+    """Latest change-log sequence, re-read from the shared cache every few seconds"""
+    now = time.monotonic()
+    if _sequence['value'] is None or now - _sequence['read_at'] > SEQUENCE_LOCAL_TIMEOUT:
+        _sequence['value'] = cache.get(_SEQUENCE_KEY, 0)
+        _sequence['read_at'] = now
+    return _sequence['value']
+
+
+def log_question_change(question_id):
+    """Append a question save/delete to the shared change log"""
+    cache.add(_SEQUENCE_KEY, 0, None)
+    sequence = cache.incr(_SEQUENCE_KEY)
+    cache.set(_change_key(sequence), question_id, CHANGE_LOG_TIMEOUT)
+    _sequence['value'] = sequence
+    _sequence['read_at'] = time.monotonic()
+
+
+def _replay(index, target):
+    """Apply logged changes up to `target`; False when the log has a gap"""
+    if target - index.sequence > CHANGE_LOG_MAX_REPLAY:
+        return False
+
+    keys = [_change_key(sequence) for sequence in range(index.sequence + 1, target + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys):
+        return False
+
+    index.refresh(sorted(set(changes.values())))
+    index.sequence = target
+    return True
+
+
+def get_question_index():
+    """
+    Process-wide index
+    Rebuilt when the question-index generation changes (exam membership edits)
+    or it is older than INDEX_MAX_AGE; otherwise patched from the change log
+    """
+    global _index, _index_generation
+
+    generation = response_cache.generation(INDEX_NAMESPACE)
+    sequence = _current_sequence()
+    index = _index
+
+    if (index is not None and _index_generation == generation
+            and time.monotonic() - index.built_at < INDEX_MAX_AGE
+            and index.sequence >= sequence):
+        return index
+
+    with _index_lock:
+        index = _index
+        fresh = (index is not None and _index_generation == generation
+                 and time.monotonic() - index.built_at < INDEX_MAX_AGE)
+
+        if fresh and index.sequence < sequence and not _replay(index, sequence):
+            fresh = False
+
+        if not fresh:
+            # Changes logged while building are replayed on the next access
+            _index = QuestionFacetIndex.build(sequence=sequence)
+            _index_generation = generation
+
+        return _index
+
+
+def invalidate_question_index():
+    """Force every process to rebuild its index"""
+    response_cache.bump(INDEX_NAMESPACE)
@@ -0,0 +1,201 @@
+# medicalpromax_backend/apps/core/search.py
+"""
+Persian-aware full-text search over questions, options and explanations
+Text is normalized (Arabic letter variants, diacritics, ZWNJ, digits) on both
+the indexing and the query side, and stored in a SQLite FTS5 side index that
+ranks with BM25. The index file lives next to the app and is shared by all
+workers on the host; WAL mode lets searches run while a reindex writes.
+"""
+
+import re
+import sqlite3
+import threading
+
+from django.conf import settings
+
+from .models import Question, QuestionExplanation, QuestionOption
+
+
+# Weights for the question, options and explanation columns
+BM25_WEIGHTS = (3.0, 1.0, 1.5)
+MAX_RESULTS = 100
+REBUILD_CHUNK_SIZE = 2000
+
+FILTER_COLUMNS = (
+    'specialty_id', 'exam_level_id', 'subspecialty_id', 'course_id', 'chapter_id', 'topic_id', 'difficulty',
+)
+
+_CHARACTER_MAP = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه',
+    'أ': 'ا',
+    'إ': 'ا',
+    'ٱ': 'ا',
+    'ؤ': 'و',
+    '‌': ' ',  # ZWNJ: "می‌شود" matches both "می شود" and "می‌شود"
+    '‍': '',
+    'ـ': '',  # tatweel
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},  # Persian digits
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},  # Arabic digits
+})
+_DIACRITICS = re.compile('[ً-ٰٟۖ-ۭ]')
+_HTML_TAG = re.compile(r'<[^>]+>')
+_TOKEN = re.compile(r'\w+')
+
+
+def normalize_persian(text):
+    """Fold a text to the form used for indexing and matching"""
+    if not text:
+        return ''
+    text = _HTML_TAG.sub(' ', text)
+    text = _DIACRITICS.sub('', text.translate(_CHARACTER_MAP))
+    return ' '.join(text.lower().split())
+
+
+def tokenize(text):
+    return _TOKEN.findall(normalize_persian(text))
+
+
+_local = threading.local()
+
+
+def _connection():
+    """One SQLite connection per thread"""
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        path = getattr(settings, 'SEARCH_INDEX_PATH', settings.BASE_DIR / 'search_index.sqlite3')
+        connection = sqlite3.connect(str(path), timeout=10)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS question_fts USING fts5('
+            'question, options, explanation, '
+            + ', '.join(f'{column} UNINDEXED' for column in FILTER_COLUMNS)
+            + ", tokenize='unicode61 remove_diacritics 2')"
+        )
+        _local.connection = connection
+    return connection
+
+
+def _documents(questions):
+    """
+    Search documents for a list of question rows
+    Options and explanations are loaded with one query each
+    """
+    question_ids = [question['id'] for question in questions]
+
+    options = {}
+    for question_id, option_text in QuestionOption.objects.filter(
+        question_id__in=question_ids
+    ).order_by('question_id', 'option_number').values_list('question_id', 'option_text'):
+        options.setdefault(question_id, []).append(option_text)
+
+    explanations = {}
+    for row in QuestionExplanation.objects.filter(question_id__in=question_ids).values_list(
+        'question_id', 'explanation_text', 'wrong_options_notes', 'clinical_notes', 'exam_tips'
+    ):
+        explanations[row[0]] = ' '.join(part for part in row[1:] if part)
+
+    for question in questions:
+        yield (
+            question['id'],
+            normalize_persian(question['question_text']),
+            normalize_persian(' '.join(options.get(question['id'], []))),
+            normalize_persian(explanations.get(question['id'], '')),
+            *(question[column] for column in FILTER_COLUMNS),
+        )
+
+
+_QUESTION_FIELDS = ('id', 'question_text') + FILTER_COLUMNS
+_INSERT = (
+    'INSERT OR REPLACE INTO question_fts (rowid, question, options, explanation, '
+    + ', '.join(FILTER_COLUMNS) + ') VALUES (' + ', '.join('?' * (4 + len(FILTER_COLUMNS))) + ')'
+)
+
+
+def index_questions(question_ids):
+    """Reindex a few questions after an edit; inactive or deleted ones are dropped"""
+    question_ids = list(question_ids)
+    questions = list(Question.objects.filter(id__in=question_ids, is_active=True).values(*_QUESTION_FIELDS))
+
+    connection = _connection()
+    with connection:
+        connection.executemany(
+            'DELETE FROM question_fts WHERE rowid = ?',
+            [(question_id,) for question_id in question_ids]
+        )
+        connection.executemany(_INSERT, _documents(questions))
+
+
+def rebuild_index(chunk_size=REBUILD_CHUNK_SIZE):
+    """Rebuild the whole index in keyset-paged chunks; returns the number of questions"""
+    connection = _connection()
+    with connection:
+        connection.execute('DELETE FROM question_fts')
+
+    total = 0
+    last_id = 0
+    while True:
+        questions = list(
+            Question.objects.filter(id__gt=last_id, is_active=True).order_by('id').values(*_QUESTION_FIELDS)[:chunk_size]
+        )
+        if not questions:
+            break
+        with connection:
+            connection.executemany(_INSERT, _documents(questions))
+        total += len(questions)
+        last_id = questions[-1]['id']
+
+    with connection:
+        connection.execute("INSERT INTO question_fts(question_fts) VALUES ('optimize')")
+    return total
+
+
+def _match_expression(query):
+    """All query tokens must match; the last one also matches as a prefix"""
+    tokens = tokenize(query)
+    if not tokens:
+        return None
+    terms = ['"' + token.replace('"', '""') + '"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_questions(query, filters=None, limit=20, offset=0):
+    """
+    Ranked search results as {'total', 'results': [{id, score, snippet}]}
+    `filters` maps FILTER_COLUMNS names to a list of accepted values
+    """
+    expression = _match_expression(query)
+    if expression is None:
+        return {'total': 0, 'results': []}
+
+    where = ['question_fts MATCH ?']
+    params = [expression]
+    for column, values in (filters or {}).items():
+        values = [value for value in values or [] if value not in (None, '')]
+        if column in FILTER_COLUMNS and values:
+            where.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    where = ' AND '.join(where)
+
+    connection = _connection()
+    total = connection.execute(f'SELECT count(*) FROM question_fts WHERE {where}', params).fetchone()[0]
+    rows = connection.execute(
+        f"SELECT rowid, bm25(question_fts, {', '.join(map(str, BM25_WEIGHTS))}) AS score, "
+        f"snippet(question_fts, -1, '<mark>', '</mark>', '…', 16) "
+        f'FROM question_fts WHERE {where} ORDER BY score LIMIT ? OFFSET ?',
+        params + [min(limit, MAX_RESULTS), offset]
+    ).fetchall()
+
+    return {
+        'total': total,
+        'results': [
+            # bm25() is lower-is-better; flip it so clients can sort descending
+            {'id': rowid, 'score': round(-score, 4), 'snippet': snippet}
+            for rowid, score, snippet in rows
+        ],
+    }
@@ -0,0 +1,97 @@
+# medicalpromax_backend/apps/core/signals.py
+"""
+Signal handlers for core models
+Invalidate derived caches and cached responses when content changes
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .answer_keys import invalidate_answer_key
+from .cache import invalidate_resource
+from .explanations import invalidate_explanation
+from .importer import refresh_content_hash
+from .models import (
+    Specialty, ExamLevel, Subspecialty, Course, Chapter, Topic,
+    Question, QuestionOption, QuestionExplanation
+)
+from .navigation import invalidate_level
+from .question_index import log_question_change
+from .search import index_questions
+from .tags import sync_question_tags
+
+
+@receiver([post_save, post_delete], sender=QuestionOption)
+def question_option_changed(sender, instance, **kwargs):
+    invalidate_answer_key(instance.question_id)
+    refresh_content_hash(instance.question_id)
+
+
+@receiver([post_save, post_delete], sender=QuestionExplanation)
+def question_explanation_changed(sender, instance, **kwargs):
+    invalidate_explanation(instance.question_id)
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    invalidate_answer_key(instance.pk)
+    invalidate_explanation(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, **kwargs):
+    # Answer keys carry the question's topic
+    invalidate_answer_key(instance.pk)
+    sync_question_tags([(instance.pk, instance.tags)])
+    # Keeps questions edited in the admin deduplicated against imports
+    refresh_content_hash(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    # Published after commit so no worker replays the change against the old row
+    question_id = instance.pk
+    transaction.on_commit(lambda: log_question_change(question_id))
+
+
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=QuestionOption)
+@receiver([post_save, post_delete], sender=QuestionExplanation)
+def search_document_changed(sender, instance, **kwargs):
+    question_id = instance.pk if sender is Question else instance.question_id
+    transaction.on_commit(lambda: index_questions([question_id]))
+
+
+@receiver([post_save, post_delete], sender=Specialty)
+@receiver([post_save, post_delete], sender=ExamLevel)
+@receiver([post_save, post_delete], sender=Subspecialty)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Chapter)
+@receiver([post_save, post_delete], sender=Topic)
+def navigation_node_changed(sender, instance, **kwargs):
+    invalidate_level(sender)
+
+
+# Cached responses that embed each model, directly or through nesting
+RESPONSE_DEPENDENCIES = {
+    Specialty: ['specialties', 'exam_levels', 'courses'],
+    ExamLevel: ['exam_levels', 'courses'],
+    Subspecialty: ['subspecialties', 'courses'],
+    Course: ['courses', 'chapters'],
+    Chapter: ['chapters', 'topics'],
+    Topic: ['chapters', 'topics', 'questions'],
+    Question: ['questions'],
+    QuestionOption: ['questions'],
+    QuestionExplanation: ['questions'],
+}
+
+
+def content_changed(sender, instance, **kwargs):
+    for resource in RESPONSE_DEPENDENCIES[sender]:
+        invalidate_resource(resource)
+
+
+for model in RESPONSE_DEPENDENCIES:
+    post_save.connect(content_changed, sender=model, dispatch_uid=f'response-cache-{model.__name__}')
+    post_delete.connect(content_changed, sender=model, dispatch_uid=f'response-cache-delete-{model.__name__}')
@@ -0,0 +1,149 @@
+# medicalpromax_backend/apps/core/tags.py
+"""
+Normalized question tags
+Question.tags (a JSON list) stays the authoring format; Tag and QuestionTag
+mirror it as an indexed posting list so tag filters and tag counts are
+plain joins instead of JSON scans
+"""
+
+from django.db.models import Count, Exists, OuterRef
+
+from .models import Question, QuestionTag, Tag
+
+
+TAG_MAX_LENGTH = 100
+BACKFILL_CHUNK_SIZE = 2000
+TAG_ROLLUP_GROUPS = {'course': 'question__course_id', 'topic': 'question__topic_id'}
+
+
+def clean_tags(tags):
+    """Distinct, stripped tag names in a stable order"""
+    if not isinstance(tags, list):
+        return ()
+    return tuple(sorted({str(tag).strip()[:TAG_MAX_LENGTH] for tag in tags if str(tag).strip()}))
+
+
+def tag_list(value):
+    """Tag names from a comma separated query param or a list"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return list(clean_tags(list(value)))
+
+
+def _resolve(names, rows):
+    """
+    Map requested names onto (name, id) rows found by the database
+    The MySQL collation is case-insensitive, so a row may carry another
+    spelling of the name than the one asked for
+    """
+    rows = list(rows)
+    exact = dict(rows)
+    folded = {name.casefold(): tag_id for name, tag_id in rows}
+    resolved = {}
+    for name in names:
+        tag_id = exact.get(name, folded.get(name.casefold()))
+        if tag_id is not None:
+            resolved[name] = tag_id
+    return resolved
+
+
+def get_tag_ids(names):
+    """Tag ids by name, creating missing tags; names the database treats as equal share one tag"""
+    names = set(names)
+    if not names:
+        return {}
+    tag_ids = _resolve(names, Tag.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = names - set(tag_ids)
+    if missing:
+        Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+        tag_ids.update(_resolve(missing, Tag.objects.filter(name__in=missing).values_list('name', 'id')))
+        # Equal under the collation but not under casefold() (e.g. accents); let the database match
+        for name in names - set(tag_ids):
+            tag_ids[name] = Tag.objects.filter(name=name).values_list('id', flat=True).first()
+    return tag_ids
+
+
+def sync_question_tags(questions):
+    """
+    Bring the posting list of (question_id, tags) pairs in line with their tags
+    Only the difference is written
+    """
+    wanted = {question_id: set(clean_tags(tags)) for question_id, tags in questions}
+    if not wanted:
+        return
+
+    current = {question_id: {} for question_id in wanted}
+    for posting_id, question_id, tag_id in QuestionTag.objects.filter(
+        question_id__in=wanted
+    ).values_list('id', 'question_id', 'tag_id'):
+        current[question_id][tag_id] = posting_id
+
+    # Compared by tag id: spellings that share a tag are one posting
+    tag_ids = get_tag_ids(set().union(*wanted.values()))
+    stale = []
+    added = []
+    for question_id, names in wanted.items():
+        wanted_ids = {tag_ids[name] for name in names if tag_ids[name] is not None}
+        stale.extend(posting_id for tag_id, posting_id in current[question_id].items() if tag_id not in wanted_ids)
+        added.extend(
+            QuestionTag(question_id=question_id, tag_id=tag_id)
+            for tag_id in wanted_ids - set(current[question_id])
+        )
+
+    if stale:
+        QuestionTag.objects.filter(id__in=stale).delete()
+    if added:
+        QuestionTag.objects.bulk_create(added, ignore_conflicts=True)
+
+
+def backfill_question_tags(chunk_size=BACKFILL_CHUNK_SIZE):
+    """Sync the posting list for every question; returns the number of questions"""
+    total = 0
+    last_id = 0
+    while True:
+        rows = list(Question.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'tags')[:chunk_size])
+        if not rows:
+            break
+        sync_question_tags(rows)
+        total += len(rows)
+        last_id = rows[-1][0]
+    return total
+
+
+def filter_by_tags(queryset, all_tags=None, any_tags=None, no_tags=None):
+    """
+    Narrow a Question queryset by tag
+    `all_tags` must all be present (AND), at least one of `any_tags` (OR),
+    and none of `no_tags` (NOT)
+    """
+    for name in all_tags or []:
+        queryset = queryset.filter(Exists(QuestionTag.objects.filter(question_id=OuterRef('pk'), tag__name=name)))
+    if any_tags:
+        queryset = queryset.filter(Exists(QuestionTag.objects.filter(question_id=OuterRef('pk'), tag__name__in=any_tags)))
+    if no_tags:
+        queryset = queryset.exclude(Exists(QuestionTag.objects.filter(question_id=OuterRef('pk'), tag__name__in=no_tags)))
+    return queryset
+
+
+def tag_frequencies(group_by='course', course_id=None, topic_id=None, limit=None):
+    """
+    Active-question counts per tag, grouped by course or topic
+    Returns {group_id: [{'tag', 'count'}, ...]} with the most used tags first
+    """
+    group_field = TAG_ROLLUP_GROUPS[group_by]
+    queryset = QuestionTag.objects.filter(question__is_active=True, **{f'{group_field}__isnull': False})
+    if course_id is not None:
+        queryset = queryset.filter(question__course_id=course_id)
+    if topic_id is not None:
+        queryset = queryset.filter(question__topic_id=topic_id)
+
+    rows = queryset.values(group_field, 'tag__name').annotate(count=Count('id')).order_by(group_field, '-count', 'tag__name')
+
+    rollups = {}
+    for row in rows:
+        tags = rollups.setdefault(row[group_field], [])
+        if limit is None or len(tags) < limit:
+            tags.append({'tag': row['tag__name'], 'count': row['count']})
+    return rollups
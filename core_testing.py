@@ -0,0 +1,64 @@
+# medicalpromax_backend/apps/core/testing.py
+"""
+Query-budget helpers for tests
+
+    class SubmitAnswerTests(QueryBudgetMixin, APITestCase):
+        def test_submit_stays_within_budget(self):
+            self.assertViewWithinBudget('post', url, data, format='json')
+
+        def test_course_list(self):
+            with self.assertQueryBudget(6, 'course list'):
+                self.client.get('/api/courses/')
+
+assertViewWithinBudget uses the query_budget declared on the view the URL
+resolves to, so the budget lives next to the view it guards.
+"""
+
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from .metrics import QueryBudgetExceeded
+
+
+def _describe(queries, limit=20):
+    lines = [f"  {index}. {query['sql']}" for index, query in enumerate(queries[:limit], start=1)]
+    if len(queries) > limit:
+        lines.append(f'  ... {len(queries) - limit} more')
+    return '\n'.join(lines)
+
+
+@contextmanager
+def query_budget(max_queries, label='block'):
+    """Fail with the captured SQL when the block runs more than `max_queries` queries"""
+    with CaptureQueriesContext(connection) as captured:
+        yield captured
+    if len(captured) > max_queries:
+        raise QueryBudgetExceeded(
+            f'{label} ran {len(captured)} queries, budget is {max_queries}:\n{_describe(captured.captured_queries)}'
+        )
+
+
+def declared_budget(path):
+    """query_budget of the view serving `path`, or None"""
+    func = resolve(path.split('?')[0]).func
+    view_class = getattr(func, 'view_class', None) or getattr(func, 'cls', None)
+    return getattr(view_class, 'query_budget', None)
+
+
+class QueryBudgetMixin:
+    """TestCase mixin with query budget assertions"""
+
+    def assertQueryBudget(self, max_queries, label='block'):
+        return query_budget(max_queries, label)
+
+    def assertViewWithinBudget(self, method, path, *args, **kwargs):
+        """Request `path` and check it against the budget declared on its view"""
+        budget = declared_budget(path)
+        if budget is None:
+            self.fail(f'The view for {path} declares no query_budget')
+        with query_budget(budget, f'{method.upper()} {path}'):
+            response = getattr(self.client, method)(path, *args, **kwargs)
+        return response
@@ -7,7 +7,10 @@ Navigation: Specialties, Exam Levels, Subspecialties, Courses
 from rest_framework import generics, viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser
+from django.conf import settings
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 
 from .models import Specialty, ExamLevel, Subspecialty, Course, Chapter, Topic, Question
@@ -15,9 +18,17 @@ from .serializers import (
     SpecialtySerializer, ExamLevelSerializer, SubspecialtySerializer,
     CourseSerializer, ChapterSerializer, TopicSerializer, QuestionSerializer
 )
+from .cache import CachedResponseMixin
+from .exports import EXPORT_FORMATS, QUESTION_COLUMNS, QUESTION_FILTERS, export_filters, question_export_chunks, stream_response
+from .fast_serializers import FastListMixin, assemble_courses, assemble_questions, course_values, question_values
+from .importer import IMPORT_CHUNK_SIZE, ImportFormatError, detect_format, import_questions, read_rows
+from .navigation import find_subtree, get_navigation_tree
+from .question_index import FACETS, INTEGER_FACETS, MULTI_FACETS, get_question_index
+from .search import FILTER_COLUMNS, MAX_RESULTS, search_questions
+from .tags import TAG_ROLLUP_GROUPS, filter_by_tags, tag_frequencies, tag_list
 
 
-class SpecialtyListView(generics.ListAPIView):
+class SpecialtyListView(CachedResponseMixin, generics.ListAPIView):
     """
     GET /api/specialties/
     Returns all active specialties
@@ -25,16 +36,18 @@ class SpecialtyListView(generics.ListAPIView):
     queryset = Specialty.objects.filter(is_active=True)
     serializer_class = SpecialtySerializer
     permission_classes = [AllowAny]
+    cache_resource = 'specialties'
     pagination_class = None
 
 
-class ExamLevelListView(generics.ListAPIView):
+class ExamLevelListView(CachedResponseMixin, generics.ListAPIView):
     """
     GET /api/specialties/{specialty_slug}/exam-levels/
     Returns exam levels for a specific specialty
     """
     serializer_class = ExamLevelSerializer
     permission_classes = [AllowAny]
+    cache_resource = 'exam_levels'
     pagination_class = None
     
     def get_queryset(self):
@@ -45,13 +58,14 @@ class ExamLevelListView(generics.ListAPIView):
         ).select_related('specialty')
 
 
-class SubspecialtyListView(generics.ListAPIView):
+class SubspecialtyListView(CachedResponseMixin, generics.ListAPIView):
     """
     GET /api/exam-levels/{level_slug}/subspecialties/?specialty=medicine
     Returns subspecialties for a specific exam level
     """
     serializer_class = SubspecialtySerializer
     permission_classes = [AllowAny]
+    cache_resource = 'subspecialties'
     pagination_class = None
     
     def get_queryset(self):
@@ -65,13 +79,42 @@ class SubspecialtyListView(generics.ListAPIView):
         ).select_related('specialty', 'exam_level')
 
 
-class CourseListView(generics.ListAPIView):
+class NavigationTreeView(generics.GenericAPIView):
+    """
+    GET /api/navigation/tree/?specialty=medicine&exam_level=board_promotion&subspecialty=infectious&course=harrison
+    Returns the whole Specialty > ExamLevel > Subspecialty > Course > Chapter > Topic
+    hierarchy in one response, or the subtree under the given slugs
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        tree = get_navigation_tree()
+        node = find_subtree(
+            tree,
+            specialty=request.query_params.get('specialty'),
+            exam_level=request.query_params.get('exam_level'),
+            subspecialty=request.query_params.get('subspecialty'),
+            course=request.query_params.get('course'),
+        )
+        
+        if node is None:
+            return Response({'error': 'Navigation node not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response(node)
+
+
+class CourseListView(CachedResponseMixin, FastListMixin, generics.ListAPIView):
     """
     GET /api/courses/?specialty_id=1&exam_level_id=3&subspecialty_id=1
     Returns courses filtered by specialty, exam level, and subspecialty
+    Rendered through the values() fast path; output matches CourseSerializer
     """
     serializer_class = CourseSerializer
     permission_classes = [AllowAny]
+    query_budget = 6
+    cache_resource = 'courses'
+    fast_values = staticmethod(course_values)
+    fast_assemble = staticmethod(assemble_courses)
     
     def get_queryset(self):
         specialty_id = self.request.query_params.get('specialty_id')
@@ -90,27 +133,35 @@ class CourseListView(generics.ListAPIView):
         return queryset.select_related('specialty', 'exam_level', 'subspecialty')
 
 
-class CourseDetailView(generics.RetrieveAPIView):
+class CourseDetailView(CachedResponseMixin, generics.RetrieveAPIView):
     """
     GET /api/courses/{course_slug}/
     Returns course details with chapters and topics
     """
     serializer_class = CourseSerializer
     permission_classes = [AllowAny]
+    cache_resource = 'courses'
     lookup_field = 'slug'
     lookup_url_kwarg = 'course_slug'
     
     def get_queryset(self):
         return Course.objects.filter(is_active=True).select_related('specialty', 'exam_level', 'subspecialty')
+    
+    def retrieve(self, request, *args, **kwargs):
+        rows = list(course_values(self.get_queryset().filter(slug=self.kwargs[self.lookup_url_kwarg])))
+        if not rows:
+            raise Http404
+        return Response(assemble_courses(rows)[0])
 
 
-class ChapterListView(generics.ListAPIView):
+class ChapterListView(CachedResponseMixin, generics.ListAPIView):
     """
     GET /api/courses/{course_slug}/chapters/
     Returns chapters for a specific course
     """
     serializer_class = ChapterSerializer
     permission_classes = [AllowAny]
+    cache_resource = 'chapters'
     
     def get_queryset(self):
         course_slug = self.kwargs.get('course_slug')
@@ -118,13 +169,14 @@ class ChapterListView(generics.ListAPIView):
         return Chapter.objects.filter(course=course, is_active=True)
 
 
-class TopicListView(generics.ListAPIView):
+class TopicListView(CachedResponseMixin, generics.ListAPIView):
     """
     GET /api/chapters/{chapter_slug}/topics/
     Returns topics for a specific chapter
     """
     serializer_class = TopicSerializer
     permission_classes = [AllowAny]
+    cache_resource = 'topics'
     
     def get_queryset(self):
         chapter_slug = self.kwargs.get('chapter_slug')
@@ -167,15 +219,175 @@ class TopicDetailView(generics.RetrieveAPIView):
         return Response(data)
 
 
-class TopicQuestionsView(generics.ListAPIView):
+class TopicQuestionsView(CachedResponseMixin, FastListMixin, generics.ListAPIView):
     """
-    GET /api/topics/{topic_id}/questions/
+    GET /api/topics/{topic_id}/questions/?tags=sepsis,icu&tags_any=a,b&tags_not=pediatric
     Returns questions for a specific topic
+    tags: all must be present, tags_any: at least one, tags_not: none of them
+    Rendered through the values() fast path; output matches QuestionSerializer
     """
     serializer_class = QuestionSerializer
     permission_classes = [AllowAny]
+    query_budget = 6
+    cache_resource = 'questions'
+    fast_values = staticmethod(question_values)
+    fast_assemble = staticmethod(assemble_questions)
     
     def get_queryset(self):
         topic_id = self.kwargs.get('topic_id')
         topic = get_object_or_404(Topic, id=topic_id, is_active=True)
-        return Question.objects.filter(topic=topic, is_active=True).prefetch_related('options', 'explanation')
\ No newline at end of file
+        params = self.request.query_params
+        queryset = filter_by_tags(
+            Question.objects.filter(topic=topic, is_active=True),
+            all_tags=tag_list(params.get('tags')),
+            any_tags=tag_list(params.get('tags_any')),
+            no_tags=tag_list(params.get('tags_not')),
+        )
+        return queryset.prefetch_related('options', 'explanation')
+
+
+class QuestionFacetCountsView(generics.GenericAPIView):
+    """
+    GET /api/questions/facets/?course=1&chapter=4&difficulty=hard&source_year=1402&tags=sepsis
+    Returns the number of matching active questions and the count for every
+    value of every facet, from the in-memory facet index
+    Multiple values of one facet are comma separated and ORed
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        filters = {}
+        for facet in FACETS + MULTI_FACETS:
+            values = [value for value in request.query_params.get(facet, '').split(',') if value]
+            if facet in INTEGER_FACETS:
+                try:
+                    values = [int(value) for value in values]
+                except ValueError:
+                    return Response({'error': f'{facet} must be a list of numbers'}, status=status.HTTP_400_BAD_REQUEST)
+            if values:
+                filters[facet] = values
+        
+        index = get_question_index()
+        return Response({
+            'total': index.count(index.match(filters)),
+            'facets': index.facet_counts(filters),
+        })
+
+
+class TagFrequencyView(CachedResponseMixin, generics.ListAPIView):
+    """
+    GET /api/tags/frequencies/?group_by=topic&course=3&limit=20
+    Active-question counts per tag, rolled up per course (default) or topic
+    Response: {group_by, rollups: {group_id: [{tag, count}]}}
+    """
+    permission_classes = [AllowAny]
+    cache_resource = 'questions'
+    
+    def list(self, request, *args, **kwargs):
+        group_by = request.query_params.get('group_by', 'course')
+        if group_by not in TAG_ROLLUP_GROUPS:
+            return Response({'error': f"group_by must be one of {', '.join(TAG_ROLLUP_GROUPS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            filters = {
+                name: int(request.query_params[param])
+                for param, name in (('course', 'course_id'), ('topic', 'topic_id'), ('limit', 'limit'))
+                if request.query_params.get(param)
+            }
+        except ValueError:
+            return Response({'error': 'course, topic and limit must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'group_by': group_by, 'rollups': tag_frequencies(group_by, **filters)})
+
+
+class QuestionSearchView(generics.GenericAPIView):
+    """
+    GET /api/questions/search/?q=پنومونی&course=3&difficulty=hard&limit=20&offset=0
+    Full-text search over question text, options and explanations
+    Persian and Arabic spellings, diacritics, ZWNJ and digit forms all match
+    Returns {'total', 'results': [{id, score, snippet}]} ranked by BM25
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        filters = {}
+        for column in FILTER_COLUMNS:
+            facet = column[:-3] if column.endswith('_id') else column
+            values = [value for value in request.query_params.get(facet, '').split(',') if value]
+            if facet in INTEGER_FACETS:
+                try:
+                    values = [int(value) for value in values]
+                except ValueError:
+                    return Response({'error': f'{facet} must be a list of numbers'}, status=status.HTTP_400_BAD_REQUEST)
+            if values:
+                filters[column] = values
+        
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), MAX_RESULTS)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({'error': 'limit and offset must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(search_questions(query, filters, limit=limit, offset=offset))
+
+
+class QuestionImportView(generics.GenericAPIView):
+    """
+    POST /api/questions/import/
+    Multipart upload: file (CSV, JSON / JSON Lines or XLSX), optional format and dry_run
+    Rows are imported in chunks; duplicates of existing questions are skipped
+    Returns {'rows', 'created', 'duplicates', 'errors', 'error_details'}
+    The import runs inside the request, so uploads are capped at
+    QUESTION_IMPORT_MAX_UPLOAD_BYTES; larger banks go through the import_questions command
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+    
+    MAX_UPLOAD_BYTES = getattr(settings, 'QUESTION_IMPORT_MAX_UPLOAD_BYTES', 5 * 1024 * 1024)
+    
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if upload.size > self.MAX_UPLOAD_BYTES:
+            return Response(
+                {'error': f'Files over {self.MAX_UPLOAD_BYTES // (1024 * 1024)} MB must be imported '
+                          'with "python manage.py import_questions"'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        
+        fmt = request.data.get('format') or detect_format(upload.name)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        try:
+            report = import_questions(read_rows(upload.file, fmt), chunk_size=IMPORT_CHUNK_SIZE, dry_run=dry_run)
+        except ImportFormatError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        response_status = status.HTTP_200_OK if dry_run or not report.created else status.HTTP_201_CREATED
+        return Response({'dry_run': dry_run, **report.as_dict()}, status=response_status)
+
+
+class QuestionExportView(generics.GenericAPIView):
+    """
+    GET /api/questions/export/?output=csv&course=3&date_from=2024-01-01&date_to=2024-12-31
+    Stream questions with options and explanations as NDJSON (default) or CSV
+    Filters: specialty, exam_level, subspecialty, course, chapter, topic (ids), date range on created_at
+    The output can be fed back to POST /api/questions/import/
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        fmt = request.query_params.get('output', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return Response({'error': f"output must be one of {', '.join(EXPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            filters = export_filters(request.query_params, QUESTION_FILTERS, 'created_at')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        chunks = question_export_chunks(filters, flat=fmt == 'csv')
+        return stream_response(chunks, fmt, QUESTION_COLUMNS, 'questions')
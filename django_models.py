@@ -237,6 +237,10 @@ class Question(models.Model):
     source = models.CharField(max_length=300, blank=True, null=True)
     source_year = models.IntegerField(blank=True, null=True)
     
+    # Normalized question + options digest used to skip duplicates on import
+    # Kept up to date on edits by apps.core.signals; empty on a duplicate question
+    content_hash = models.CharField(max_length=64, blank=True, null=True, unique=True)
+    
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -298,4 +302,39 @@ class QuestionExplanation(models.Model):
         verbose_name_plural = 'توضیح‌های سوال'
     
     def __str__(self):
-        return f"Explanation for Q{self.question.id}"
\ No newline at end of file
+        return f"Explanation for Q{self.question.id}"
+
+class Tag(models.Model):
+    """Normalized question tag"""
+    
+    name = models.CharField(max_length=100, unique=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'tags'
+        ordering = ['name']
+        verbose_name = 'برچسب'
+        verbose_name_plural = 'برچسب‌ها'
+    
+    def __str__(self):
+        return self.name
+
+
+class QuestionTag(models.Model):
+    """Question-tag posting list, kept in sync with Question.tags"""
+    
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='question_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='question_tags')
+    
+    class Meta:
+        db_table = 'question_tags'
+        unique_together = ['question', 'tag']
+        indexes = [
+            models.Index(fields=['tag', 'question']),
+        ]
+        verbose_name = 'برچسب سوال'
+        verbose_name_plural = 'برچسب‌های سوال'
+    
+    def __str__(self):
+        return f"Q{self.question_id} - {self.tag_id}"
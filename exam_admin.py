@@ -0,0 +1,41 @@
+# medicalpromax_backend/apps/exams/admin.py
+"""
+Admin for exam models: read-only item analysis with review flags
+"""
+
+from django.contrib import admin
+
+from .models import QuestionItemStats
+
+
+# Items outside these bounds are worth a content review
+REVIEW_MIN_DISCRIMINATION = 0.2
+REVIEW_DIFFICULTY_RANGE = (0.2, 0.9)
+
+
+@admin.register(QuestionItemStats)
+class QuestionItemStatsAdmin(admin.ModelAdmin):
+    """Read-only item analysis, written by the analyze_items command"""
+    
+    list_display = (
+        'question_id', 'exam', 'examinees', 'responses', 'difficulty_index', 'discrimination',
+        'mean_time_seconds', 'needs_review', 'computed_at',
+    )
+    list_filter = ('exam',)
+    list_select_related = ('exam',)
+    search_fields = ('question__question_text', 'exam__title')
+    ordering = ('exam', 'discrimination')
+    readonly_fields = [field.name for field in QuestionItemStats._meta.fields]
+    
+    @admin.display(boolean=True, description='Needs review')
+    def needs_review(self, obj):
+        if obj.difficulty_index is None:
+            return None
+        low, high = REVIEW_DIFFICULTY_RANGE
+        return (
+            not low <= obj.difficulty_index <= high
+            or (obj.discrimination is not None and obj.discrimination < REVIEW_MIN_DISCRIMINATION)
+        )
+    
+    def has_add_permission(self, request):
+        return False
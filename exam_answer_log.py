@@ -0,0 +1,255 @@
+# medicalpromax_backend/apps/exams/answer_log.py
+"""
+Write-behind answer log
+With EXAM_ANSWER_LOG_ENABLED, a submitted answer is validated against the exam
+paper and the answer-key cache, appended to a local SQLite log (WAL,
+synchronous=FULL, so it is on disk before the request is acknowledged) and
+applied to UserAnswer / UserExamAttempt later, in batches, by the
+apply_answer_log worker. The log is shared by the workers of one host.
+
+Reads merge the attempt's unapplied tail, so a user always sees their own
+answers. Completing an exam or submitting a batch drains the attempt's tail
+first. Every attempt stores the last log sequence applied to it in the same
+transaction as the answers, so replaying the log after a crash skips entries
+that were already applied. Entries that fail to apply are logged and set aside
+(applied = -1) so the rest of the log keeps moving.
+"""
+
+from collections import OrderedDict
+import logging
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .grading import GRADED_STATUSES, regrade_attempts
+from .mastery import MasteryDelta, apply_mastery
+from .models import UserAnswer, UserExamAttempt
+from .scoring import refresh_attempt_counters, upsert_answers
+from .timeouts import grace_period
+from apps.core.answer_keys import get_answer_keys
+
+
+ANSWER_LOG_ENABLED = getattr(settings, 'EXAM_ANSWER_LOG_ENABLED', False)
+APPLY_BATCH_SIZE = 500
+PRUNE_AFTER_SECONDS = 60 * 60
+APPLIED = 1
+FAILED = -1
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def _connection():
+    """One SQLite connection per thread"""
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        path = getattr(settings, 'EXAM_ANSWER_LOG_PATH', settings.BASE_DIR / 'answer_log.sqlite3')
+        connection = sqlite3.connect(str(path), timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=FULL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS answer_log ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, attempt_id INTEGER NOT NULL, question_id INTEGER NOT NULL, '
+            'selected_option_id INTEGER, is_correct INTEGER NOT NULL, time_spent_seconds INTEGER NOT NULL, '
+            'logged_at REAL NOT NULL, applied INTEGER NOT NULL DEFAULT 0)'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS answer_log_pending ON answer_log (applied, attempt_id, seq)')
+        _local.connection = connection
+    return connection
+
+
+def append_answer(attempt_id, question_id, selected_option_id, is_correct, time_spent_seconds):
+    """Durably append a validated answer; returns its sequence number"""
+    connection = _connection()
+    with connection:
+        cursor = connection.execute(
+            'INSERT INTO answer_log (attempt_id, question_id, selected_option_id, is_correct, time_spent_seconds, logged_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (attempt_id, question_id, selected_option_id, int(is_correct), time_spent_seconds, time.time())
+        )
+    return cursor.lastrowid
+
+
+def pending_entries(attempt_id):
+    """Unapplied (seq, question_id, selected_option_id, is_correct, time_spent_seconds, logged_at) of an attempt"""
+    return _connection().execute(
+        'SELECT seq, question_id, selected_option_id, is_correct, time_spent_seconds, logged_at FROM answer_log '
+        'WHERE applied = 0 AND attempt_id = ? ORDER BY seq',
+        (attempt_id,)
+    ).fetchall()
+
+
+def mark_applied(seqs, state=APPLIED):
+    connection = _connection()
+    seqs = list(seqs)
+    with connection:
+        for start in range(0, len(seqs), APPLY_BATCH_SIZE):
+            chunk = seqs[start:start + APPLY_BATCH_SIZE]
+            connection.execute(
+                f"UPDATE answer_log SET applied = ? WHERE seq IN ({', '.join('?' * len(chunk))})", [state, *chunk]
+            )
+
+
+def prune_applied(older_than=PRUNE_AFTER_SECONDS):
+    connection = _connection()
+    with connection:
+        return connection.execute(
+            'DELETE FROM answer_log WHERE applied = ? AND logged_at < ?', (APPLIED, time.time() - older_than)
+        ).rowcount
+
+
+def _latest(entries):
+    """Last entry per question, in log order, and the summed time of all entries"""
+    latest = OrderedDict()
+    time_spent_total = 0
+    for _, question_id, selected_option_id, is_correct, time_spent_seconds, _ in entries:
+        latest.pop(question_id, None)
+        latest[question_id] = (selected_option_id, bool(is_correct), time_spent_seconds)
+        time_spent_total += time_spent_seconds
+    return latest, time_spent_total
+
+
+# Reads
+
+def merge_pending(attempt, paper=None):
+    """
+    Fold the attempt's unapplied answers into its in-memory counters (not saved)
+    With the exam `paper` the next-question cursor is moved past them as well
+    """
+    entries = [entry for entry in pending_entries(attempt.pk) if entry[0] > attempt.answer_log_seq]
+    if not entries:
+        return attempt
+
+    latest, time_spent_total = _latest(entries)
+    stored = dict(UserAnswer.objects.filter(attempt_id=attempt.pk).values_list('question_id', 'is_correct'))
+
+    for question_id, (_, is_correct, _) in latest.items():
+        if question_id in stored:
+            was_correct = bool(stored[question_id])
+            attempt.correct_answers += int(is_correct) - int(was_correct)
+            attempt.wrong_answers += int(not is_correct) - int(not was_correct)
+        else:
+            attempt.answered_count += 1
+            attempt.correct_answers += int(is_correct)
+            attempt.wrong_answers += int(not is_correct)
+    attempt.unanswered = attempt.total_questions - attempt.answered_count
+    attempt.time_spent_seconds += time_spent_total
+
+    if paper is not None:
+        answered = stored.keys() | latest.keys()
+        attempt.next_question_order = next(
+            (order for order in sorted(paper['orders']) if paper['orders'][order] not in answered), None
+        )
+    return attempt
+
+
+# Applying
+
+def _apply(attempt, entries):
+    """
+    Apply log entries to an attempt locked with select_for_update()
+    Entries at or below attempt.answer_log_seq were applied before and are skipped,
+    as are entries logged after a graded attempt was closed (for a timeout, after the grace period)
+    """
+    entries = [entry for entry in entries if entry[0] > attempt.answer_log_seq]
+    if attempt.status == 'timeout' and attempt.deadline_at:
+        # Submits are accepted until the grace period ends, so answers logged in it still count
+        closed_at = (attempt.deadline_at + grace_period()).timestamp()
+        entries = [entry for entry in entries if entry[5] <= closed_at]
+    elif attempt.status in GRADED_STATUSES and attempt.completed_at:
+        # A submit that passed its status check while the attempt was being completed
+        # must not change the score the user was already shown
+        closed_at = attempt.completed_at.timestamp()
+        entries = [entry for entry in entries if entry[5] <= closed_at]
+    if not entries:
+        return
+
+    latest, time_spent_total = _latest(entries)
+    answer_keys = get_answer_keys(list(latest))
+    previous = dict(UserAnswer.objects.filter(
+        attempt_id=attempt.pk, question_id__in=list(latest)
+    ).values_list('question_id', 'is_correct'))
+
+    answers = []
+    mastery = {}
+    for question_id, (selected_option_id, is_correct, time_spent_seconds) in latest.items():
+        answers.append(UserAnswer(
+            attempt=attempt,
+            question_id=question_id,
+            selected_option_id=selected_option_id,
+            is_correct=is_correct,
+            time_spent_seconds=time_spent_seconds,
+        ))
+        if question_id in answer_keys:
+            mastery.setdefault(answer_keys[question_id]['topic'], MasteryDelta()).add(
+                is_correct,
+                new=question_id not in previous,
+                was_correct=bool(previous.get(question_id)),
+            )
+
+    upsert_answers(answers)
+    refresh_attempt_counters(attempt)
+    attempt.answer_log_seq = entries[-1][0]
+    attempt.time_spent_seconds += time_spent_total
+    UserExamAttempt.objects.filter(pk=attempt.pk).update(
+        time_spent_seconds=F('time_spent_seconds') + time_spent_total,
+        answer_log_seq=attempt.answer_log_seq,
+    )
+    apply_mastery(attempt.user_id, mastery)
+
+    # Answers logged before the deadline may land after the timeout sweep graded the attempt
+    if attempt.status in GRADED_STATUSES:
+        regrade_attempts(UserExamAttempt.objects.filter(pk=attempt.pk), resync=False)
+
+
+def drain_attempt(attempt):
+    """
+    Apply an attempt's unapplied answers now
+    Must run inside transaction.atomic() with `attempt` locked by select_for_update()
+    """
+    entries = pending_entries(attempt.pk)
+    if not entries:
+        return
+    _apply(attempt, entries)
+    seqs = [entry[0] for entry in entries]
+    transaction.on_commit(lambda: mark_applied(seqs))
+
+
+def apply_pending(batch_size=APPLY_BATCH_SIZE):
+    """
+    Apply the oldest unapplied entries, one transaction per attempt
+    Returns the number of log entries processed
+    """
+    rows = _connection().execute(
+        'SELECT seq, attempt_id, question_id, selected_option_id, is_correct, time_spent_seconds, logged_at '
+        'FROM answer_log WHERE applied = 0 ORDER BY seq LIMIT ?',
+        (batch_size,)
+    ).fetchall()
+    if not rows:
+        return 0
+
+    by_attempt = OrderedDict()
+    for seq, attempt_id, *entry in rows:
+        by_attempt.setdefault(attempt_id, []).append((seq, *entry))
+
+    for attempt_id, entries in by_attempt.items():
+        seqs = [entry[0] for entry in entries]
+        try:
+            with transaction.atomic():
+                attempt = UserExamAttempt.objects.select_for_update().filter(pk=attempt_id).first()
+                # Entries of deleted attempts have nothing to apply to
+                if attempt is not None:
+                    _apply(attempt, entries)
+        except Exception:
+            # e.g. a question deleted after its answer was logged; one attempt must not stall the log
+            logger.exception('Answer log entries %s-%s of attempt %s failed to apply', seqs[0], seqs[-1], attempt_id)
+            mark_applied(seqs, state=FAILED)
+            continue
+        mark_applied(seqs)
+
+    return len(rows)
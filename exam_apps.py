@@ -0,0 +1,14 @@
+# medicalpromax_backend/apps/exams/apps.py
+"""
+App configuration for exams
+"""
+
+from django.apps import AppConfig
+
+
+class ExamsConfig(AppConfig):
+    name = 'apps.exams'
+    verbose_name = 'آزمون‌ها'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,418 @@
+# medicalpromax_backend/apps/exams/benchmark.py
+"""
+End-to-end load benchmark for the exam-taking flow
+Seeds a synthetic question bank and drives simulated students through the
+real URL routes (register, login, start, N answers, complete, results) with
+the Django test client in threads, recording latency and query counts per
+endpoint. Reports are plain JSON so runs can be compared between commits.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+import json
+import math
+import random
+import subprocess
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from django.test import Client
+
+from .models import Exam, ExamQuestion, ExamTypeClassification
+from apps.core.cache import invalidate_resource
+from apps.core.models import (
+    Specialty, ExamLevel, Subspecialty, Course, Chapter, Topic,
+    Question, QuestionOption, QuestionExplanation
+)
+from apps.core.navigation import invalidate_level
+from apps.core.question_index import invalidate_question_index
+
+
+BENCH_PREFIX = 'bench'
+BENCH_PASSWORD = 'BenchPassword123!'
+SEED_CHUNK_SIZE = 2000
+DIFFICULTIES = ('easy', 'medium', 'hard')
+ENDPOINTS = ('register', 'login', 'start', 'submit_answer', 'complete', 'results')
+
+
+# Seeding
+
+def _bulk(model, objects, chunk_size=SEED_CHUNK_SIZE):
+    for start in range(0, len(objects), chunk_size):
+        model.objects.bulk_create(objects[start:start + chunk_size])
+
+
+def _seed_hierarchy(subspecialties, courses_per_subspecialty, chapters_per_course, topics_per_chapter):
+    """Specialty > exam level > subspecialties > courses > chapters > topics; returns the topic rows"""
+    specialty = Specialty.objects.create(slug=f'{BENCH_PREFIX}-medicine', name_fa='پزشکی (بنچمارک)', name_en='Bench medicine')
+    exam_level = ExamLevel.objects.create(specialty=specialty, slug=f'{BENCH_PREFIX}-board', name_fa='بورد (بنچمارک)')
+
+    _bulk(Subspecialty, [
+        Subspecialty(specialty=specialty, exam_level=exam_level, slug=f'{BENCH_PREFIX}-sub-{i}', name_fa=f'زیرتخصص {i}')
+        for i in range(subspecialties)
+    ])
+    subspecialty_ids = list(Subspecialty.objects.filter(exam_level=exam_level).values_list('id', flat=True))
+
+    _bulk(Course, [
+        Course(
+            specialty=specialty, exam_level=exam_level, subspecialty_id=subspecialty_id,
+            slug=f'{BENCH_PREFIX}-course-{subspecialty_id}-{i}', name_fa=f'درس {i}',
+        )
+        for subspecialty_id in subspecialty_ids
+        for i in range(courses_per_subspecialty)
+    ])
+    course_ids = list(Course.objects.filter(exam_level=exam_level).values_list('id', flat=True))
+
+    _bulk(Chapter, [
+        Chapter(course_id=course_id, slug=f'chapter-{i}', name_fa=f'فصل {i}', chapter_number=i + 1)
+        for course_id in course_ids
+        for i in range(chapters_per_course)
+    ])
+    chapter_ids = list(Chapter.objects.filter(course_id__in=course_ids).values_list('id', flat=True))
+
+    _bulk(Topic, [
+        Topic(chapter_id=chapter_id, slug=f'topic-{i}', name_fa=f'موضوع {i}')
+        for chapter_id in chapter_ids
+        for i in range(topics_per_chapter)
+    ])
+    return list(Topic.objects.filter(chapter_id__in=chapter_ids).values(
+        'id', 'chapter_id', 'chapter__course_id', 'chapter__course__subspecialty_id'
+    )), specialty, exam_level
+
+
+def _seed_questions(count, topics, specialty, exam_level, rng, chunk_size, log):
+    """Questions with four options and an explanation each; returns the new question ids"""
+    marker = f'{BENCH_PREFIX}-seed'
+    question_ids = []
+    last_id = Question.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        questions = []
+        for number in range(start, start + size):
+            topic = rng.choice(topics)
+            questions.append(Question(
+                specialty=specialty,
+                exam_level=exam_level,
+                subspecialty_id=topic['chapter__course__subspecialty_id'],
+                course_id=topic['chapter__course_id'],
+                chapter_id=topic['chapter_id'],
+                topic_id=topic['id'],
+                question_text=f'سوال شماره {number} درباره بیماری {rng.randrange(1000)} کدام است؟',
+                difficulty=rng.choice(DIFFICULTIES),
+                tags=rng.sample(['sepsis', 'antibiotic', 'icu', 'pediatric', 'cardiology', 'renal'], 2),
+                source=marker,
+                source_year=rng.randrange(1395, 1404),
+            ))
+
+        with transaction.atomic():
+            Question.objects.bulk_create(questions)
+            # MySQL does not return primary keys from bulk_create; read them back in insert order
+            chunk_ids = list(Question.objects.filter(
+                id__gt=last_id, source=marker
+            ).order_by('id').values_list('id', flat=True))
+            last_id = chunk_ids[-1]
+
+            options = []
+            explanations = []
+            for question_id in chunk_ids:
+                correct = rng.randrange(1, 5)
+                options.extend(
+                    QuestionOption(
+                        question_id=question_id,
+                        option_number=number,
+                        option_text=f'گزینه {number}',
+                        is_correct=number == correct,
+                    )
+                    for number in range(1, 5)
+                )
+                explanations.append(QuestionExplanation(
+                    question_id=question_id,
+                    explanation_text=f'پاسخ صحیح گزینه {correct} است.',
+                ))
+            QuestionOption.objects.bulk_create(options)
+            QuestionExplanation.objects.bulk_create(explanations)
+
+        question_ids.extend(chunk_ids)
+        log(f'  {len(question_ids)}/{count} questions')
+
+    return question_ids
+
+
+def seed_bank(questions=10000, exams=20, exam_size=100, users=100, seed=1,
+              subspecialties=4, courses_per_subspecialty=2, chapters_per_course=5, topics_per_chapter=6,
+              chunk_size=SEED_CHUNK_SIZE, log=print):
+    """
+    Create a synthetic bank for benchmarking
+    Everything is marked with the bench prefix so reset_bank() can remove it
+    Returns the number of created rows per kind
+    """
+    rng = random.Random(seed)
+
+    log('Seeding hierarchy')
+    topics, specialty, exam_level = _seed_hierarchy(
+        subspecialties, courses_per_subspecialty, chapters_per_course, topics_per_chapter
+    )
+
+    log('Seeding questions')
+    question_ids = _seed_questions(questions, topics, specialty, exam_level, rng, chunk_size, log)
+
+    log('Seeding exams')
+    exam_type, _ = ExamTypeClassification.objects.get_or_create(
+        slug='past_year', defaults={'name_fa': 'سال‌های قبل', 'name_en': 'Past year'}
+    )
+    for number in range(exams):
+        # Published only after its questions exist, so the compiled paper is complete
+        exam = Exam.objects.create(
+            specialty=specialty,
+            exam_level=exam_level,
+            exam_type_classification=exam_type,
+            title=f'آزمون بنچمارک {number}',
+            slug=f'{BENCH_PREFIX}-exam-{uuid.uuid4().hex[:12]}',
+            total_questions=min(exam_size, len(question_ids)),
+            duration_minutes=max(exam_size, 1),
+            is_published=False,
+        )
+        ExamQuestion.objects.bulk_create([
+            ExamQuestion(exam=exam, question_id=question_id, question_order=order)
+            for order, question_id in enumerate(rng.sample(question_ids, min(exam_size, len(question_ids))), start=1)
+        ])
+        exam.is_published = True
+        exam.save(update_fields=['is_published', 'updated_at'])
+
+    log('Seeding users')
+    password = make_password(BENCH_PASSWORD)
+    User = get_user_model()
+    _bulk(User, [
+        User(email=f'{BENCH_PREFIX}-student-{number}@example.com', password=password, first_name='Bench')
+        for number in range(users)
+    ])
+
+    _invalidate_caches()
+    return {'topics': len(topics), 'questions': len(question_ids), 'exams': exams, 'users': users}
+
+
+def _invalidate_caches():
+    """bulk_create skips signals, so derived caches are dropped explicitly"""
+    for model in (Specialty, ExamLevel, Subspecialty, Course, Chapter, Topic):
+        invalidate_level(model)
+    for resource in ('specialties', 'exam_levels', 'subspecialties', 'courses', 'chapters', 'topics', 'questions', 'exams'):
+        invalidate_resource(resource)
+    invalidate_question_index()
+
+
+def reset_bank():
+    """Remove everything seed_bank() and benchmark runs created"""
+    get_user_model().objects.filter(email__startswith=f'{BENCH_PREFIX}-').delete()
+    Exam.objects.filter(slug__startswith=f'{BENCH_PREFIX}-').delete()
+    Specialty.objects.filter(slug__startswith=f'{BENCH_PREFIX}-').delete()
+    _invalidate_caches()
+
+
+# Load run
+
+class _QueryCounter:
+    """execute_wrapper that counts queries on the current thread's connection"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Recorder:
+    """Thread-safe samples of (latency ms, queries, status) per endpoint"""
+
+    def __init__(self):
+        self.samples = {endpoint: [] for endpoint in ENDPOINTS}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, elapsed_ms, queries, status_code):
+        with self._lock:
+            self.samples[endpoint].append((elapsed_ms, queries, status_code))
+
+
+class Student:
+    """One simulated student walking through the exam flow"""
+
+    def __init__(self, email, host, recorder, rng):
+        self.email = email
+        self.client = Client(HTTP_HOST=host)
+        self.recorder = recorder
+        self.rng = rng
+        self.token = None
+
+    def request(self, endpoint, method, path, data=None):
+        extra = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'} if self.token else {}
+        counter = _QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            if method == 'get':
+                response = self.client.get(path, data or {}, **extra)
+            else:
+                response = self.client.post(path, json.dumps(data or {}), content_type='application/json', **extra)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        self.recorder.add(endpoint, elapsed_ms, counter.count, response.status_code)
+
+        if response.status_code >= 400:
+            raise RuntimeError(f'{endpoint} returned {response.status_code}')
+        return response.json()
+
+    def run(self, exam_id, answers, register):
+        if register:
+            self.request('register', 'post', '/api/auth/register/', {
+                'email': self.email, 'password': BENCH_PASSWORD, 'first_name': 'Bench', 'last_name': 'Student',
+            })
+        tokens = self.request('login', 'post', '/api/auth/login/', {'email': self.email, 'password': BENCH_PASSWORD})
+        self.token = tokens['access']
+
+        started = self.request('start', 'post', f'/api/exams/{exam_id}/start/')
+        attempt_id = started['attempt_id']
+        question = started.get('current_question')
+
+        for _ in range(answers):
+            if not question or not question.get('options'):
+                break
+            submitted = self.request('submit_answer', 'post', f'/api/exam-attempts/{attempt_id}/submit-answer/', {
+                'question_id': question['id'],
+                'selected_option_id': self.rng.choice(question['options'])['id'],
+                'time_spent_seconds': self.rng.randrange(10, 90),
+            })
+            question = submitted.get('next_question')
+
+        self.request('complete', 'post', f'/api/exam-attempts/{attempt_id}/complete/')
+        self.request('results', 'get', f'/api/exam-attempts/{attempt_id}/results/')
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of sorted `values`"""
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def summarize(recorder, wall_seconds):
+    endpoints = {}
+    total = 0
+    for endpoint, samples in recorder.samples.items():
+        if not samples:
+            continue
+        latencies = sorted(sample[0] for sample in samples)
+        queries = [sample[1] for sample in samples]
+        total += len(samples)
+        endpoints[endpoint] = {
+            'requests': len(samples),
+            'errors': sum(1 for sample in samples if sample[2] >= 400),
+            'throughput_rps': round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+            'latency_ms': {
+                'p50': round(_percentile(latencies, 50), 2),
+                'p90': round(_percentile(latencies, 90), 2),
+                'p99': round(_percentile(latencies, 99), 2),
+                'max': round(latencies[-1], 2),
+                'mean': round(sum(latencies) / len(latencies), 2),
+            },
+            'queries_per_request': {
+                'mean': round(sum(queries) / len(queries), 2),
+                'max': max(queries),
+            },
+        }
+    return {
+        'endpoints': endpoints,
+        'total': {
+            'requests': total,
+            'wall_seconds': round(wall_seconds, 2),
+            'throughput_rps': round(total / wall_seconds, 2) if wall_seconds else None,
+        },
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(students=50, concurrency=10, answers=None, register=True, host='localhost', seed=1, log=print):
+    """
+    Drive `students` simulated students through the flow, `concurrency` at a time
+    Without `register` the seeded bench users log in instead of registering
+    `answers` caps submitted answers per student (default: the whole exam)
+    Returns the JSON-serializable report
+    """
+    exam_ids = list(Exam.objects.filter(
+        slug__startswith=f'{BENCH_PREFIX}-', is_published=True
+    ).order_by('id').values_list('id', flat=True))
+    if not exam_ids:
+        raise ValueError('No benchmark exams found; run seed_benchmark_data first')
+
+    if register:
+        run_id = uuid.uuid4().hex[:8]
+        emails = [f'{BENCH_PREFIX}-{run_id}-{number}@example.com' for number in range(students)]
+    else:
+        emails = list(get_user_model().objects.filter(
+            email__startswith=f'{BENCH_PREFIX}-student-'
+        ).order_by('id').values_list('email', flat=True)[:students])
+
+    recorder = Recorder()
+    failures = []
+
+    def simulate(number):
+        student = Student(emails[number], host, recorder, random.Random(seed + number))
+        exam_id = exam_ids[number % len(exam_ids)]
+        try:
+            student.run(exam_id, answers if answers is not None else 10 ** 6, register)
+        except Exception as e:
+            failures.append(str(e))
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(simulate, range(len(emails))))
+    wall_seconds = time.perf_counter() - started
+
+    report = summarize(recorder, wall_seconds)
+    report['meta'] = {
+        'timestamp': datetime.now(dt_timezone.utc).isoformat(),
+        'commit': _git_commit(),
+        'database': connection.vendor,
+        'students': len(emails),
+        'concurrency': concurrency,
+        'answers_per_student': answers,
+        'register': register,
+        'exams': len(exam_ids),
+        'questions': Question.objects.filter(source=f'{BENCH_PREFIX}-seed').count(),
+        'failed_students': len(failures),
+    }
+    if failures:
+        log(f'{len(failures)} students failed, first error: {failures[0]}')
+    return report
+
+
+def compare_reports(baseline, current):
+    """Per-endpoint p50/p99 and query changes between two reports, as text lines"""
+    lines = []
+    for endpoint, stats in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(endpoint)
+        if before is None:
+            continue
+        parts = []
+        for percentile in ('p50', 'p99'):
+            old, new = before['latency_ms'][percentile], stats['latency_ms'][percentile]
+            change = (new - old) / old * 100 if old else 0
+            parts.append(f'{percentile} {old:.1f} -> {new:.1f} ms ({change:+.0f}%)')
+        parts.append(
+            f"queries {before['queries_per_request']['mean']} -> {stats['queries_per_request']['mean']}"
+        )
+        lines.append(f"{endpoint}: {', '.join(parts)}")
+    return lines
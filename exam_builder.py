@@ -0,0 +1,244 @@
+# medicalpromax_backend/apps/exams/builder.py
+"""
+Custom (combined) exam builder
+Picks random questions matching the builder filters from the in-memory
+question facet index, optionally stratified by difficulty
+"""
+
+import math
+import random
+import uuid
+
+from django.db import transaction
+
+from .models import Exam, ExamQuestion, ExamTypeClassification
+from apps.core.question_index import get_question_index
+from apps.core.tags import tag_list
+
+
+MAX_QUESTION_COUNT = 300
+MAX_DURATION_MINUTES = 24 * 60
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+
+class ExamBuildError(ValueError):
+    """Invalid builder request"""
+
+
+def _as_list(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def _as_ints(value, name):
+    try:
+        return [int(item) for item in _as_list(value)]
+    except (TypeError, ValueError):
+        raise ExamBuildError(f'{name} must be a list of ids')
+
+
+def _filters(data):
+    filters = data.get('filters') or {}
+    if not isinstance(filters, dict):
+        raise ExamBuildError('filters must be an object')
+    return filters
+
+
+def _difficulty_mix(value):
+    """Validated {difficulty: weight}, or None"""
+    if not value:
+        return None
+    if not isinstance(value, dict):
+        raise ExamBuildError('difficulty_mix must be an object of difficulty weights')
+    unknown = set(value) - set(DIFFICULTIES)
+    if unknown:
+        raise ExamBuildError(f"Unknown difficulty in difficulty_mix: {', '.join(sorted(map(str, unknown)))}")
+    try:
+        weights = {difficulty: float(weight) for difficulty, weight in value.items()}
+    except (TypeError, ValueError):
+        raise ExamBuildError('difficulty_mix weights must be numbers')
+    if any(not math.isfinite(weight) or weight < 0 for weight in weights.values()):
+        raise ExamBuildError('difficulty_mix weights must be zero or more')
+    return weights
+
+
+def _duration_minutes(value):
+    if value in (None, '', 0):
+        return None
+    try:
+        duration_minutes = int(value)
+    except (TypeError, ValueError):
+        raise ExamBuildError('duration_minutes must be a number')
+    if not 1 <= duration_minutes <= MAX_DURATION_MINUTES:
+        raise ExamBuildError(f'duration_minutes must be between 1 and {MAX_DURATION_MINUTES}')
+    return duration_minutes
+
+
+def facet_filters(data):
+    """Translate a build-custom request into question index facet filters"""
+    filters = _filters(data)
+
+    if not data.get('specialty_id') or not data.get('exam_level_id'):
+        raise ExamBuildError('specialty_id and exam_level_id are required')
+
+    difficulties = _as_list(filters.get('difficulty'))
+    unknown = set(difficulties) - set(DIFFICULTIES)
+    if unknown:
+        raise ExamBuildError(f"Unknown difficulty: {', '.join(sorted(unknown))}")
+
+    return {
+        'specialty': _as_ints(data.get('specialty_id'), 'specialty_id'),
+        'exam_level': _as_ints(data.get('exam_level_id'), 'exam_level_id'),
+        'subspecialty': _as_ints(data.get('subspecialty_id'), 'subspecialty_id'),
+        'source_year': _as_ints(filters.get('years'), 'years'),
+        'exam_type': _as_list(filters.get('exam_types')),
+        'course': _as_ints(filters.get('courses'), 'courses'),
+        'chapter': _as_ints(filters.get('chapters'), 'chapters'),
+        'topic': _as_ints(filters.get('topics'), 'topics'),
+        'difficulty': difficulties,
+        'tags': tag_list(filters.get('tags_any')),
+    }
+
+
+def tag_clauses(data):
+    """
+    Tag filters of a build-custom request as (require, exclude) index clauses
+    `tags` must all be present, `tags_not` must all be absent; `tags_any` is
+    an ordinary ORed facet filter handled by facet_filters
+    """
+    filters = _filters(data)
+    return (
+        {'tags': tag_list(filters.get('tags'))},
+        {'tags': tag_list(filters.get('tags_not'))},
+    )
+
+
+def allocate(count, available, weights):
+    """
+    Split `count` picks across strata by largest remainder
+    No stratum gets more than it has available; shortfalls move to the others
+    """
+    allocation = {stratum: 0 for stratum in available}
+    remaining = min(count, sum(available.values()))
+
+    while remaining > 0:
+        open_strata = {s: w for s, w in weights.items() if w > 0 and allocation[s] < available[s]}
+        if not open_strata:
+            break
+
+        total_weight = sum(open_strata.values())
+        shares = {s: remaining * w / total_weight for s, w in open_strata.items()}
+        granted = 0
+        for stratum, share in shares.items():
+            take = min(int(share), available[stratum] - allocation[stratum])
+            allocation[stratum] += take
+            granted += take
+
+        leftovers = sorted(open_strata, key=lambda s: shares[s] - int(shares[s]), reverse=True)
+        for stratum in leftovers:
+            if granted >= remaining:
+                break
+            if allocation[stratum] < available[stratum]:
+                allocation[stratum] += 1
+                granted += 1
+
+        if granted == 0:
+            break
+        remaining -= granted
+
+    return allocation
+
+
+def select_questions(filters, question_count, difficulty_mix=None, stratify=False, rng=None,
+                     require=None, exclude=None):
+    """
+    Random question ids matching `filters` (and the `require`/`exclude` clauses)
+    With `difficulty_mix` ({'easy': 0.2, 'hard': 0.8}) or `stratify` (keep the
+    matched difficulty proportions exactly) picks are made per difficulty
+    """
+    index = get_question_index()
+    rng = rng or random.Random()
+    matched = index.match(filters, exclude=exclude, require=require)
+
+    if not difficulty_mix and not stratify:
+        return index.sample(matched, question_count, rng)
+
+    strata = {
+        difficulty: matched & index.bitmaps['difficulty'].get(difficulty, 0)
+        for difficulty in DIFFICULTIES
+    }
+    available = {difficulty: index.count(bitmap) for difficulty, bitmap in strata.items()}
+    weights = _difficulty_mix(difficulty_mix) or available
+    allocation = allocate(question_count, available, {d: float(weights.get(d, 0)) for d in DIFFICULTIES})
+
+    question_ids = []
+    for difficulty, picks in allocation.items():
+        if picks:
+            question_ids.extend(index.sample(strata[difficulty], picks, rng))
+    rng.shuffle(question_ids)
+    return question_ids
+
+
+def build_custom_exam(user, data, rng=None):
+    """
+    Create an exam from random questions matching the request filters
+    Raises ExamBuildError for invalid requests or when nothing matches
+    """
+    try:
+        question_count = int(data.get('question_count') or 0)
+    except (TypeError, ValueError):
+        raise ExamBuildError('question_count must be a number')
+    if not 1 <= question_count <= MAX_QUESTION_COUNT:
+        raise ExamBuildError(f'question_count must be between 1 and {MAX_QUESTION_COUNT}')
+
+    duration_minutes = _duration_minutes(data.get('duration_minutes'))
+    filters = facet_filters(data)
+    require, exclude = tag_clauses(data)
+    options = _filters(data)
+    question_ids = select_questions(
+        filters,
+        question_count,
+        difficulty_mix=_difficulty_mix(options.get('difficulty_mix')),
+        stratify=bool(options.get('stratify')),
+        rng=rng,
+        require=require,
+        exclude=exclude,
+    )
+    if not question_ids:
+        raise ExamBuildError('No questions match the selected filters')
+
+    exam_type = ExamTypeClassification.objects.get(slug='combined')
+
+    with transaction.atomic():
+        # Created unpublished: questions must exist before the paper is compiled
+        exam = Exam.objects.create(
+            specialty_id=filters['specialty'][0],
+            exam_level_id=filters['exam_level'][0],
+            subspecialty_id=filters['subspecialty'][0] if filters['subspecialty'] else None,
+            exam_type_classification=exam_type,
+            title=data.get('exam_name') or data.get('exam_title_fa') or 'آزمون ترکیبی',
+            slug=f'custom-{uuid.uuid4().hex[:16]}',
+            description=data.get('exam_title_fa'),
+            total_questions=len(question_ids),
+            duration_minutes=duration_minutes,
+            is_timed=bool(duration_minutes),
+            is_combined=True,
+            combination_filters=options,
+            created_by=user,
+            is_published=False,
+        )
+        ExamQuestion.objects.bulk_create([
+            ExamQuestion(exam=exam, question_id=question_id, question_order=order)
+            for order, question_id in enumerate(question_ids, start=1)
+        ])
+
+        if data.get('is_public'):
+            exam.is_published = True
+            exam.save(update_fields=['is_published', 'updated_at'])
+
+    return exam
@@ -0,0 +1,47 @@
+# medicalpromax_backend/apps/exams/management/commands/analyze_items.py
+"""
+Recompute item analysis (difficulty, discrimination, option rates, time) per exam question
+Usage: python manage.py analyze_items [--exam 12] [--all]
+Without options only exams with attempts graded or regraded since their last analysis are processed
+"""
+
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.exams.grading import GRADED_STATUSES
+from apps.exams.item_analysis import analyze_exam, stale_exam_ids
+from apps.exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Run the vectorized item analysis over graded exam answers (nightly job)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, action='append', help='Exam id, may be repeated')
+        parser.add_argument('--all', action='store_true', help='Analyse every exam with graded attempts')
+    
+    def handle(self, *args, **options):
+        if options['exam']:
+            exam_ids = options['exam']
+        elif options['all']:
+            exam_ids = list(Exam.objects.filter(
+                user_attempts__status__in=GRADED_STATUSES
+            ).distinct().order_by('id').values_list('id', flat=True))
+        else:
+            exam_ids = stale_exam_ids()
+        
+        started = time.perf_counter()
+        questions = 0
+        for exam_id in exam_ids:
+            try:
+                count = analyze_exam(exam_id)
+            except ImproperlyConfigured as e:
+                raise CommandError(str(e))
+            questions += count
+            self.stdout.write(f'Exam {exam_id}: {count} questions')
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Analysed {questions} questions in {len(exam_ids)} exams in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,44 @@
+# medicalpromax_backend/apps/exams/management/commands/apply_answer_log.py
+"""
+Apply the write-behind answer log to the database
+Usage: python manage.py apply_answer_log [--once] [--batch-size 500] [--interval 0.2]
+Run as a long-lived process (e.g. a systemd service) when EXAM_ANSWER_LOG_ENABLED is set.
+Restarting it after a crash replays unapplied entries; already applied ones are skipped.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.exams.answer_log import APPLY_BATCH_SIZE, apply_pending, prune_applied
+
+
+PRUNE_EVERY_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = 'Apply logged exam answers to UserAnswer and UserExamAttempt in batched transactions'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the log and exit')
+        parser.add_argument('--batch-size', type=int, default=APPLY_BATCH_SIZE, help='Log entries per batch')
+        parser.add_argument('--interval', type=float, default=0.2, help='Seconds to wait when the log is empty')
+    
+    def handle(self, *args, **options):
+        applied = 0
+        last_prune = time.monotonic()
+        
+        while True:
+            count = apply_pending(batch_size=options['batch_size'])
+            applied += count
+            
+            if time.monotonic() - last_prune > PRUNE_EVERY_SECONDS:
+                prune_applied()
+                last_prune = time.monotonic()
+            
+            if not count:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        
+        self.stdout.write(self.style.SUCCESS(f'Applied {applied} logged answers'))
@@ -0,0 +1,63 @@
+# medicalpromax_backend/apps/exams/management/commands/export_data.py
+"""
+Stream questions, exam attempts or answers to a file as NDJSON or CSV
+Usage: python manage.py export_data questions|attempts|answers [--output-format csv] [--output dump.csv]
+           [--course 3] [--exam 12] [--date-from 2024-01-01] [--date-to 2024-12-31] [--chunk-size 2000]
+Writes to stdout when --output is not given
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.exports import (
+    EXPORT_CHUNK_SIZE, EXPORT_FORMATS, QUESTION_COLUMNS, QUESTION_FILTERS, encode, export_filters,
+    question_export_chunks
+)
+from apps.exams.exports import (
+    ANSWER_COLUMNS, ATTEMPT_COLUMNS, answer_export_chunks, answer_filters, attempt_export_chunks, attempt_filters
+)
+
+
+FILTER_OPTIONS = (
+    'specialty', 'exam_level', 'subspecialty', 'course', 'chapter', 'topic', 'exam', 'attempt', 'user', 'status',
+    'date_from', 'date_to',
+)
+
+
+class Command(BaseCommand):
+    help = 'Export questions, exam attempts or answers with flat memory use'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=['questions', 'attempts', 'answers'])
+        parser.add_argument('--output-format', choices=EXPORT_FORMATS, default='ndjson')
+        parser.add_argument('--output', help='File to write, stdout by default')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows per query')
+        for name in FILTER_OPTIONS:
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name)
+    
+    def handle(self, *args, **options):
+        dataset, fmt, chunk_size = options['dataset'], options['output_format'], options['chunk_size']
+        params = {name: options[name] for name in FILTER_OPTIONS if options[name]}
+        
+        try:
+            if dataset == 'questions':
+                filters = export_filters(params, QUESTION_FILTERS, 'created_at')
+                chunks = question_export_chunks(filters, chunk_size=chunk_size, flat=fmt == 'csv')
+                columns = QUESTION_COLUMNS
+            elif dataset == 'attempts':
+                chunks = attempt_export_chunks(attempt_filters(params), chunk_size=chunk_size)
+                columns = ATTEMPT_COLUMNS
+            else:
+                chunks = answer_export_chunks(answer_filters(params), chunk_size=chunk_size)
+                columns = ANSWER_COLUMNS
+        except ValueError as e:
+            raise CommandError(str(e))
+        
+        if not options['output']:
+            for text in encode(chunks, fmt, columns):
+                self.stdout.write(text, ending='')
+            return
+        
+        with open(options['output'], 'w', encoding='utf-8', newline='') as stream:
+            for text in encode(chunks, fmt, columns):
+                stream.write(text)
+        self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,29 @@
+# medicalpromax_backend/apps/exams/management/commands/rebuild_score_distribution.py
+"""
+Rebuild the per-exam score Fenwick trees used for percentile ranks
+Usage: python manage.py rebuild_score_distribution [--exam 12]
+Run once after deploying, and whenever scores were changed outside the grading engine
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.exams.grading import GRADED_STATUSES
+from apps.exams.models import Exam
+from apps.exams.percentiles import rebuild_score_tree
+
+
+class Command(BaseCommand):
+    help = 'Recount graded attempt scores into the per-exam score distribution'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, action='append', help='Exam id, may be repeated')
+    
+    def handle(self, *args, **options):
+        exam_ids = options['exam'] or list(Exam.objects.filter(
+            user_attempts__status__in=GRADED_STATUSES
+        ).distinct().order_by('id').values_list('id', flat=True))
+        
+        scores = 0
+        for exam_id in exam_ids:
+            scores += rebuild_score_tree(exam_id)
+        self.stdout.write(self.style.SUCCESS(f'Counted {scores} scores in {len(exam_ids)} exams'))
@@ -0,0 +1,31 @@
+# medicalpromax_backend/apps/exams/management/commands/rebuild_topic_mastery.py
+"""
+Rebuild per-user topic mastery from answer history
+Usage: python manage.py rebuild_topic_mastery [--user 42] [--chunk-size 200]
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.exams.mastery import REBUILD_CHUNK_SIZE, rebuild_user_mastery
+
+
+class Command(BaseCommand):
+    help = 'Recompute UserTopicMastery from exam answers and topic-practice answers'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', help='Only rebuild this user (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=REBUILD_CHUNK_SIZE, help='Users per batch')
+    
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('id')
+        if options['user']:
+            users = users.filter(id__in=options['user'])
+        user_ids = list(users.values_list('id', flat=True))
+        
+        rows = 0
+        chunk_size = options['chunk_size']
+        for start in range(0, len(user_ids), chunk_size):
+            rows += rebuild_user_mastery(user_ids[start:start + chunk_size])
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} mastery rows for {len(user_ids)} users'))
@@ -0,0 +1,29 @@
+# medicalpromax_backend/apps/exams/management/commands/regrade_attempts.py
+"""
+Regrade finished exam attempts
+Usage: python manage.py regrade_attempts --exam 12 [--no-resync]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.exams.grading import regrade_exam
+from apps.exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Regrade all completed and timed-out attempts of an exam with set-based queries'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, required=True, help='Exam id')
+        parser.add_argument(
+            '--no-resync',
+            action='store_true',
+            help='Keep stored answer correctness instead of re-reading the answer keys'
+        )
+    
+    def handle(self, *args, **options):
+        if not Exam.objects.filter(pk=options['exam']).exists():
+            raise CommandError(f"Exam {options['exam']} does not exist")
+        
+        count = regrade_exam(options['exam'], resync=not options['no_resync'])
+        self.stdout.write(self.style.SUCCESS(f'Regraded {count} attempts'))
@@ -0,0 +1,65 @@
+# medicalpromax_backend/apps/exams/management/commands/run_exam_benchmark.py
+"""
+Drive simulated students through register, login, start, answers, complete and results
+Usage:
+    python manage.py run_exam_benchmark --students 200 --concurrency 20 --output bench/HEAD.json
+    python manage.py run_exam_benchmark --compare bench/main.json     # print p50/p99 changes
+"""
+
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.exams.benchmark import compare_reports, run_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Measure latency percentiles, throughput and queries per request of the exam flow'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--answers', type=int, default=None, help='Answers per student (default: whole exam)')
+        parser.add_argument('--no-register', action='store_true', help='Log in as seeded students instead of registering')
+        parser.add_argument('--host', default='localhost', help='Host header; must be in ALLOWED_HOSTS')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--compare', help='Baseline JSON report to compare against')
+    
+    def handle(self, *args, **options):
+        try:
+            report = run_benchmark(
+                students=options['students'],
+                concurrency=options['concurrency'],
+                answers=options['answers'],
+                register=not options['no_register'],
+                host=options['host'],
+                seed=options['seed'],
+                log=self.stderr.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        
+        for endpoint, stats in report['endpoints'].items():
+            latency = stats['latency_ms']
+            self.stdout.write(
+                f"{endpoint:<14} {stats['requests']:>6} req  {stats['errors']:>4} err  "
+                f"p50 {latency['p50']:>8.1f} ms  p99 {latency['p99']:>8.1f} ms  "
+                f"{stats['queries_per_request']['mean']:>6.1f} queries"
+            )
+        self.stdout.write(
+            f"total {report['total']['requests']} requests in {report['total']['wall_seconds']} s "
+            f"({report['total']['throughput_rps']} req/s)"
+        )
+        
+        if options['output']:
+            path = Path(options['output'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f'Report written to {path}'))
+        
+        if options['compare']:
+            baseline = json.loads(Path(options['compare']).read_text())
+            for line in compare_reports(baseline, report):
+                self.stdout.write(line)
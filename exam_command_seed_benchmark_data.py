@@ -0,0 +1,50 @@
+# medicalpromax_backend/apps/exams/management/commands/seed_benchmark_data.py
+"""
+Seed a synthetic question bank for the exam flow benchmark
+Usage: python manage.py seed_benchmark_data --questions 100000 --exams 50 --exam-size 100 --users 500 [--reset]
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.exams.benchmark import reset_bank, seed_bank
+
+
+class Command(BaseCommand):
+    help = 'Create benchmark specialties, courses, topics, questions, exams and users'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=10000)
+        parser.add_argument('--exams', type=int, default=20)
+        parser.add_argument('--exam-size', type=int, default=100, help='Questions per exam')
+        parser.add_argument('--users', type=int, default=100, help='Pre-created students for --no-register runs')
+        parser.add_argument('--subspecialties', type=int, default=4)
+        parser.add_argument('--courses', type=int, default=2, help='Courses per subspecialty')
+        parser.add_argument('--chapters', type=int, default=5, help='Chapters per course')
+        parser.add_argument('--topics', type=int, default=6, help='Topics per chapter')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed')
+        parser.add_argument('--reset', action='store_true', help='Remove existing benchmark data first')
+        parser.add_argument('--reset-only', action='store_true', help='Remove benchmark data and exit')
+    
+    def handle(self, *args, **options):
+        if options['reset'] or options['reset_only']:
+            reset_bank()
+            self.stdout.write('Removed existing benchmark data')
+            if options['reset_only']:
+                return
+        
+        counts = seed_bank(
+            questions=options['questions'],
+            exams=options['exams'],
+            exam_size=options['exam_size'],
+            users=options['users'],
+            seed=options['seed'],
+            subspecialties=options['subspecialties'],
+            courses_per_subspecialty=options['courses'],
+            chapters_per_course=options['chapters'],
+            topics_per_chapter=options['topics'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded ' + ', '.join(f'{count} {kind}' for kind, count in counts.items())
+        ))
+        self.stdout.write('Run backfill_question_tags and rebuild_search_index to include them in tags and search')
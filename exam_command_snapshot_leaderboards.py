@@ -0,0 +1,35 @@
+# medicalpromax_backend/apps/exams/management/commands/snapshot_leaderboards.py
+"""
+Persist the top of every active leaderboard
+Usage: python manage.py snapshot_leaderboards [--backfill] [--keep-days 90]
+Run periodically (e.g. hourly from cron); workers warm their boards from the latest snapshot
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.exams.leaderboards import active_board_keys, backfill_entries, snapshot_board
+from apps.exams.models import LeaderboardSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Snapshot exam and path leaderboards and prune old snapshots'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true', help='First create entries for existing graded attempts')
+        parser.add_argument('--keep-days', type=int, default=90, help='Delete snapshots older than this')
+    
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.stdout.write(f'Checked {backfill_entries()} graded attempts for leaderboard entries')
+        
+        keys = active_board_keys()
+        for key in keys:
+            snapshot_board(key)
+        
+        pruned, _ = LeaderboardSnapshot.objects.filter(
+            taken_at__lt=timezone.now() - timedelta(days=options['keep_days'])
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f'Snapshotted {len(keys)} boards, pruned {pruned} snapshots'))
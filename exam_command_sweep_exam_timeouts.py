@@ -0,0 +1,36 @@
+# medicalpromax_backend/apps/exams/management/commands/sweep_exam_timeouts.py
+"""
+Time out expired exam attempts
+Usage:
+    python manage.py sweep_exam_timeouts              # one pass, e.g. from cron every minute
+    python manage.py sweep_exam_timeouts --loop 60    # keep running as a small scheduler process
+    python manage.py sweep_exam_timeouts --backfill   # store deadlines on legacy attempts first
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.exams.timeouts import backfill_deadlines, sweep_expired_attempts
+
+
+class Command(BaseCommand):
+    help = 'Move expired in-progress exam attempts to timeout and grade them'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', type=int, default=0, help='Repeat every N seconds')
+        parser.add_argument('--backfill', action='store_true', help='Backfill missing deadlines before sweeping')
+    
+    def handle(self, *args, **options):
+        if options['backfill']:
+            count = backfill_deadlines(batch_size=options['batch_size'])
+            self.stdout.write(f'Stored deadlines on {count} attempts')
+        
+        while True:
+            count = sweep_expired_attempts(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Timed out {count} attempts'))
+            
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
@@ -0,0 +1,67 @@
+# medicalpromax_backend/apps/exams/exports.py
+"""
+Streaming exports of exam attempts and answers for offline analysis
+Encoding and chunking are shared with apps.core.exports
+"""
+
+from apps.core.exports import EXPORT_CHUNK_SIZE, export_filters, keyset_chunks
+
+from .models import UserAnswer, UserExamAttempt
+
+
+ATTEMPT_FILTERS = {
+    'exam': 'exam_id',
+    'user': 'user_id',
+    'specialty': 'exam__specialty_id',
+    'exam_level': 'exam__exam_level_id',
+    'subspecialty': 'exam__subspecialty_id',
+}
+ATTEMPT_COLUMNS = (
+    'id', 'user_id', 'exam_id', 'status', 'started_at', 'completed_at', 'deadline_at',
+    'total_questions', 'answered_count', 'correct_answers', 'wrong_answers', 'unanswered',
+    'score', 'percentage', 'time_spent_seconds', 'score_breakdown',
+)
+
+ANSWER_FILTERS = {
+    'exam': 'attempt__exam_id',
+    'attempt': 'attempt_id',
+    'user': 'attempt__user_id',
+    'specialty': 'attempt__exam__specialty_id',
+    'exam_level': 'attempt__exam__exam_level_id',
+    'subspecialty': 'attempt__exam__subspecialty_id',
+    'course': 'question__course_id',
+    'chapter': 'question__chapter_id',
+    'topic': 'question__topic_id',
+}
+ANSWER_FIELDS = (
+    'id', 'attempt_id', 'attempt__user_id', 'attempt__exam_id', 'question_id', 'selected_option_id',
+    'selected_option__option_number', 'is_correct', 'time_spent_seconds', 'answered_at',
+)
+ANSWER_COLUMNS = (
+    'id', 'attempt_id', 'user_id', 'exam_id', 'question_id', 'selected_option_id',
+    'selected_option_number', 'is_correct', 'time_spent_seconds', 'answered_at',
+)
+
+
+def attempt_filters(params):
+    """Filters for attempt_export_chunks; status is matched as given"""
+    filters = export_filters(params, ATTEMPT_FILTERS, 'started_at')
+    if params.get('status'):
+        filters['status'] = params['status']
+    return filters
+
+
+def attempt_export_chunks(filters=None, chunk_size=EXPORT_CHUNK_SIZE):
+    queryset = UserExamAttempt.objects.filter(**(filters or {}))
+    yield from keyset_chunks(queryset, ATTEMPT_COLUMNS, chunk_size)
+
+
+def answer_filters(params):
+    return export_filters(params, ANSWER_FILTERS, 'answered_at')
+
+
+def answer_export_chunks(filters=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Answers with the attempt's user and exam and the selected option number, one query per chunk"""
+    queryset = UserAnswer.objects.filter(**(filters or {}))
+    for rows in keyset_chunks(queryset, ANSWER_FIELDS, chunk_size):
+        yield [dict(zip(ANSWER_COLUMNS, (row[field] for field in ANSWER_FIELDS))) for row in rows]
@@ -0,0 +1,205 @@
+# medicalpromax_backend/apps/exams/grading.py
+"""
+Grading engine for exam attempts
+Computes points-weighted scores, raw counts and a per-difficulty breakdown
+with aggregate queries, for one attempt or for many attempts at once
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .leaderboards import record_attempt, record_graded_attempts
+from .models import ExamQuestion, UserAnswer, UserExamAttempt
+from .percentiles import apply_score_changes
+from apps.core.cache import invalidate_resource
+from apps.core.models import QuestionOption
+
+
+GRADED_STATUSES = ('completed', 'timeout')
+GRADE_FIELDS = [
+    'total_questions', 'answered_count', 'correct_answers', 'wrong_answers',
+    'unanswered', 'score', 'percentage', 'score_breakdown',
+]
+
+_HUNDRED = Decimal('100')
+_CENT = Decimal('0.01')
+
+
+def _summarize(rows):
+    """
+    Fold per-difficulty rows into attempt totals
+    Each row has difficulty, total, points, answered, correct and earned
+    """
+    breakdown = {}
+    total = answered = correct = 0
+    points = earned = Decimal('0')
+
+    for row in rows:
+        row_points = row['points'] or Decimal('0')
+        row_earned = row['earned'] or Decimal('0')
+        breakdown[row['difficulty']] = {
+            'total': row['total'],
+            'answered': row['answered'],
+            'correct': row['correct'],
+            'wrong': row['answered'] - row['correct'],
+            'points': float(row_points),
+            'earned': float(row_earned),
+            'percentage': float(_percentage(row_earned, row_points)),
+        }
+        total += row['total']
+        answered += row['answered']
+        correct += row['correct']
+        points += row_points
+        earned += row_earned
+
+    percentage = _percentage(earned, points)
+    return {
+        'total_questions': total,
+        'answered_count': answered,
+        'correct_answers': correct,
+        'wrong_answers': answered - correct,
+        'unanswered': total - answered,
+        'score': percentage,
+        'percentage': percentage,
+        'score_breakdown': breakdown,
+    }
+
+
+def _percentage(earned, points):
+    if not points:
+        return Decimal('0.00')
+    return (earned / points * _HUNDRED).quantize(_CENT)
+
+
+def grade_attempt(attempt, **extra_fields):
+    """
+    Grade one attempt with a single aggregate query and store the result in one write
+    `extra_fields` (e.g. status, completed_at) are saved in the same UPDATE
+    Returns the grade dict; the attempt instance is updated in place
+    The exam's score distribution and leaderboards are updated when the attempt ends up graded
+    """
+    answer = UserAnswer.objects.filter(attempt_id=attempt.pk, question_id=OuterRef('question_id'))
+
+    rows = ExamQuestion.objects.filter(exam_id=attempt.exam_id).annotate(
+        answer_correct=Subquery(answer.values('is_correct')[:1]),
+    ).values(
+        difficulty=F('question__difficulty'),
+    ).annotate(
+        total=Count('id'),
+        points=Sum('points'),
+        answered=Count('answer_correct'),
+        correct=Count('id', filter=Q(answer_correct=True)),
+        earned=Sum('points', filter=Q(answer_correct=True)),
+    ).order_by()
+
+    grade = _summarize(rows)
+    fields = {**grade, **extra_fields}
+    old_score = attempt.score if attempt.status in GRADED_STATUSES else None
+    # Unlike completed_at (the deadline for timeouts) this marks the exam's item statistics as stale
+    fields['graded_at'] = timezone.now()
+
+    UserExamAttempt.objects.filter(pk=attempt.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(attempt, name, value)
+    if attempt.status in GRADED_STATUSES:
+        apply_score_changes([(attempt.exam_id, old_score, grade['score'])])
+        if old_score is None:
+            record_attempt(attempt)
+        else:
+            record_graded_attempts(regraded_ids=[attempt.pk])
+    invalidate_resource('user_progress', user_id=attempt.user_id)
+
+    return grade
+
+
+def resync_answer_correctness(attempts):
+    """Re-derive UserAnswer.is_correct from the current answer keys in one UPDATE"""
+    correct_option = QuestionOption.objects.filter(pk=OuterRef('selected_option_id'), is_correct=True)
+    return UserAnswer.objects.filter(attempt__in=attempts).update(is_correct=Exists(correct_option))
+
+
+def regrade_attempts(attempts, resync=True, batch_size=500):
+    """
+    Regrade many attempts with set-based queries
+    Exam totals and per-attempt answer stats are each read with one grouped
+    query, then written back with bulk_update, so the cost does not grow
+    with one round trip per attempt
+    Returns the number of regraded attempts
+    """
+    if resync:
+        resync_answer_correctness(attempts)
+
+    attempt_rows = list(attempts.values_list('id', 'exam_id', 'score', 'status'))
+    if not attempt_rows:
+        return 0
+    attempt_exams = {attempt_id: exam_id for attempt_id, exam_id, _, _ in attempt_rows}
+
+    exam_totals = defaultdict(dict)
+    totals = ExamQuestion.objects.filter(
+        exam_id__in=set(attempt_exams.values())
+    ).values(
+        'exam_id', difficulty=F('question__difficulty'),
+    ).annotate(
+        total=Count('id'),
+        points=Sum('points'),
+    ).order_by()
+    for row in totals:
+        exam_totals[row['exam_id']][row['difficulty']] = row
+
+    answer_stats = defaultdict(dict)
+    # Filtering on the exam_questions join before annotating makes the sum use that join
+    answers = UserAnswer.objects.filter(
+        attempt_id__in=list(attempt_exams),
+        question__exam_questions__exam_id=F('attempt__exam_id'),
+    ).values(
+        'attempt_id', difficulty=F('question__difficulty'),
+    ).annotate(
+        answered=Count('id'),
+        correct=Count('id', filter=Q(is_correct=True)),
+        earned=Sum('question__exam_questions__points', filter=Q(is_correct=True)),
+    ).order_by()
+    for row in answers:
+        answer_stats[row['attempt_id']][row['difficulty']] = row
+
+    graded = []
+    graded_at = timezone.now()
+    for attempt_id, exam_id in attempt_exams.items():
+        stats = answer_stats.get(attempt_id, {})
+        rows = [
+            {
+                'difficulty': difficulty,
+                'total': total['total'],
+                'points': total['points'],
+                'answered': stats.get(difficulty, {}).get('answered', 0),
+                'correct': stats.get(difficulty, {}).get('correct', 0),
+                'earned': stats.get(difficulty, {}).get('earned'),
+            }
+            for difficulty, total in exam_totals[exam_id].items()
+        ]
+        graded.append(UserExamAttempt(pk=attempt_id, graded_at=graded_at, **_summarize(rows)))
+
+    # Attempts just moved to a graded status (timeout sweep) have no score counted yet
+    score_changes = [
+        (exam_id, old_score, new.score)
+        for (_, exam_id, old_score, status), new in zip(attempt_rows, graded)
+        if status in GRADED_STATUSES
+    ]
+    with transaction.atomic():
+        # graded_at marks the exams' item statistics as stale, for swept timeouts too
+        UserExamAttempt.objects.bulk_update(graded, [*GRADE_FIELDS, 'graded_at'], batch_size=batch_size)
+        apply_score_changes(score_changes)
+        record_graded_attempts(
+            new_ids=[attempt_id for attempt_id, _, score, status in attempt_rows if score is None],
+            regraded_ids=[attempt_id for attempt_id, _, score, status in attempt_rows if score is not None],
+        )
+    return len(graded)
+
+
+def regrade_exam(exam_id, **kwargs):
+    """Regrade every finished attempt of an exam, e.g. after an answer-key fix"""
+    attempts = UserExamAttempt.objects.filter(exam_id=exam_id, status__in=GRADED_STATUSES)
+    return regrade_attempts(attempts, **kwargs)
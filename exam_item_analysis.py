@@ -0,0 +1,197 @@
+# medicalpromax_backend/apps/exams/item_analysis.py
+"""
+Item analysis over exam answers
+For every question of an exam, over its graded attempts:
+    difficulty_index   share of examinees answering correctly (p-value)
+    discrimination     point-biserial correlation between the item score and
+                       the rest-of-exam score (correct answers minus the item)
+    option_stats       how often each option was chosen, distractors included
+    mean_time_seconds  mean time spent by those who answered
+
+Answers are read in chunks of attempts into NumPy arrays and reduced into
+per-question sums with bincount, so memory is bounded by the chunk size and
+all statistics follow from the sums without a second pass.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .grading import GRADED_STATUSES
+from .models import ExamQuestion, QuestionItemStats, UserAnswer, UserExamAttempt
+from apps.core.models import QuestionOption
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+ATTEMPT_CHUNK_SIZE = getattr(settings, 'ITEM_ANALYSIS_ATTEMPT_CHUNK_SIZE', 1000)
+ITEM_STATS_TIMEOUT = 60 * 60 * 24
+ITEM_STATS_FIELDS = ('examinees', 'difficulty_index', 'discrimination', 'mean_time_seconds', 'option_stats')
+
+
+def _stats_key(exam_id):
+    return f'item-stats:{exam_id}'
+
+
+def get_item_stats(exam_id):
+    """{question_id: stats} for an exam, cached until the next analysis run"""
+    stats = cache.get(_stats_key(exam_id))
+    if stats is None:
+        stats = {
+            row.pop('question_id'): row
+            for row in QuestionItemStats.objects.filter(exam_id=exam_id).values('question_id', *ITEM_STATS_FIELDS)
+        }
+        cache.set(_stats_key(exam_id), stats, ITEM_STATS_TIMEOUT)
+    return stats
+
+
+def _columns(rows):
+    """answer rows -> (attempt ids, question ids, option ids (0 = none), correct flags, seconds)"""
+    count = len(rows)
+    attempt_ids, question_ids, option_ids, correct, seconds = zip(*rows)
+    return (
+        np.fromiter(attempt_ids, np.int64, count),
+        np.fromiter(question_ids, np.int64, count),
+        np.fromiter((option_id or 0 for option_id in option_ids), np.int64, count),
+        np.fromiter((bool(value) for value in correct), np.bool_, count),
+        np.fromiter(seconds, np.float64, count),
+    )
+
+
+def _positions(sorted_ids, values):
+    """Index of each value in `sorted_ids` and a mask of the values that were found"""
+    positions = np.searchsorted(sorted_ids, values)
+    positions = np.minimum(positions, len(sorted_ids) - 1)
+    return positions, sorted_ids[positions] == values
+
+
+def analyze_exam(exam_id, at=None):
+    """Recompute the item statistics of one exam; returns the number of questions analysed"""
+    if np is None:
+        raise ImproperlyConfigured('Item analysis needs numpy (pip install numpy)')
+    at = at or timezone.now()
+
+    attempts = list(UserExamAttempt.objects.filter(
+        exam_id=exam_id, status__in=GRADED_STATUSES
+    ).order_by('id').values_list('id', 'correct_answers'))
+    question_ids = np.array(sorted(set(
+        ExamQuestion.objects.filter(exam_id=exam_id).values_list('question_id', flat=True)
+    )), dtype=np.int64)
+    if not attempts or not len(question_ids):
+        with transaction.atomic():
+            QuestionItemStats.objects.filter(exam_id=exam_id).delete()
+        cache.delete(_stats_key(exam_id))
+        return 0
+
+    attempt_ids = np.array([attempt_id for attempt_id, _ in attempts], dtype=np.int64)
+    totals = np.array([total for _, total in attempts], dtype=np.float64)
+    options = list(QuestionOption.objects.filter(
+        question_id__in=question_ids.tolist()
+    ).order_by('id').values_list('id', 'question_id', 'option_number', 'is_correct'))
+    option_ids = np.array([option[0] for option in options], dtype=np.int64)
+
+    size = len(question_ids)
+    responses = np.zeros(size)
+    correct = np.zeros(size)
+    seconds = np.zeros(size)
+    # Sum of the total score over the attempts that answered each question correctly
+    correct_totals = np.zeros(size)
+    option_counts = np.zeros(len(option_ids))
+
+    for start in range(0, len(attempt_ids), ATTEMPT_CHUNK_SIZE):
+        rows = list(UserAnswer.objects.filter(
+            attempt_id__in=attempt_ids[start:start + ATTEMPT_CHUNK_SIZE].tolist()
+        ).values_list('attempt_id', 'question_id', 'selected_option_id', 'is_correct', 'time_spent_seconds'))
+        if not rows:
+            continue
+
+        answer_attempts, answer_questions, answer_options, answer_correct, answer_seconds = _columns(rows)
+        attempt_index = np.searchsorted(attempt_ids, answer_attempts)
+        question_index, on_paper = _positions(question_ids, answer_questions)
+
+        answered = on_paper & (answer_options > 0)
+        responses += np.bincount(question_index[answered], minlength=size)
+        seconds += np.bincount(question_index[answered], weights=answer_seconds[answered], minlength=size)
+
+        right = on_paper & answer_correct
+        correct += np.bincount(question_index[right], minlength=size)
+        correct_totals += np.bincount(question_index[right], weights=totals[attempt_index[right]], minlength=size)
+
+        if len(option_ids):
+            option_index, known = _positions(option_ids, answer_options[answered])
+            option_counts += np.bincount(option_index[known], minlength=len(option_ids))
+
+    examinees = len(attempt_ids)
+    difficulty = correct / examinees
+
+    # Point-biserial of item score x against rest score y = total - x, from sums:
+    # sum(xy) = sum over correct of (total - 1), sum(y) = sum(total) - sum(x),
+    # sum(y^2) = sum(total^2) - 2 sum over correct of total + sum(x)
+    mean_y = (totals.sum() - correct) / examinees
+    mean_xy = (correct_totals - correct) / examinees
+    mean_y2 = ((totals ** 2).sum() - 2 * correct_totals + correct) / examinees
+    covariance = mean_xy - difficulty * mean_y
+    spread = np.sqrt(np.clip(difficulty * (1 - difficulty), 0, None) * np.clip(mean_y2 - mean_y ** 2, 0, None))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        discrimination = np.where(spread > 0, np.clip(covariance / spread, -1, 1), np.nan)
+        mean_seconds = np.where(responses > 0, seconds / responses, np.nan)
+
+    option_stats = {}
+    for (option_id, question_id, option_number, is_correct), count in zip(options, option_counts.tolist()):
+        option_stats.setdefault(question_id, []).append({
+            'option_id': option_id,
+            'option_number': option_number,
+            'is_correct': is_correct,
+            'count': int(count),
+            'rate': 0,
+        })
+
+    stats = []
+    for index, question_id in enumerate(question_ids.tolist()):
+        question_options = sorted(option_stats.get(question_id, []), key=lambda option: option['option_number'])
+        for option in question_options:
+            option['rate'] = round(option['count'] / responses[index], 4) if responses[index] else 0
+        stats.append(QuestionItemStats(
+            exam_id=exam_id,
+            question_id=question_id,
+            examinees=examinees,
+            responses=int(responses[index]),
+            correct_count=int(correct[index]),
+            difficulty_index=round(float(difficulty[index]), 4),
+            discrimination=None if np.isnan(discrimination[index]) else round(float(discrimination[index]), 4),
+            mean_time_seconds=None if np.isnan(mean_seconds[index]) else round(float(mean_seconds[index]), 1),
+            option_stats=question_options,
+            computed_at=at,
+        ))
+
+    with transaction.atomic():
+        QuestionItemStats.objects.filter(exam_id=exam_id).delete()
+        QuestionItemStats.objects.bulk_create(stats, batch_size=1000)
+    cache.delete(_stats_key(exam_id))
+    return len(stats)
+
+
+def stale_exam_ids():
+    """
+    Exams with attempts graded or regraded after their last analysis
+    completed_at covers attempts graded before graded_at was stored
+    """
+    finished = UserExamAttempt.objects.filter(status__in=GRADED_STATUSES).values('exam_id').annotate(
+        completed=Max('completed_at'),
+        graded=Max('graded_at'),
+    ).values_list('exam_id', 'completed', 'graded')
+    analysed = dict(QuestionItemStats.objects.values('exam_id').annotate(
+        latest=Max('computed_at')
+    ).values_list('exam_id', 'latest'))
+    return sorted(
+        exam_id for exam_id, completed, graded in finished
+        if exam_id not in analysed or any(
+            changed is not None and changed > analysed[exam_id] for changed in (completed, graded)
+        )
+    )
@@ -0,0 +1,418 @@
+# medicalpromax_backend/apps/exams/leaderboards.py
+"""
+Exam and path leaderboards
+LeaderboardEntry holds each user's first graded attempt on an exam and is the
+durable source of truth. Boards are ranked by score, then by less time spent:
+    exam:{exam_id}                                    entries of one exam
+    path:{specialty}:{exam_level}:{subspecialty|0}    entries of the path's exams
+                                                      finished in the rolling window
+
+Each worker keeps the top of every board it serves in a bounded sorted list,
+so top-N is a slice and "my rank" is a bisect. A board is always an exact
+prefix of the full ranking; ranks below it are counted in the database.
+Boards catch up incrementally: new entries bump the board generation and
+workers read the entries after the last id they have seen, re-reading a
+window of CATCH_UP_OVERLAP ids below it for entries that committed out of id
+order. Regrades force a reload, and boards are reloaded every
+LEADERBOARD_RELOAD_SECONDS to drop entries that left the window. Periodic
+snapshots warm boards after a restart. Published boards are never mutated;
+catch-ups and reloads build a new board and swap it in.
+"""
+
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import timedelta
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import LeaderboardEntry, LeaderboardSnapshot, UserExamAttempt
+from apps.core.cache import bump_generation, get_generations
+
+
+BOARD_CAPACITY = getattr(settings, 'LEADERBOARD_CAPACITY', 1000)
+WINDOW_DAYS = getattr(settings, 'LEADERBOARD_WINDOW_DAYS', 30)
+RELOAD_SECONDS = getattr(settings, 'LEADERBOARD_RELOAD_SECONDS', 300)
+LOCAL_BOARD_LIMIT = 64
+CATCH_UP_LIMIT = 500
+# Ids below the last seen one that may still commit late (concurrent completions)
+CATCH_UP_OVERLAP = 100
+MAX_TOP = 100
+
+RANK_ORDER = ('-score', 'time_spent_seconds', 'id')
+ENTRY_FIELDS = (
+    'id', 'user_id', 'exam_id', 'score', 'time_spent_seconds', 'completed_at', 'user__first_name', 'user__last_name',
+)
+
+
+def exam_board_key(exam_id):
+    return f'exam:{exam_id}'
+
+
+def path_board_key(specialty_id, exam_level_id, subspecialty_id=None):
+    return f'path:{specialty_id}:{exam_level_id}:{subspecialty_id or 0}'
+
+
+def _board_entries(key):
+    """LeaderboardEntry queryset of a board"""
+    kind, *ids = key.split(':')
+    if kind == 'exam':
+        return LeaderboardEntry.objects.filter(exam_id=int(ids[0]))
+    specialty_id, exam_level_id, subspecialty_id = (int(value) for value in ids)
+    return LeaderboardEntry.objects.filter(
+        specialty_id=specialty_id,
+        exam_level_id=exam_level_id,
+        subspecialty_id=subspecialty_id or None,
+        completed_at__gte=timezone.now() - timedelta(days=WINDOW_DAYS),
+    )
+
+
+def _row(entry):
+    """Public board row of an entry values() dict"""
+    first_name, last_name = entry['user__first_name'], entry['user__last_name']
+    return {
+        'id': entry['id'],
+        'user_id': entry['user_id'],
+        'name': f'{first_name} {last_name[:1]}.'.strip() if last_name else first_name,
+        'exam_id': entry['exam_id'],
+        'score': float(entry['score']),
+        'time_spent_seconds': entry['time_spent_seconds'],
+        'completed_at': entry['completed_at'].isoformat(),
+    }
+
+
+def _key(row):
+    return (-row['score'], row['time_spent_seconds'], row['id'])
+
+
+class Board:
+    """Bounded, exactly ranked prefix of a leaderboard"""
+
+    def __init__(self, capacity=BOARD_CAPACITY, complete=True, last_entry_id=0):
+        self.capacity = capacity
+        self.complete = complete
+        self.last_entry_id = last_entry_id
+        self.keys = []
+        self.rows = {}
+        self.best = {}
+        self.generations = None
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def copy(self):
+        board = Board(self.capacity, self.complete, self.last_entry_id)
+        board.keys = list(self.keys)
+        board.rows = dict(self.rows)
+        board.best = dict(self.best)
+        board.generations = self.generations
+        board.loaded_at = self.loaded_at
+        return board
+
+    def offer(self, row):
+        key = _key(row)
+        if key in self.rows:
+            return
+        # Past the end of a truncated board the rank is unknown; leave it to the database
+        if not self.complete and self.keys and key > self.keys[-1]:
+            return
+
+        self.keys.insert(bisect_left(self.keys, key), key)
+        self.rows[key] = row
+        best = self.best.get(row['user_id'])
+        if best is None or key < best:
+            self.best[row['user_id']] = key
+
+        while len(self.keys) > self.capacity:
+            dropped = self.keys.pop()
+            user_id = self.rows.pop(dropped)['user_id']
+            # The dropped key is the worst one, so the user has no other key left
+            if self.best.get(user_id) == dropped:
+                del self.best[user_id]
+            self.complete = False
+
+    def top(self, limit, offset=0):
+        return [
+            {'rank': offset + index + 1, **self.rows[key]}
+            for index, key in enumerate(self.keys[offset:offset + limit])
+        ]
+
+    def rank(self, user_id):
+        """The user's best row with its rank, None if the user is not on the board"""
+        key = self.best.get(user_id)
+        if key is None:
+            return None
+        return {'rank': bisect_left(self.keys, key) + 1, **self.rows[key]}
+
+
+# Loading
+
+def _load_from_db(key):
+    # Entries inserted after this id, or committing late just below it, are picked up by the next catch-up
+    last_entry_id = LeaderboardEntry.objects.aggregate(last=Max('id'))['last'] or 0
+    entries = list(_board_entries(key).order_by(*RANK_ORDER).values(*ENTRY_FIELDS)[:BOARD_CAPACITY + 1])
+    board = Board(complete=len(entries) <= BOARD_CAPACITY, last_entry_id=last_entry_id)
+    for entry in entries[:BOARD_CAPACITY]:
+        board.offer(_row(entry))
+    return board
+
+
+def _load_from_snapshot(key):
+    snapshot = LeaderboardSnapshot.objects.filter(board_key=key).order_by('-taken_at').first()
+    if snapshot is None:
+        return None
+
+    board = Board(complete=snapshot.complete, last_entry_id=snapshot.last_entry_id)
+    cutoff = timezone.now() - timedelta(days=WINDOW_DAYS) if key.startswith('path:') else None
+    for row in snapshot.entries:
+        # Dropping rows that left the window keeps the rest an exact prefix
+        if cutoff is None or parse_datetime(row['completed_at']) >= cutoff:
+            board.offer(row)
+    if not _catch_up(board, key):
+        return None
+    return board
+
+
+def _catch_up(board, key):
+    """
+    Offer entries created since the board was loaded; False if there were too many
+    Entries already on the board are skipped by offer(), so the overlap is re-read safely
+    """
+    entries = list(_board_entries(key).filter(
+        id__gt=max(board.last_entry_id - CATCH_UP_OVERLAP, 0)
+    ).order_by('id').values(*ENTRY_FIELDS)[:CATCH_UP_LIMIT])
+    for entry in entries:
+        board.offer(_row(entry))
+    if entries:
+        board.last_entry_id = max(board.last_entry_id, entries[-1]['id'])
+    return len(entries) < CATCH_UP_LIMIT
+
+
+def _namespaces(key):
+    return f'leaderboard:{key}', f'leaderboard-reload:{key}'
+
+
+_boards = OrderedDict()
+_boards_lock = threading.Lock()
+
+
+def get_board(key):
+    """This worker's board for `key`, brought up to date with the shared generations"""
+    changed, reload = _namespaces(key)
+    generations = get_generations([changed, reload])
+
+    with _boards_lock:
+        current = _boards.get(key)
+        if current is not None:
+            _boards.move_to_end(key)
+
+    # Loads run outside the lock so one cold board does not hold up the others
+    if current is None:
+        board = _load_from_snapshot(key) or _load_from_db(key)
+    elif (
+        current.generations[reload] != generations[reload]
+        or time.monotonic() - current.loaded_at > RELOAD_SECONDS
+    ):
+        board = _load_from_db(key)
+    elif current.generations[changed] != generations[changed]:
+        board = current.copy()
+        if not _catch_up(board, key):
+            board = _load_from_db(key)
+    else:
+        return current
+
+    board.generations = generations
+    with _boards_lock:
+        # A concurrent request may have swapped in a board first; that one is kept
+        if _boards.get(key) is current:
+            _boards[key] = board
+            _boards.move_to_end(key)
+            while len(_boards) > LOCAL_BOARD_LIMIT:
+                _boards.popitem(last=False)
+    return board
+
+
+def user_rank(key, user_id):
+    """The user's best row and rank; counted in the database when it is below the board"""
+    board = get_board(key)
+    ranked = board.rank(user_id)
+    if ranked is not None or board.complete:
+        return ranked
+
+    entries = _board_entries(key)
+    best = entries.filter(user_id=user_id).order_by(*RANK_ORDER).values(*ENTRY_FIELDS).first()
+    if best is None:
+        return None
+    better = entries.filter(
+        Q(score__gt=best['score'])
+        | Q(score=best['score'], time_spent_seconds__lt=best['time_spent_seconds'])
+        | Q(score=best['score'], time_spent_seconds=best['time_spent_seconds'], id__lt=best['id'])
+    ).count()
+    return {'rank': better + 1, **_row(best)}
+
+
+# Recording
+
+def _notify(keys, reload=False):
+    """Bump the board generations once the transaction commits"""
+    def bump():
+        for key in keys:
+            bump_generation(_namespaces(key)[1 if reload else 0])
+    transaction.on_commit(bump)
+
+
+def _board_keys(exam):
+    return [
+        exam_board_key(exam['exam_id']),
+        path_board_key(exam['specialty_id'], exam['exam_level_id'], exam['subspecialty_id']),
+    ]
+
+
+def record_attempt(attempt):
+    """Add a just-graded attempt to the leaderboards if it is the user's first on the exam"""
+    exam = attempt.exam
+    LeaderboardEntry.objects.bulk_create([LeaderboardEntry(
+        exam_id=attempt.exam_id,
+        user_id=attempt.user_id,
+        attempt_id=attempt.pk,
+        specialty_id=exam.specialty_id,
+        exam_level_id=exam.exam_level_id,
+        subspecialty_id=exam.subspecialty_id,
+        score=attempt.score,
+        time_spent_seconds=attempt.time_spent_seconds,
+        completed_at=attempt.completed_at or timezone.now(),
+    )], ignore_conflicts=True)
+    _notify(_board_keys({
+        'exam_id': attempt.exam_id,
+        'specialty_id': exam.specialty_id,
+        'exam_level_id': exam.exam_level_id,
+        'subspecialty_id': exam.subspecialty_id,
+    }))
+
+
+def record_graded_attempts(new_ids=(), regraded_ids=()):
+    """
+    Batch form for set-based grading: `new_ids` were just graded (e.g. timed out),
+    `regraded_ids` had their scores recomputed and update existing entries
+    """
+    ids = list(new_ids) + list(regraded_ids)
+    if not ids:
+        return
+    from .grading import GRADED_STATUSES
+
+    attempts = list(UserExamAttempt.objects.filter(
+        id__in=ids, status__in=GRADED_STATUSES, score__isnull=False
+    ).values(
+        'id', 'user_id', 'exam_id', 'score', 'time_spent_seconds', 'completed_at',
+        specialty_id=F('exam__specialty_id'), exam_level_id=F('exam__exam_level_id'),
+        subspecialty_id=F('exam__subspecialty_id'),
+    ))
+    regraded_ids = set(regraded_ids)
+
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(
+            exam_id=attempt['exam_id'],
+            user_id=attempt['user_id'],
+            attempt_id=attempt['id'],
+            specialty_id=attempt['specialty_id'],
+            exam_level_id=attempt['exam_level_id'],
+            subspecialty_id=attempt['subspecialty_id'],
+            score=attempt['score'],
+            time_spent_seconds=attempt['time_spent_seconds'],
+            completed_at=attempt['completed_at'] or timezone.now(),
+        )
+        for attempt in attempts if attempt['id'] not in regraded_ids
+    ], ignore_conflicts=True, batch_size=500)
+
+    regraded = [attempt for attempt in attempts if attempt['id'] in regraded_ids]
+    entries = {
+        entry.attempt_id: entry
+        for entry in LeaderboardEntry.objects.filter(attempt_id__in=[attempt['id'] for attempt in regraded])
+    }
+    for attempt in regraded:
+        if attempt['id'] in entries:
+            entries[attempt['id']].score = attempt['score']
+    LeaderboardEntry.objects.bulk_update(entries.values(), ['score'], batch_size=500)
+
+    keys = {key for attempt in attempts if attempt['id'] not in regraded_ids for key in _board_keys(attempt)}
+    reload_keys = {key for attempt in regraded if attempt['id'] in entries for key in _board_keys(attempt)}
+    _notify(keys - reload_keys)
+    _notify(reload_keys, reload=True)
+
+    def refresh_snapshots():
+        # Cold workers must not warm up from a snapshot with the old scores
+        for key in reload_keys:
+            snapshot_board(key)
+    transaction.on_commit(refresh_snapshots)
+
+
+# Snapshots
+
+def snapshot_board(key):
+    """Store the current top of a board; later snapshots supersede earlier ones"""
+    board = _load_from_db(key)
+    return LeaderboardSnapshot.objects.create(
+        board_key=key,
+        taken_at=timezone.now(),
+        last_entry_id=board.last_entry_id,
+        complete=board.complete,
+        entries=[board.rows[rank_key] for rank_key in board.keys],
+    )
+
+
+def active_board_keys():
+    """Exam boards with entries and path boards with entries in the window"""
+    keys = [exam_board_key(exam_id) for exam_id in LeaderboardEntry.objects.values_list('exam_id', flat=True).distinct()]
+    paths = LeaderboardEntry.objects.filter(
+        completed_at__gte=timezone.now() - timedelta(days=WINDOW_DAYS)
+    ).values_list('specialty_id', 'exam_level_id', 'subspecialty_id').distinct()
+    keys.extend(path_board_key(*path) for path in paths)
+    return keys
+
+
+def backfill_entries(batch_size=2000):
+    """
+    Create entries for graded attempts that predate the leaderboards, earliest completion first
+    Returns the number of attempts checked
+    """
+    from .grading import GRADED_STATUSES
+
+    checked = 0
+    last = None
+    while True:
+        attempts = UserExamAttempt.objects.filter(
+            status__in=GRADED_STATUSES, score__isnull=False, completed_at__isnull=False
+        )
+        if last is not None:
+            attempts = attempts.filter(Q(completed_at__gt=last[0]) | Q(completed_at=last[0], id__gt=last[1]))
+        rows = list(attempts.order_by('completed_at', 'id').values(
+            'id', 'user_id', 'exam_id', 'score', 'time_spent_seconds', 'completed_at',
+            specialty_id=F('exam__specialty_id'), exam_level_id=F('exam__exam_level_id'),
+            subspecialty_id=F('exam__subspecialty_id'),
+        )[:batch_size])
+        if not rows:
+            return checked
+
+        # The unique (exam, user) constraint keeps the earliest completion
+        LeaderboardEntry.objects.bulk_create([
+            LeaderboardEntry(
+                exam_id=row['exam_id'],
+                user_id=row['user_id'],
+                attempt_id=row['id'],
+                specialty_id=row['specialty_id'],
+                exam_level_id=row['exam_level_id'],
+                subspecialty_id=row['subspecialty_id'],
+                score=row['score'],
+                time_spent_seconds=row['time_spent_seconds'],
+                completed_at=row['completed_at'],
+            )
+            for row in rows
+        ], ignore_conflicts=True)
+        checked += len(rows)
+        last = (rows[-1]['completed_at'], rows[-1]['id'])
@@ -0,0 +1,163 @@
+# medicalpromax_backend/apps/exams/mastery.py
+"""
+Per-user topic mastery
+UserTopicMastery rows are updated with one delta UPDATE per topic whenever an
+exam or topic-practice answer is recorded, so the progress dashboard reads a
+user's mastery with one indexed query instead of aggregating their history
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import UserAnswer, UserTopicMastery, UserTopicQuestionAttempt
+from apps.core.answer_keys import get_answer_keys
+from apps.core.cache import invalidate_resource
+
+
+# Weight of the newest answer in rolling_accuracy
+SMOOTHING = getattr(settings, 'TOPIC_MASTERY_SMOOTHING', 0.2)
+REBUILD_CHUNK_SIZE = 200
+
+
+def _ema(outcomes, start=None):
+    """
+    Fold answer outcomes (oldest first) into a rolling accuracy
+    Returns (decay, contribution) such that new = old * decay + contribution;
+    without a `start` the first outcome seeds the average
+    """
+    decay = 1.0
+    contribution = 0.0
+    if start is None and outcomes:
+        contribution = 100.0 * outcomes[0]
+        decay = 0.0
+        outcomes = outcomes[1:]
+    for outcome in outcomes:
+        decay *= 1 - SMOOTHING
+        contribution = contribution * (1 - SMOOTHING) + SMOOTHING * 100.0 * outcome
+    return decay, contribution
+
+
+class MasteryDelta:
+    """Changes to one topic's aggregate"""
+
+    __slots__ = ('attempts', 'correct', 'outcomes')
+
+    def __init__(self):
+        self.attempts = 0
+        self.correct = 0
+        self.outcomes = []
+
+    def add(self, is_correct, new=True, was_correct=False):
+        """
+        Count one answer; a changed answer (new=False) only moves it between
+        correct and wrong and does not feed the rolling average
+        """
+        if new:
+            self.attempts += 1
+            self.correct += int(is_correct)
+            self.outcomes.append(bool(is_correct))
+        else:
+            self.correct += int(is_correct) - int(was_correct)
+
+
+def apply_mastery(user_id, deltas, at=None):
+    """
+    Apply {topic_id: MasteryDelta} to a user's mastery rows
+    Each topic costs one UPDATE; a missing row is inserted instead
+    """
+    at = at or timezone.now()
+    touched = False
+
+    for topic_id, delta in deltas.items():
+        if topic_id is None or not (delta.attempts or delta.correct):
+            continue
+        touched = True
+        decay, contribution = _ema(delta.outcomes, start=0.0)
+        updated = UserTopicMastery.objects.filter(user_id=user_id, topic_id=topic_id).update(
+            attempts=F('attempts') + delta.attempts,
+            correct_answers=F('correct_answers') + delta.correct,
+            rolling_accuracy=F('rolling_accuracy') * decay + contribution,
+            last_activity_at=at,
+        )
+        if updated:
+            continue
+
+        _, seeded = _ema(delta.outcomes)
+        try:
+            with transaction.atomic():
+                UserTopicMastery.objects.create(
+                    user_id=user_id,
+                    topic_id=topic_id,
+                    attempts=delta.attempts,
+                    correct_answers=max(delta.correct, 0),
+                    rolling_accuracy=seeded,
+                    last_activity_at=at,
+                )
+        except IntegrityError:
+            # A concurrent answer created the row first
+            UserTopicMastery.objects.filter(user_id=user_id, topic_id=topic_id).update(
+                attempts=F('attempts') + delta.attempts,
+                correct_answers=F('correct_answers') + delta.correct,
+                rolling_accuracy=F('rolling_accuracy') * decay + contribution,
+                last_activity_at=at,
+            )
+
+    if touched:
+        invalidate_resource('user_progress', user_id=user_id)
+
+
+def record_mastery(user_id, question_id, is_correct, new=True, was_correct=False, topic_id=None):
+    """Update mastery for a single answer; the topic comes from the answer-key cache"""
+    if topic_id is None:
+        topic_id = get_answer_keys([question_id]).get(question_id, {}).get('topic')
+    delta = MasteryDelta()
+    delta.add(is_correct, new=new, was_correct=was_correct)
+    apply_mastery(user_id, {topic_id: delta})
+
+
+def _user_events(user_ids):
+    """Every answer of the given users as (user_id, topic_id, is_correct, answered_at)"""
+    exam_answers = UserAnswer.objects.filter(
+        attempt__user_id__in=user_ids, question__topic_id__isnull=False
+    ).values_list('attempt__user_id', 'question__topic_id', 'is_correct', 'answered_at')
+    practice_answers = UserTopicQuestionAttempt.objects.filter(
+        user_id__in=user_ids
+    ).values_list('user_id', 'topic_id', 'is_correct', 'answered_at')
+
+    events = list(exam_answers.iterator(chunk_size=5000)) + list(practice_answers.iterator(chunk_size=5000))
+    events.sort(key=lambda event: (event[0], event[1], event[3]))
+    return events
+
+
+def rebuild_user_mastery(user_ids):
+    """Recompute the mastery rows of some users from their full answer history"""
+    user_ids = list(user_ids)
+    aggregates = defaultdict(MasteryDelta)
+    last_activity = {}
+    for user_id, topic_id, is_correct, answered_at in _user_events(user_ids):
+        aggregates[user_id, topic_id].add(bool(is_correct))
+        last_activity[user_id, topic_id] = answered_at
+
+    rows = [
+        UserTopicMastery(
+            user_id=user_id,
+            topic_id=topic_id,
+            attempts=delta.attempts,
+            correct_answers=delta.correct,
+            rolling_accuracy=_ema(delta.outcomes)[1],
+            last_activity_at=last_activity[user_id, topic_id],
+        )
+        for (user_id, topic_id), delta in aggregates.items()
+    ]
+
+    with transaction.atomic():
+        UserTopicMastery.objects.filter(user_id__in=user_ids).delete()
+        UserTopicMastery.objects.bulk_create(rows, batch_size=1000)
+
+    for user_id in user_ids:
+        invalidate_resource('user_progress', user_id=user_id)
+    return len(rows)
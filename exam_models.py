@@ -52,6 +52,10 @@ class Exam(models.Model):
     is_combined = models.BooleanField(default=False)
     is_timed = models.BooleanField(default=True)
     combination_filters = models.JSONField(default=dict, blank=True)
+    created_by = models.ForeignKey(
+        'users.User', on_delete=models.SET_NULL, related_name='custom_exams', null=True, blank=True,
+        help_text='Owner of a custom exam'
+    )
     
     is_active = models.BooleanField(default=True)
     is_published = models.BooleanField(default=False)
@@ -88,6 +92,9 @@ class ExamQuestion(models.Model):
         ordering = ['question_order']
         verbose_name = 'سوال آزمون'
         verbose_name_plural = 'سوالات آزمون'
+        indexes = [
+            models.Index(fields=['exam', 'question_order']),
+        ]
     
     def __str__(self):
         return f"{self.exam.title} - Q{self.question_order}"
@@ -108,6 +115,7 @@ class UserExamAttempt(models.Model):
     
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(blank=True, null=True)
+    deadline_at = models.DateTimeField(blank=True, null=True, help_text='Empty for untimed exams')
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
@@ -118,9 +126,14 @@ class UserExamAttempt(models.Model):
     correct_answers = models.IntegerField(default=0)
     wrong_answers = models.IntegerField(default=0)
     unanswered = models.IntegerField(default=0)
+    answered_count = models.IntegerField(default=0)
+    next_question_order = models.IntegerField(blank=True, null=True, help_text='Order of the first unanswered question')
     score = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
     percentage = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+    score_breakdown = models.JSONField(default=dict, blank=True, help_text='Per-difficulty counts and points')
     time_spent_seconds = models.IntegerField(default=0)
+    answer_log_seq = models.BigIntegerField(default=0, help_text='Last answer-log entry applied to this attempt')
+    graded_at = models.DateTimeField(blank=True, null=True, help_text='Last time the attempt was graded or regraded')
     
     class Meta:
         db_table = 'user_exam_attempts'
@@ -130,16 +143,20 @@ class UserExamAttempt(models.Model):
         indexes = [
             models.Index(fields=['user', 'exam']),
             models.Index(fields=['status']),
+            models.Index(fields=['status', 'deadline_at']),
         ]
     
     def __str__(self):
         return f"{self.user.email} - {self.exam.title} ({self.status})"
     
+    @staticmethod
+    def compute_deadline(exam, started_at):
+        if not exam.is_timed or not exam.duration_minutes:
+            return None
+        return started_at + timedelta(minutes=exam.duration_minutes)
+    
     def is_timed_out(self):
-        if not self.exam.is_timed or not self.exam.duration_minutes:
-            return False
-        elapsed = timezone.now() - self.started_at
-        return elapsed > timedelta(minutes=self.exam.duration_minutes)
+        return self.deadline_at is not None and timezone.now() > self.deadline_at
 
 
 class UserAnswer(models.Model):
@@ -233,4 +250,149 @@ class UserTopicQuestionAttempt(models.Model):
         return f"{self.user.email} - Topic {self.topic.id} - Q{self.question.id}"
 
 
+class UserTopicMastery(models.Model):
+    """Per-user, per-topic answer aggregate, maintained as answers are recorded"""
+    
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='topic_mastery')
+    topic = models.ForeignKey('core.Topic', on_delete=models.CASCADE, related_name='user_mastery')
+    
+    attempts = models.IntegerField(default=0)
+    correct_answers = models.IntegerField(default=0)
+    rolling_accuracy = models.FloatField(default=0, help_text='Exponential moving average of correctness, 0-100')
+    last_activity_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'user_topic_mastery'
+        unique_together = ['user', 'topic']
+        verbose_name = 'تسلط کاربر بر موضوع'
+        verbose_name_plural = 'تسلط کاربران بر موضوعات'
+    
+    def __str__(self):
+        return f"User {self.user_id} - Topic {self.topic_id} ({self.rolling_accuracy:.0f}%)"
+    
+    @property
+    def accuracy(self):
+        if not self.attempts:
+            return 0
+        return round(self.correct_answers * 100 / self.attempts, 2)
+
+
+class UserQuestionCounter(models.Model):
+    """Topic-practice attempt counter per user and question"""
+    
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='question_counters')
+    question = models.ForeignKey('core.Question', on_delete=models.CASCADE, related_name='user_counters')
+    
+    attempts = models.IntegerField(default=0)
+    last_answered_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'user_question_counters'
+        unique_together = ['user', 'question']
+        verbose_name = 'شمارنده تلاش کاربر در سوال'
+        verbose_name_plural = 'شمارنده‌های تلاش کاربران در سوالات'
+    
+    def __str__(self):
+        return f"User {self.user_id} - Q{self.question_id} ({self.attempts})"
+
+
+class QuestionItemStats(models.Model):
+    """Psychometric item analysis of a question within an exam, computed by the analyze_items job"""
+    
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='item_stats')
+    question = models.ForeignKey('core.Question', on_delete=models.CASCADE, related_name='item_stats')
+    
+    examinees = models.IntegerField(default=0, help_text='Graded attempts of the exam')
+    responses = models.IntegerField(default=0, help_text='Attempts that answered the question')
+    correct_count = models.IntegerField(default=0)
+    difficulty_index = models.FloatField(blank=True, null=True, help_text='p-value: share of examinees answering correctly')
+    discrimination = models.FloatField(
+        blank=True, null=True, help_text='Point-biserial correlation with the rest-of-exam score'
+    )
+    mean_time_seconds = models.FloatField(blank=True, null=True)
+    option_stats = models.JSONField(
+        default=list, blank=True, help_text='[{option_id, option_number, is_correct, count, rate}]'
+    )
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'question_item_stats'
+        unique_together = ['exam', 'question']
+        verbose_name = 'تحلیل سوال'
+        verbose_name_plural = 'تحلیل سوالات'
+    
+    def __str__(self):
+        return f"{self.exam_id} - Q{self.question_id} (p={self.difficulty_index})"
+
+
+class ExamScoreNode(models.Model):
+    """
+    One node of an exam's score Fenwick tree (binary indexed tree)
+    Buckets cover scores 0.00-100.00 at 0.01 resolution; rows are created on first use
+    """
+    
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='score_nodes')
+    node = models.IntegerField()
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'exam_score_nodes'
+        unique_together = ['exam', 'node']
+        verbose_name = 'گره توزیع نمرات'
+        verbose_name_plural = 'گره‌های توزیع نمرات'
+    
+    def __str__(self):
+        return f"Exam {self.exam_id} node {self.node}: {self.count}"
+
+
+class LeaderboardEntry(models.Model):
+    """A user's first graded attempt on an exam, as ranked on the exam and path leaderboards"""
+    
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='leaderboard_entries')
+    attempt = models.OneToOneField(UserExamAttempt, on_delete=models.CASCADE, related_name='leaderboard_entry')
+    
+    # Copied from the exam so path boards are read from one index
+    specialty = models.ForeignKey('core.Specialty', on_delete=models.CASCADE, related_name='+')
+    exam_level = models.ForeignKey('core.ExamLevel', on_delete=models.CASCADE, related_name='+')
+    subspecialty = models.ForeignKey('core.Subspecialty', on_delete=models.CASCADE, related_name='+', null=True, blank=True)
+    
+    score = models.DecimalField(max_digits=5, decimal_places=2)
+    time_spent_seconds = models.IntegerField(default=0)
+    completed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'leaderboard_entries'
+        unique_together = ['exam', 'user']
+        verbose_name = 'رتبه‌بندی'
+        verbose_name_plural = 'رتبه‌بندی‌ها'
+        indexes = [
+            models.Index(fields=['exam', '-score', 'time_spent_seconds']),
+            models.Index(fields=['specialty', 'exam_level', 'subspecialty', 'completed_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.exam_id} - User {self.user_id}: {self.score}"
+
+
+class LeaderboardSnapshot(models.Model):
+    """Persisted top of a leaderboard; warms worker boards after a restart"""
+    
+    board_key = models.CharField(max_length=100)
+    taken_at = models.DateTimeField()
+    last_entry_id = models.BigIntegerField(default=0, help_text='Entries after this id are not included')
+    complete = models.BooleanField(default=True, help_text='False when the board had more entries than were kept')
+    entries = models.JSONField(default=list, blank=True)
+    
+    class Meta:
+        db_table = 'leaderboard_snapshots'
+        verbose_name = 'تصویر رتبه‌بندی'
+        verbose_name_plural = 'تصاویر رتبه‌بندی'
+        indexes = [
+            models.Index(fields=['board_key', '-taken_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.board_key} @ {self.taken_at}"
+
 from django.core.validators import MinValueValidator, MaxValueValidator
\ No newline at end of file
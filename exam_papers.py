@@ -0,0 +1,196 @@
+# medicalpromax_backend/apps/exams/papers.py
+"""
+Precompiled exam papers
+A paper is an immutable snapshot of a published exam: the ordered question ids
+and the question/option payloads. Correct options are not part of it; grading
+reads them from apps.core.answer_keys. Papers are keyed by exam id and a
+version taken from Exam.updated_at, so any edit produces a new paper instead
+of mutating a cached one.
+"""
+
+from collections import OrderedDict
+import threading
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Exam, ExamQuestion
+from .serializers import ExamDetailSerializer
+from apps.core.models import QuestionOption
+
+
+PAPER_TIMEOUT = 60 * 60 * 24 * 7
+LOCAL_PAPER_LIMIT = 32
+
+_local_papers = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def paper_version(exam):
+    """Version of the paper for the current state of `exam`"""
+    return int(exam.updated_at.timestamp() * 1000000)
+
+
+def _paper_key(exam_id, version):
+    return f'exam-paper:{exam_id}:{version}'
+
+
+def _current_key(exam_id):
+    return f'exam-paper:{exam_id}:current'
+
+
+def _remember(key, paper):
+    with _local_lock:
+        _local_papers[key] = paper
+        _local_papers.move_to_end(key)
+        while len(_local_papers) > LOCAL_PAPER_LIMIT:
+            _local_papers.popitem(last=False)
+
+
+def _recall(key):
+    with _local_lock:
+        paper = _local_papers.get(key)
+        if paper is not None:
+            _local_papers.move_to_end(key)
+        return paper
+
+
+def compile_paper(exam):
+    """
+    Build and cache the paper for the current version of `exam`
+    Questions and options are read with two flat queries
+    """
+    version = paper_version(exam)
+
+    exam_questions = ExamQuestion.objects.filter(exam=exam).order_by('question_order').values(
+        'question_id', 'question_order', 'points',
+        'question__question_text', 'question__question_html', 'question__image_url',
+    )
+    options = QuestionOption.objects.filter(
+        question__exam_questions__exam=exam
+    ).order_by('question_id', 'option_number').values(
+        'id', 'question_id', 'option_number', 'option_text', 'option_html'
+    )
+
+    questions = {}
+    orders = {}
+    for row in exam_questions:
+        question_id = row['question_id']
+        questions[question_id] = {
+            'id': question_id,
+            'order': row['question_order'],
+            'question_text': row['question__question_text'],
+            'question_html': row['question__question_html'],
+            'image_url': row['question__image_url'],
+            'options': [],
+        }
+        orders[row['question_order']] = question_id
+
+    for option in options:
+        questions[option['question_id']]['options'].append({
+            'id': option['id'],
+            'option_number': option['option_number'],
+            'option_text': option['option_text'],
+            'option_html': option['option_html'],
+        })
+
+    paper = {
+        'exam_id': exam.pk,
+        'version': version,
+        'exam': ExamDetailSerializer(exam).data,
+        'question_ids': tuple(questions),
+        'orders': orders,
+        'questions': questions,
+    }
+
+    cache.set(_paper_key(exam.pk, version), paper, PAPER_TIMEOUT)
+    _remember((exam.pk, version), paper)
+
+    return paper
+
+
+def get_paper(exam):
+    """Return the paper for the current version of `exam`, compiling it if needed"""
+    key = (exam.pk, paper_version(exam))
+
+    paper = _recall(key)
+    if paper is None:
+        paper = cache.get(_paper_key(*key))
+        if paper is None:
+            return compile_paper(exam)
+        _remember(key, paper)
+
+    return paper
+
+
+def get_current_paper(exam_id, published_only=True):
+    """
+    Return the latest paper of an exam without loading the exam when possible
+    Falls back to the database when the current-version pointer is missing
+    Returns None if the exam does not exist (or is not published)
+    """
+    version = cache.get(_current_key(exam_id))
+    if version is not None:
+        paper = _recall((int(exam_id), version)) or cache.get(_paper_key(exam_id, version))
+        if paper is not None:
+            _remember((int(exam_id), version), paper)
+            return paper
+
+    exams = Exam.objects.filter(id=exam_id)
+    if published_only:
+        exams = exams.filter(is_active=True, is_published=True)
+
+    exam = exams.first()
+    if exam is None:
+        return None
+
+    if exam.is_active and exam.is_published:
+        return publish_paper(exam)
+    return get_paper(exam)
+
+
+def publish_paper(exam):
+    """Compile the paper of a published exam and point the current version at it"""
+    paper = get_paper(exam)
+    cache.set(_current_key(exam.pk), paper['version'], PAPER_TIMEOUT)
+    return paper
+
+
+def retire_paper(exam_id):
+    """Stop serving the current paper of an exam"""
+    cache.delete(_current_key(exam_id))
+
+
+def touch_exams(exam_ids):
+    """
+    Bump the version of exams whose content changed
+    The next read compiles a fresh paper for them
+    """
+    exam_ids = list(set(exam_ids))
+    if not exam_ids:
+        return
+
+    Exam.objects.filter(pk__in=exam_ids).update(updated_at=timezone.now())
+    cache.delete_many([_current_key(exam_id) for exam_id in exam_ids])
+
+
+def question_payload(paper, order, fields=None):
+    """
+    Return the payload of the question at `order`, or None
+    `fields` narrows the question and option keys for lighter responses
+    """
+    question_id = paper['orders'].get(order)
+    if question_id is None:
+        return None
+
+    question = paper['questions'][question_id]
+    if fields is None:
+        return question
+
+    return {
+        **{key: question[key] for key in ('id', 'order') + tuple(fields)},
+        'options': [
+            {key: option[key] for key in ('id', 'option_number', 'option_text')}
+            for option in question['options']
+        ],
+    }
@@ -0,0 +1,98 @@
+# medicalpromax_backend/apps/exams/practice.py
+"""
+Topic-practice answers
+An answer is graded from the answer-key cache, numbered by an atomic
+per-(user, question) counter and folded into the user's topic mastery, so
+recording it is one insert plus a few single-row updates with no history scans
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .mastery import record_mastery
+from .models import UserQuestionCounter, UserTopicMastery, UserTopicQuestionAttempt
+from apps.core.answer_keys import get_answer_key
+from apps.core.explanations import get_explanation
+
+
+class PracticeAnswerError(ValueError):
+    """Answer that cannot be recorded"""
+
+
+def next_attempt_number(user_id, question_id, at):
+    """
+    Increment the user's counter for a question and return the new value
+    The UPDATE locks the row until the surrounding transaction ends, so
+    concurrent answers get consecutive numbers. A new counter starts from the
+    attempts recorded before counters existed
+    """
+    counter = UserQuestionCounter.objects.filter(user_id=user_id, question_id=question_id)
+    if counter.update(attempts=F('attempts') + 1, last_answered_at=at):
+        return counter.values_list('attempts', flat=True).get()
+
+    previous = UserTopicQuestionAttempt.objects.filter(
+        user_id=user_id, question_id=question_id
+    ).aggregate(last=Max('attempt_number'))['last'] or 0
+    try:
+        with transaction.atomic():
+            UserQuestionCounter.objects.create(
+                user_id=user_id, question_id=question_id, attempts=previous + 1, last_answered_at=at
+            )
+        return previous + 1
+    except IntegrityError:
+        # A concurrent first answer created the row
+        counter.update(attempts=F('attempts') + 1, last_answered_at=at)
+        return counter.values_list('attempts', flat=True).get()
+
+
+def record_practice_answer(user, question_id, selected_option_id, topic_id=None):
+    """
+    Grade and store one topic-practice answer
+    The question's own topic wins over `topic_id`, which is only used for
+    questions without one
+    Returns the response payload of the answer endpoint
+    """
+    answer_key = get_answer_key(question_id)
+    if selected_option_id not in answer_key['options']:
+        raise PracticeAnswerError('Option does not belong to this question')
+
+    topic_id = answer_key['topic'] or topic_id
+    if topic_id is None:
+        raise PracticeAnswerError('topic_id is required for questions without a topic')
+
+    is_correct = selected_option_id in answer_key['correct']
+    now = timezone.now()
+
+    with transaction.atomic():
+        attempt_number = next_attempt_number(user.pk, question_id, now)
+        UserTopicQuestionAttempt.objects.create(
+            user=user,
+            topic_id=topic_id,
+            question_id=question_id,
+            selected_option_id=selected_option_id,
+            is_correct=is_correct,
+            attempt_number=attempt_number,
+        )
+        record_mastery(user.pk, question_id, is_correct, topic_id=topic_id)
+
+    mastery = UserTopicMastery.objects.filter(user=user, topic_id=topic_id).values(
+        'attempts', 'correct_answers'
+    ).first() or {'attempts': 0, 'correct_answers': 0}
+
+    correct_option_ids = sorted(answer_key['correct'])
+    explanation = get_explanation(question_id) or {}
+
+    return {
+        'answered': True,
+        'is_correct': is_correct,
+        'correct_option_id': correct_option_ids[0] if correct_option_ids else None,
+        'attempt_number': attempt_number,
+        'explanation': explanation.get('explanation_text'),
+        'explanation_html': explanation.get('explanation_html'),
+        'user_accuracy_on_topic': {
+            'attempts': mastery['attempts'],
+            'correct': mastery['correct_answers'],
+            'percentage': round(mastery['correct_answers'] * 100 / mastery['attempts']) if mastery['attempts'] else 0,
+        },
+    }
@@ -0,0 +1,93 @@
+# medicalpromax_backend/apps/exams/results.py
+"""
+Compact exam results
+The attempt summary plus per-question correctness, paged by question order.
+Question payloads and answer keys come from the cached exam paper and the
+answer-key cache, so a page costs one query for the user's answers.
+"""
+
+from .item_analysis import get_item_stats
+from .models import UserAnswer
+from .papers import get_current_paper
+from .percentiles import score_rank
+from apps.core.answer_keys import get_answer_keys
+from apps.core.explanations import get_explanations
+
+
+RESULTS_PAGE_SIZE = 50
+MAX_RESULTS_PAGE_SIZE = 200
+MAX_EXPLANATION_BATCH = 50
+
+SUMMARY_FIELDS = (
+    'id', 'exam_id', 'status', 'started_at', 'completed_at', 'total_questions', 'answered_count',
+    'correct_answers', 'wrong_answers', 'unanswered', 'score', 'percentage', 'score_breakdown',
+    'time_spent_seconds',
+)
+
+
+def attempt_summary(attempt):
+    summary = {field: getattr(attempt, field) for field in SUMMARY_FIELDS}
+    for field in ('score', 'percentage'):
+        if summary[field] is not None:
+            summary[field] = float(summary[field])
+    return summary
+
+
+def compact_results(attempt, cursor=None, limit=RESULTS_PAGE_SIZE, include_questions=False):
+    """
+    One page of results after question order `cursor`
+    Returns {'attempt', 'ranking', 'questions', 'next_cursor'}; `next_cursor` is None on the last page.
+    With `include_questions` each row also carries the question text and options from the paper.
+    Rows carry the question's item analysis (difficulty, discrimination, option rates) once it has run.
+    """
+    paper = get_current_paper(attempt.exam_id, published_only=False)
+    if paper is None:
+        return None
+
+    orders = sorted(order for order in paper['orders'] if cursor is None or order > cursor)
+    page = orders[:limit]
+    question_ids = [paper['orders'][order] for order in page]
+
+    answers = {
+        question_id: (selected_option_id, is_correct)
+        for question_id, selected_option_id, is_correct in UserAnswer.objects.filter(
+            attempt_id=attempt.pk, question_id__in=question_ids
+        ).values_list('question_id', 'selected_option_id', 'is_correct')
+    }
+    answer_keys = get_answer_keys(question_ids)
+    item_stats = get_item_stats(attempt.exam_id)
+
+    rows = []
+    for order, question_id in zip(page, question_ids):
+        selected_option_id, is_correct = answers.get(question_id, (None, None))
+        row = {
+            'order': order,
+            'question_id': question_id,
+            'answered': question_id in answers,
+            'selected_option_id': selected_option_id,
+            'is_correct': bool(is_correct),
+            'correct_option_ids': sorted(answer_keys[question_id]['correct']),
+            'item_stats': item_stats.get(question_id),
+        }
+        if include_questions:
+            row['question'] = paper['questions'][question_id]
+        rows.append(row)
+
+    return {
+        'attempt': attempt_summary(attempt),
+        'ranking': score_rank(attempt.exam_id, attempt.score),
+        'questions': rows,
+        'next_cursor': page[-1] if len(orders) > limit else None,
+    }
+
+
+def attempt_explanations(attempt, question_ids):
+    """
+    Explanations for questions of the attempt's exam, from the explanation cache
+    Ids that are not on the exam paper are ignored
+    """
+    paper = get_current_paper(attempt.exam_id, published_only=False)
+    if paper is None:
+        return {}
+    question_ids = [question_id for question_id in question_ids if question_id in paper['questions']]
+    return get_explanations(question_ids[:MAX_EXPLANATION_BATCH])
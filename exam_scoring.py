@@ -0,0 +1,223 @@
+# medicalpromax_backend/apps/exams/scoring.py
+"""
+Incremental scoring for exam attempts
+Keeps attempt counters and the next-question cursor up to date with
+constant-size delta updates instead of recounting answers on every submit
+"""
+
+from django.db import connection
+from django.db.models import Count, Exists, F, OuterRef, Q
+
+from .mastery import MasteryDelta, apply_mastery, record_mastery
+from .models import ExamQuestion, UserAnswer, UserExamAttempt
+from apps.core.answer_keys import get_answer_keys
+
+
+def find_next_unanswered_order(attempt, after_order=None):
+    """Return the order of the first unanswered question after `after_order`"""
+    answered = UserAnswer.objects.filter(attempt_id=attempt.pk, question_id=OuterRef('question_id'))
+    queryset = ExamQuestion.objects.filter(exam_id=attempt.exam_id).exclude(Exists(answered))
+
+    if after_order is not None:
+        queryset = queryset.filter(question_order__gt=after_order)
+
+    return queryset.order_by('question_order').values_list('question_order', flat=True).first()
+
+
+def refresh_attempt_counters(attempt):
+    """
+    Recompute counters and cursor of an attempt from its answers
+    Used for attempts created before incremental scoring and after bulk writes
+    """
+    stats = UserAnswer.objects.filter(attempt_id=attempt.pk).aggregate(
+        answered=Count('id'),
+        correct=Count('id', filter=Q(is_correct=True)),
+        wrong=Count('id', filter=Q(is_correct=False)),
+    )
+
+    attempt.answered_count = stats['answered']
+    attempt.correct_answers = stats['correct']
+    attempt.wrong_answers = stats['wrong']
+    attempt.unanswered = attempt.total_questions - stats['answered']
+    attempt.next_question_order = find_next_unanswered_order(attempt)
+
+    UserExamAttempt.objects.filter(pk=attempt.pk).update(
+        answered_count=attempt.answered_count,
+        correct_answers=attempt.correct_answers,
+        wrong_answers=attempt.wrong_answers,
+        unanswered=attempt.unanswered,
+        next_question_order=attempt.next_question_order,
+    )
+    return attempt
+
+
+def ensure_attempt_counters(attempt):
+    """
+    Initialize counters of legacy attempts
+    A missing cursor with questions left means the counters were never maintained
+    """
+    if attempt.next_question_order is None and attempt.answered_count < attempt.total_questions:
+        refresh_attempt_counters(attempt)
+    return attempt
+
+
+def record_answer(attempt, question_id, question_order, selected_option_id, is_correct, time_spent_seconds):
+    """
+    Save one graded answer and apply its effect on the attempt and the user's
+    topic mastery as delta updates
+    Must run inside transaction.atomic() with `attempt` locked by select_for_update(),
+    so the deltas computed here cannot race with another submit for the same attempt
+    Returns the updated progress and the order of the next unanswered question
+    """
+    ensure_attempt_counters(attempt)
+
+    previous = UserAnswer.objects.filter(
+        attempt_id=attempt.pk,
+        question_id=question_id
+    ).values('is_correct').first()
+
+    if previous is None:
+        UserAnswer.objects.create(
+            attempt=attempt,
+            question_id=question_id,
+            selected_option_id=selected_option_id,
+            is_correct=is_correct,
+            time_spent_seconds=time_spent_seconds,
+        )
+        was_correct = False
+        answered_delta = 1
+        correct_delta = int(is_correct)
+        wrong_delta = int(not is_correct)
+    else:
+        # Changing an answer moves it between correct and wrong, never adds one
+        UserAnswer.objects.filter(
+            attempt_id=attempt.pk,
+            question_id=question_id
+        ).update(
+            selected_option_id=selected_option_id,
+            is_correct=is_correct,
+            time_spent_seconds=time_spent_seconds,
+        )
+        was_correct = bool(previous['is_correct'])
+        answered_delta = 0
+        correct_delta = int(is_correct) - int(was_correct)
+        wrong_delta = int(not is_correct) - int(not was_correct)
+
+    # The cursor only moves when its own question gets answered
+    next_order = attempt.next_question_order
+    if answered_delta and next_order == question_order:
+        next_order = find_next_unanswered_order(attempt, after_order=next_order)
+
+    answered = attempt.answered_count + answered_delta
+
+    UserExamAttempt.objects.filter(pk=attempt.pk).update(
+        answered_count=F('answered_count') + answered_delta,
+        correct_answers=F('correct_answers') + correct_delta,
+        wrong_answers=F('wrong_answers') + wrong_delta,
+        unanswered=F('total_questions') - answered,
+        time_spent_seconds=F('time_spent_seconds') + time_spent_seconds,
+        next_question_order=next_order,
+    )
+    record_mastery(attempt.user_id, question_id, is_correct, new=bool(answered_delta), was_correct=was_correct)
+
+    return {
+        'is_correct': is_correct,
+        'answered': answered,
+        'correct': attempt.correct_answers + correct_delta,
+        'wrong': attempt.wrong_answers + wrong_delta,
+        'unanswered': attempt.total_questions - answered,
+        'next_question_order': next_order,
+    }
+
+
+def upsert_answers(answers):
+    """
+    Insert or update many UserAnswer rows in one statement
+    Conflicts are resolved on the (attempt, question) unique key
+    """
+    options = {
+        'update_conflicts': True,
+        'update_fields': ['selected_option', 'is_correct', 'time_spent_seconds'],
+    }
+    # MySQL upserts on any unique key and rejects an explicit conflict target
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['attempt', 'question']
+
+    UserAnswer.objects.bulk_create(answers, **options)
+
+
+def record_answer_batch(attempt, paper, items):
+    """
+    Validate and save a batch of answers for one attempt
+    Items are checked against the attempt's exam paper and graded from the
+    answer-key cache, saved with one upsert and the attempt is recounted once
+    Must run inside transaction.atomic() with `attempt` locked by select_for_update()
+    Returns one result dict per item, in request order
+    """
+    results = []
+    latest = {}
+
+    for index, item in enumerate(items):
+        try:
+            question_id = int(item['question_id'])
+            selected_option_id = int(item['selected_option_id']) if item.get('selected_option_id') else None
+            time_spent_seconds = int(item.get('time_spent_seconds') or 0)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            results.append({'index': index, 'status': 'invalid'})
+            continue
+
+        results.append({'index': index, 'question_id': question_id, 'status': 'pending'})
+        # A later item for the same question replaces the earlier one
+        if question_id in latest:
+            results[latest[question_id][0]]['status'] = 'superseded'
+        latest[question_id] = (index, selected_option_id, time_spent_seconds)
+
+    answer_keys = get_answer_keys([
+        question_id for question_id in latest if question_id in paper['questions']
+    ])
+
+    answers = []
+    time_spent_total = 0
+    for question_id, (index, selected_option_id, time_spent_seconds) in latest.items():
+        result = results[index]
+
+        if question_id not in answer_keys:
+            result['status'] = 'invalid_question'
+            continue
+        if selected_option_id is not None and selected_option_id not in answer_keys[question_id]['options']:
+            result['status'] = 'invalid_option'
+            continue
+
+        is_correct = selected_option_id in answer_keys[question_id]['correct']
+        answers.append(UserAnswer(
+            attempt=attempt,
+            question_id=question_id,
+            selected_option_id=selected_option_id,
+            is_correct=is_correct,
+            time_spent_seconds=time_spent_seconds,
+        ))
+        time_spent_total += time_spent_seconds
+        result.update(status='saved', is_correct=is_correct)
+
+    if answers:
+        previous = dict(UserAnswer.objects.filter(
+            attempt_id=attempt.pk,
+            question_id__in=[answer.question_id for answer in answers]
+        ).values_list('question_id', 'is_correct'))
+        mastery = {}
+        for answer in answers:
+            topic_id = answer_keys[answer.question_id]['topic']
+            mastery.setdefault(topic_id, MasteryDelta()).add(
+                answer.is_correct,
+                new=answer.question_id not in previous,
+                was_correct=bool(previous.get(answer.question_id)),
+            )
+
+        upsert_answers(answers)
+        refresh_attempt_counters(attempt)
+        UserExamAttempt.objects.filter(pk=attempt.pk).update(
+            time_spent_seconds=F('time_spent_seconds') + time_spent_total
+        )
+        apply_mastery(attempt.user_id, mastery)
+
+    return results
@@ -0,0 +1,57 @@
+# medicalpromax_backend/apps/exams/signals.py
+"""
+Signal handlers for exam models
+Keep precompiled exam papers and the cached exam catalog in step with edits
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Exam, ExamQuestion, ExamTypeClassification
+from .papers import publish_paper, retire_paper, touch_exams
+from apps.core.cache import bump_generation, invalidate_resource
+from apps.core.models import Question, QuestionOption
+from apps.core.question_index import invalidate_question_index
+
+
+@receiver(post_save, sender=Exam)
+def exam_saved(sender, instance, **kwargs):
+    """Compile the paper when an exam is published, retire it otherwise"""
+    if instance.is_active and instance.is_published:
+        publish_paper(instance)
+    else:
+        retire_paper(instance.pk)
+    bump_generation('exam-catalog')
+    invalidate_resource('exams')
+
+
+@receiver(post_delete, sender=Exam)
+def exam_deleted(sender, instance, **kwargs):
+    retire_paper(instance.pk)
+    bump_generation('exam-catalog')
+    invalidate_resource('exams')
+
+
+@receiver([post_save, post_delete], sender=ExamQuestion)
+def exam_question_changed(sender, instance, **kwargs):
+    touch_exams([instance.exam_id])
+    # Exam membership feeds the exam_type facet of the question index
+    invalidate_question_index()
+    bump_generation('exam-catalog')
+    invalidate_resource('exams')
+
+
+@receiver([post_save, post_delete], sender=ExamTypeClassification)
+def exam_type_changed(sender, instance, **kwargs):
+    bump_generation('exam-catalog')
+    invalidate_resource('exams')
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    touch_exams(ExamQuestion.objects.filter(question_id=instance.pk).values_list('exam_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=QuestionOption)
+def question_option_changed(sender, instance, **kwargs):
+    touch_exams(ExamQuestion.objects.filter(question_id=instance.question_id).values_list('exam_id', flat=True))
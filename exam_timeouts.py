@@ -0,0 +1,101 @@
+# medicalpromax_backend/apps/exams/timeouts.py
+"""
+Deadline enforcement for exam attempts
+Every timed attempt stores its deadline, so expiry is a plain comparison on
+the attempt row and expired attempts are found through the (status, deadline_at) index
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .grading import grade_attempt, regrade_attempts
+from .models import UserExamAttempt
+from apps.core.cache import invalidate_resource
+
+
+def grace_period():
+    """Slack for answers that were in flight when the deadline passed"""
+    return timedelta(seconds=getattr(settings, 'EXAM_DEADLINE_GRACE_SECONDS', 30))
+
+
+def is_past_deadline(attempt, now=None):
+    if attempt.deadline_at is None:
+        return False
+    return (now or timezone.now()) > attempt.deadline_at + grace_period()
+
+
+def expire_attempt(attempt):
+    """Close one expired attempt as `timeout` and grade the answers it has"""
+    return grade_attempt(attempt, status='timeout', completed_at=attempt.deadline_at)
+
+
+def sweep_expired_attempts(now=None, batch_size=500):
+    """
+    Move expired in-progress attempts to `timeout` and grade them
+    Works in batches, each one status UPDATE plus one set-based regrade
+    Returns the number of attempts that timed out
+    """
+    cutoff = (now or timezone.now()) - grace_period()
+    total = 0
+    
+    while True:
+        ids = list(
+            UserExamAttempt.objects.filter(
+                status='in_progress',
+                deadline_at__lt=cutoff
+            ).order_by('deadline_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        
+        updated = 0
+        with transaction.atomic():
+            # Attempts completed or expired concurrently since the read are left alone
+            expired = dict(
+                UserExamAttempt.objects.select_for_update().filter(
+                    id__in=ids, status='in_progress'
+                ).values_list('id', 'user_id')
+            )
+            if expired:
+                updated = UserExamAttempt.objects.filter(id__in=list(expired), status='in_progress').update(
+                    status='timeout',
+                    completed_at=F('deadline_at'),
+                )
+                regrade_attempts(UserExamAttempt.objects.filter(id__in=list(expired)), resync=False)
+        
+        # Dashboards must not keep showing these attempts as in progress
+        for user_id in set(expired.values()):
+            invalidate_resource('user_progress', user_id=user_id)
+        total += updated
+    
+    return total
+
+
+def backfill_deadlines(batch_size=500):
+    """Set deadline_at on in-progress attempts created before deadlines were stored"""
+    total = 0
+    last_id = 0
+    
+    while True:
+        attempts = list(
+            UserExamAttempt.objects.filter(
+                id__gt=last_id,
+                status='in_progress',
+                deadline_at__isnull=True
+            ).select_related('exam').order_by('id')[:batch_size]
+        )
+        if not attempts:
+            break
+        
+        for attempt in attempts:
+            attempt.deadline_at = UserExamAttempt.compute_deadline(attempt.exam, attempt.started_at)
+        UserExamAttempt.objects.bulk_update(attempts, ['deadline_at'])
+        
+        total += sum(1 for attempt in attempts if attempt.deadline_at is not None)
+        last_id = attempts[-1].id
+    
+    return total
@@ -7,29 +7,61 @@ Exams list, start exam, submit answers, complete exam, results
 from rest_framework import generics, status, viewsets
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Q, Sum
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from datetime import timedelta
 
 from .models import (
-    Exam, ExamQuestion, UserExamAttempt, UserAnswer, UserStudyProgress
+    Exam, ExamQuestion, UserExamAttempt, UserAnswer, UserStudyProgress, UserTopicMastery
 )
 from .serializers import (
     ExamSerializer, ExamDetailSerializer, UserExamAttemptSerializer,
     UserAnswerSerializer, UserExamResultsSerializer
 )
-from apps.core.models import Question
+from .answer_log import ANSWER_LOG_ENABLED, append_answer, drain_attempt, merge_pending
+from .builder import ExamBuildError, build_custom_exam
+from .exports import (
+    ANSWER_COLUMNS, ATTEMPT_COLUMNS, answer_export_chunks, answer_filters, attempt_export_chunks, attempt_filters
+)
+from .grading import GRADED_STATUSES, grade_attempt
+from .item_analysis import get_item_stats
+from .leaderboards import (
+    MAX_TOP, WINDOW_DAYS, exam_board_key, get_board, path_board_key, user_rank
+)
+from .papers import get_current_paper, get_paper, question_payload
+from .percentiles import score_rank
+from .practice import PracticeAnswerError, record_practice_answer
+from .results import (
+    MAX_EXPLANATION_BATCH, MAX_RESULTS_PAGE_SIZE, RESULTS_PAGE_SIZE, attempt_explanations, compact_results
+)
+from .scoring import ensure_attempt_counters, record_answer, record_answer_batch
+from .timeouts import expire_attempt, is_past_deadline
+from apps.core.answer_keys import is_correct_option
+from apps.core.cache import CachedResponseMixin, get_generation
+from apps.core.exports import EXPORT_FORMATS, stream_response
+from apps.core.models import Question, Topic
 
 
-class ExamListView(generics.ListAPIView):
+class ExamListView(CachedResponseMixin, generics.ListAPIView):
     """
     GET /api/exams/?specialty_id=1&exam_level_id=3&subspecialty_id=1
     Returns exams filtered by specialty, exam level, and subspecialty
     Groups by exam type
+    
+    GET /api/exams/?specialty_id=1&mode=catalog
+    Compact catalog with annotated question counts, cached per filter combination
     """
     serializer_class = ExamSerializer
     permission_classes = [AllowAny]
+    cache_resource = 'exams'
+    
+    CATALOG_TIMEOUT = 60 * 60
+    FILTER_PARAMS = ('specialty_id', 'exam_level_id', 'subspecialty_id')
     
     def get_queryset(self):
         specialty_id = self.request.query_params.get('specialty_id')
@@ -45,12 +77,18 @@ class ExamListView(generics.ListAPIView):
         if subspecialty_id:
             queryset = queryset.filter(subspecialty_id=subspecialty_id)
         
+        if self.request.query_params.get('mode') == 'catalog':
+            return queryset
+        
         return queryset.select_related(
             'specialty', 'exam_level', 'subspecialty', 'exam_type_classification'
         ).prefetch_related('exam_questions')
     
     def list(self, request, *args, **kwargs):
         """Override to group by exam type"""
+        if request.query_params.get('mode') == 'catalog':
+            return Response(self.get_catalog())
+        
         queryset = self.filter_queryset(self.get_queryset())
         
         # Group by exam type
@@ -70,6 +108,49 @@ class ExamListView(generics.ListAPIView):
                 for key, exams in exam_types.items()
             ]
         })
+    
+    def get_catalog(self):
+        """
+        Grouped catalog for the requested filters
+        Cached per filter combination until any Exam or ExamQuestion changes
+        """
+        filters = ':'.join(self.request.query_params.get(name) or '' for name in self.FILTER_PARAMS)
+        cache_key = f"exam-catalog:{get_generation('exam-catalog')}:{filters}"
+        
+        catalog = cache.get(cache_key)
+        if catalog is None:
+            catalog = self.build_catalog(self.get_queryset())
+            cache.set(cache_key, catalog, self.CATALOG_TIMEOUT)
+        
+        return catalog
+    
+    def build_catalog(self, queryset):
+        """One grouped query; question counts come from a COUNT annotation"""
+        rows = queryset.annotate(
+            questions_count=Count('exam_questions')
+        ).values(
+            'id', 'title', 'slug', 'exam_year', 'duration_minutes', 'passing_score', 'questions_count',
+            'exam_type_classification__slug', 'exam_type_classification__name_fa',
+        ).order_by('exam_type_classification__display_order', '-created_at')
+        
+        exam_types = {}
+        for row in rows:
+            exam_type = exam_types.setdefault(row['exam_type_classification__slug'], {
+                'type': row['exam_type_classification__slug'],
+                'name_fa': row['exam_type_classification__name_fa'],
+                'exams': [],
+            })
+            exam_type['exams'].append({
+                'id': row['id'],
+                'title': row['title'],
+                'slug': row['slug'],
+                'year': row['exam_year'],
+                'questions_count': row['questions_count'],
+                'duration': row['duration_minutes'],
+                'passing_score': float(row['passing_score']),
+            })
+        
+        return {'exam_types': list(exam_types.values())}
 
 
 class ExamDetailView(generics.RetrieveAPIView):
@@ -84,6 +165,13 @@ class ExamDetailView(generics.RetrieveAPIView):
     
     def get_queryset(self):
         return Exam.objects.filter(is_active=True, is_published=True)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Serve the precompiled paper instead of serializing the exam"""
+        paper = get_current_paper(kwargs.get(self.lookup_url_kwarg))
+        if paper is None:
+            raise Http404
+        return Response(paper['exam'])
 
 
 class ExamStartView(generics.CreateAPIView):
@@ -93,9 +181,15 @@ class ExamStartView(generics.CreateAPIView):
     Response: attempt_id, exam details, first question
     """
     permission_classes = [IsAuthenticated]
+    query_budget = 8
     
     def post(self, request, exam_id):
-        exam = get_object_or_404(Exam, id=exam_id, is_active=True, is_published=True)
+        # Private custom exams can only be started by their owner
+        exam = get_object_or_404(
+            Exam.objects.filter(Q(is_published=True) | Q(created_by=request.user)),
+            id=exam_id,
+            is_active=True
+        )
         
         # Check if user already has in-progress attempt
         existing_attempt = UserExamAttempt.objects.filter(
@@ -104,63 +198,145 @@ class ExamStartView(generics.CreateAPIView):
             status='in_progress'
         ).first()
         
+        # Abandoned attempts past their deadline are closed, not resumed
+        if existing_attempt and is_past_deadline(existing_attempt):
+            # Locked and re-checked so a racing sweep, submit or start does not grade it twice
+            with transaction.atomic():
+                attempt = UserExamAttempt.objects.select_for_update().get(pk=existing_attempt.pk)
+                if attempt.status == 'in_progress':
+                    if ANSWER_LOG_ENABLED:
+                        drain_attempt(attempt)
+                    expire_attempt(attempt)
+            existing_attempt = None
+        
+        paper = get_paper(exam)
+        
         if existing_attempt:
-            attempt = existing_attempt
+            attempt = ensure_attempt_counters(existing_attempt)
+            if ANSWER_LOG_ENABLED:
+                merge_pending(attempt, paper)
         else:
             # Create new attempt
-            exam_questions = ExamQuestion.objects.filter(exam=exam).count()
+            question_ids = paper['question_ids']
             attempt = UserExamAttempt.objects.create(
                 user=request.user,
                 exam=exam,
-                total_questions=exam_questions,
+                deadline_at=UserExamAttempt.compute_deadline(exam, timezone.now()),
+                total_questions=len(question_ids),
+                unanswered=len(question_ids),
+                next_question_order=paper['questions'][question_ids[0]]['order'] if question_ids else None,
                 status='in_progress'
             )
         
-        # Get first unanswered question
-        answered_questions = UserAnswer.objects.filter(attempt=attempt).values_list('question_id', flat=True)
-        first_question = ExamQuestion.objects.filter(
-            exam=exam
-        ).exclude(
-            question_id__in=answered_questions
-        ).first()
+        # Get first unanswered question from the attempt cursor
+        current_question = None
+        if attempt.next_question_order is not None:
+            current_question = question_payload(paper, attempt.next_question_order)
         
-        if not first_question:
-            first_question = ExamQuestion.objects.filter(exam=exam).first()
+        if not current_question and paper['question_ids']:
+            current_question = paper['questions'][paper['question_ids'][0]]
         
         response_data = {
             'attempt_id': attempt.id,
-            'exam': ExamDetailSerializer(exam).data,
-            'current_question': {
-                'id': first_question.question.id,
-                'order': first_question.question_order,
-                'question_text': first_question.question.question_text,
-                'question_html': first_question.question.question_html,
-                'image_url': first_question.question.image_url,
-                'options': [
-                    {
-                        'id': opt.id,
-                        'option_number': opt.option_number,
-                        'option_text': opt.option_text,
-                        'option_html': opt.option_html,
-                    }
-                    for opt in first_question.question.options.all()
-                ]
-            }
+            'exam': paper['exam'],
+            'current_question': current_question,
         }
         
         return Response(response_data, status=status.HTTP_201_CREATED)
 
 
+class ExamBuildCustomView(generics.CreateAPIView):
+    """
+    POST /api/exams/build-custom/
+    Build a combined exam from random questions matching the filters
+    Request: {exam_name, specialty_id, exam_level_id, subspecialty_id,
+              filters: {years, exam_types, courses, chapters, topics, difficulty, stratify, difficulty_mix,
+                        tags, tags_any, tags_not},
+              question_count, duration_minutes, is_public}
+    Response: {id, title, exam_type, questions_selected, duration_minutes, exam_ready, start_link}
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        try:
+            exam = build_custom_exam(request.user, request.data)
+        except ExamBuildError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'id': exam.id,
+            'title': exam.title,
+            'exam_type': exam.exam_type_classification.slug,
+            'questions_selected': exam.total_questions,
+            'duration_minutes': exam.duration_minutes,
+            'exam_ready': True,
+            'start_link': f'/api/exams/{exam.id}/start/',
+        }, status=status.HTTP_201_CREATED)
+
+
 class ExamAnswerSubmitView(generics.CreateAPIView):
     """
     POST /api/exam-attempts/{attempt_id}/submit-answer/
     Submit user answer to a question
     Request: {question_id, selected_option_id, time_spent_seconds}
     Response: {submitted: true, next_question: {...}}
+    With EXAM_ANSWER_LOG_ENABLED the answer is acknowledged once it is in the answer log
+    and written to the database by the apply_answer_log worker
     """
     permission_classes = [IsAuthenticated]
+    query_budget = 10
     
     def post(self, request, attempt_id):
+        question_id = request.data.get('question_id')
+        selected_option_id = request.data.get('selected_option_id')
+        try:
+            time_spent_seconds = int(request.data.get('time_spent_seconds') or 0)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'time_spent_seconds must be a number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if ANSWER_LOG_ENABLED:
+            return self.post_to_log(request, attempt_id, question_id, selected_option_id, time_spent_seconds)
+        
+        with transaction.atomic():
+            # Lock the attempt so concurrent submits apply their deltas one by one
+            attempt = get_object_or_404(
+                UserExamAttempt.objects.select_for_update(),
+                id=attempt_id,
+                user=request.user
+            )
+            
+            if attempt.status != 'in_progress':
+                return Response(
+                    {'error': 'Exam attempt is not in progress'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Late answers are rejected by comparing against the stored deadline
+            if is_past_deadline(attempt):
+                expire_attempt(attempt)
+                return Response(
+                    {'error': 'Exam time is over'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            paper, question, selected_option_id, is_correct, error = self.grade_submission(
+                attempt, question_id, selected_option_id
+            )
+            if error:
+                return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+            
+            progress = record_answer(
+                attempt, question['id'], question['order'],
+                selected_option_id, is_correct, time_spent_seconds
+            )
+        
+        return Response(self.submit_response(paper, progress))
+    
+    def post_to_log(self, request, attempt_id, question_id, selected_option_id, time_spent_seconds):
+        """Validate, append to the answer log and acknowledge without writing to the database"""
         attempt = get_object_or_404(UserExamAttempt, id=attempt_id, user=request.user)
         
         if attempt.status != 'in_progress':
@@ -169,121 +345,210 @@ class ExamAnswerSubmitView(generics.CreateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        question_id = request.data.get('question_id')
-        selected_option_id = request.data.get('selected_option_id')
-        time_spent_seconds = request.data.get('time_spent_seconds', 0)
-        
-        question = get_object_or_404(Question, id=question_id)
-        
-        # Check if option is correct
-        is_correct = False
-        selected_option = None
-        
-        if selected_option_id:
-            selected_option = question.options.filter(id=selected_option_id).first()
-            if selected_option:
-                is_correct = selected_option.is_correct
-        
-        # Save answer
-        user_answer, created = UserAnswer.objects.update_or_create(
-            attempt=attempt,
-            question=question,
-            defaults={
-                'selected_option': selected_option,
-                'is_correct': is_correct,
-                'time_spent_seconds': time_spent_seconds,
-            }
-        )
-        
-        # Update attempt stats
-        attempt.time_spent_seconds += time_spent_seconds
-        
-        answered_count = UserAnswer.objects.filter(attempt=attempt).count()
-        correct_count = UserAnswer.objects.filter(attempt=attempt, is_correct=True).count()
-        wrong_count = UserAnswer.objects.filter(attempt=attempt, is_correct=False).count()
+        if is_past_deadline(attempt):
+            with transaction.atomic():
+                attempt = UserExamAttempt.objects.select_for_update().get(pk=attempt.pk)
+                if attempt.status == 'in_progress':
+                    drain_attempt(attempt)
+                    expire_attempt(attempt)
+            return Response(
+                {'error': 'Exam time is over'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        attempt.correct_answers = correct_count
-        attempt.wrong_answers = wrong_count
-        attempt.unanswered = attempt.total_questions - answered_count
+        paper, question, selected_option_id, is_correct, error = self.grade_submission(
+            attempt, question_id, selected_option_id
+        )
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get next unanswered question
-        answered_questions = UserAnswer.objects.filter(attempt=attempt).values_list('question_id', flat=True)
-        next_exam_question = ExamQuestion.objects.filter(
-            exam=attempt.exam
-        ).exclude(
-            question_id__in=answered_questions
-        ).first()
+        append_answer(attempt.pk, question['id'], selected_option_id, is_correct, time_spent_seconds)
+        merge_pending(attempt, paper)
         
+        return Response(self.submit_response(paper, {
+            'is_correct': is_correct,
+            'answered': attempt.answered_count,
+            'correct': attempt.correct_answers,
+            'wrong': attempt.wrong_answers,
+            'unanswered': attempt.unanswered,
+            'next_question_order': attempt.next_question_order,
+        }))
+    
+    @staticmethod
+    def grade_submission(attempt, question_id, selected_option_id):
+        """
+        Check the answer against the exam paper and grade it from the answer-key cache
+        Returns (paper, question, selected_option_id, is_correct, error)
+        """
+        paper = get_current_paper(attempt.exam_id, published_only=False)
+        try:
+            question_id = int(question_id) if question_id else None
+            selected_option_id = int(selected_option_id) if selected_option_id else None
+        except (TypeError, ValueError):
+            return paper, None, None, None, 'question_id and selected_option_id must be numbers'
+        
+        question = paper['questions'].get(question_id) if paper and question_id else None
+        if question is None:
+            return paper, None, None, None, 'Question is not part of this exam'
+        
+        if not selected_option_id:
+            return paper, question, None, False, None
+        
+        is_correct = is_correct_option(question['id'], selected_option_id)
+        if is_correct is None:
+            return paper, question, None, None, 'Option does not belong to this question'
+        return paper, question, selected_option_id, is_correct, None
+    
+    @staticmethod
+    def submit_response(paper, progress):
         response_data = {
             'submitted': True,
-            'is_correct': is_correct,
+            'is_correct': progress['is_correct'],
             'progress': {
-                'answered': answered_count,
-                'correct': correct_count,
-                'wrong': wrong_count,
-                'unanswered': attempt.unanswered,
+                'answered': progress['answered'],
+                'correct': progress['correct'],
+                'wrong': progress['wrong'],
+                'unanswered': progress['unanswered'],
             }
         }
         
-        if next_exam_question:
-            response_data['next_question'] = {
-                'id': next_exam_question.question.id,
-                'order': next_exam_question.question_order,
-                'question_text': next_exam_question.question.question_text,
-                'options': [
-                    {
-                        'id': opt.id,
-                        'option_number': opt.option_number,
-                        'option_text': opt.option_text,
-                    }
-                    for opt in next_exam_question.question.options.all()
-                ]
-            }
-        
-        attempt.save()
+        if progress['next_question_order'] is not None:
+            next_question = question_payload(paper, progress['next_question_order'], fields=['question_text'])
+            if next_question:
+                response_data['next_question'] = next_question
         
-        return Response(response_data)
+        return response_data
 
 
-class ExamCompleteView(generics.CreateAPIView):
+class ExamAnswerBatchSubmitView(generics.CreateAPIView):
     """
-    POST /api/exam-attempts/{attempt_id}/complete/
-    Mark exam as completed and calculate final score
+    POST /api/exam-attempts/{attempt_id}/submit-answers/
+    Submit a queued batch of answers in one request
+    Request: {idempotency_key, answers: [{question_id, selected_option_id, time_spent_seconds}]}
+    Response: {idempotency_key, results: [{index, question_id, status, is_correct}], progress: {...}}
+    Replaying a batch with the same idempotency key returns the stored response;
+    batches sent without a key are applied every time
     """
     permission_classes = [IsAuthenticated]
     
+    MAX_ANSWERS = 500
+    IDEMPOTENCY_TIMEOUT = 60 * 60 * 24
+    
     def post(self, request, attempt_id):
-        attempt = get_object_or_404(UserExamAttempt, id=attempt_id, user=request.user)
+        answers = request.data.get('answers')
         
-        if attempt.status != 'in_progress':
+        if not isinstance(answers, list) or not answers:
             return Response(
-                {'error': 'Exam attempt is not in progress'},
+                {'error': 'answers must be a non-empty list'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if len(answers) > self.MAX_ANSWERS:
+            return Response(
+                {'error': f'At most {self.MAX_ANSWERS} answers per batch'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # A payload hash would turn a legitimate repeat (A, then B, then A again) into a replay
+        idempotency_key = request.data.get('idempotency_key') or request.headers.get('Idempotency-Key')
+        cache_key = f'exam-answer-batch:{attempt_id}:{idempotency_key}' if idempotency_key else None
         
-        # Calculate final score
-        correct_answers = UserAnswer.objects.filter(attempt=attempt, is_correct=True).count()
-        total_questions = attempt.total_questions
+        with transaction.atomic():
+            attempt = get_object_or_404(
+                UserExamAttempt.objects.select_for_update(),
+                id=attempt_id,
+                user=request.user
+            )
+            
+            replayed = cache.get(cache_key) if cache_key else None
+            if replayed is not None:
+                return Response({**replayed, 'replayed': True})
+            
+            if attempt.status != 'in_progress':
+                return Response(
+                    {'error': 'Exam attempt is not in progress'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Late answers are rejected by comparing against the stored deadline
+            if is_past_deadline(attempt):
+                expire_attempt(attempt)
+                return Response(
+                    {'error': 'Exam time is over'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Logged single answers come first, so the batch is applied on top of them
+            if ANSWER_LOG_ENABLED:
+                drain_attempt(attempt)
+            paper = get_current_paper(attempt.exam_id, published_only=False)
+            results = record_answer_batch(attempt, paper, answers)
         
-        score = (correct_answers / total_questions * 100) if total_questions > 0 else 0
+        response_data = {
+            'idempotency_key': idempotency_key,
+            'results': results,
+            'progress': {
+                'answered': attempt.answered_count,
+                'correct': attempt.correct_answers,
+                'wrong': attempt.wrong_answers,
+                'unanswered': attempt.unanswered,
+            },
+            'replayed': False,
+        }
+        if cache_key:
+            cache.set(cache_key, response_data, self.IDEMPOTENCY_TIMEOUT)
         
-        # Update attempt
-        attempt.status = 'completed'
-        attempt.completed_at = timezone.now()
-        attempt.correct_answers = correct_answers
-        attempt.percentage = score
-        attempt.score = score
-        attempt.save()
+        return Response(response_data)
+
+
+class ExamCompleteView(generics.CreateAPIView):
+    """
+    POST /api/exam-attempts/{attempt_id}/complete/
+    Mark exam as completed and calculate final score
+    ranking: {rank, examinees, percentile} among the exam's graded attempts
+    """
+    permission_classes = [IsAuthenticated]
+    # Includes the score-distribution insert/update, the rank read and the leaderboard insert
+    query_budget = 12
+    
+    def post(self, request, attempt_id):
+        with transaction.atomic():
+            attempt = get_object_or_404(
+                UserExamAttempt.objects.select_for_update(),
+                id=attempt_id,
+                user=request.user
+            )
+            
+            if attempt.status != 'in_progress':
+                return Response(
+                    {'error': 'Exam attempt is not in progress'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            if ANSWER_LOG_ENABLED:
+                drain_attempt(attempt)
+            
+            # Grade and close the attempt in one write; after the deadline it closes as a timeout
+            if is_past_deadline(attempt):
+                grade = expire_attempt(attempt)
+            else:
+                grade = grade_attempt(attempt, status='completed', completed_at=timezone.now())
+        
+        score = float(grade['score'])
+        passing_score = float(attempt.exam.passing_score)
         
         response_data = {
             'attempt': UserExamAttemptSerializer(attempt).data,
             'summary': {
-                'total_questions': total_questions,
-                'correct_answers': correct_answers,
+                'total_questions': grade['total_questions'],
+                'correct_answers': grade['correct_answers'],
+                'wrong_answers': grade['wrong_answers'],
+                'unanswered': grade['unanswered'],
                 'score': score,
-                'passing_score': float(attempt.exam.passing_score),
-                'passed': score >= float(attempt.exam.passing_score),
-            }
+                'passing_score': passing_score,
+                'passed': score >= passing_score,
+                'by_difficulty': grade['score_breakdown'],
+            },
+            'ranking': score_rank(attempt.exam_id, grade['score']),
         }
         
         return Response(response_data)
@@ -292,7 +557,15 @@ class ExamCompleteView(generics.CreateAPIView):
 class ExamResultsView(generics.RetrieveAPIView):
     """
     GET /api/exam-attempts/{attempt_id}/results/
-    Returns detailed results of a completed exam
+    Returns detailed results of a completed or timed-out exam
+    item_stats maps question ids to their item analysis (difficulty, discrimination, option rates)
+    ranking: {rank, examinees, percentile} among the exam's graded attempts
+    
+    GET /api/exam-attempts/{attempt_id}/results/?mode=compact&cursor=50&limit=50&include=questions
+    Returns the attempt summary and one page of per-question correctness
+    Response: {attempt: {...}, ranking, questions: [{order, question_id, answered, selected_option_id,
+               is_correct, correct_option_ids, item_stats, question?}], next_cursor}
+    Explanations are fetched separately, in batches, from the explanations endpoint
     """
     permission_classes = [IsAuthenticated]
     serializer_class = UserExamResultsSerializer
@@ -300,4 +573,272 @@ class ExamResultsView(generics.RetrieveAPIView):
     lookup_url_kwarg = 'attempt_id'
     
     def get_queryset(self):
-        return UserExamAttempt.objects.filter(user=self.request.user, status='completed')
\ No newline at end of file
+        return UserExamAttempt.objects.filter(user=self.request.user, status__in=GRADED_STATUSES)
+    
+    def retrieve(self, request, *args, **kwargs):
+        if request.query_params.get('mode') != 'compact':
+            attempt = self.get_object()
+            data = self.get_serializer(attempt).data
+            data['item_stats'] = get_item_stats(attempt.exam_id)
+            data['ranking'] = score_rank(attempt.exam_id, attempt.score)
+            return Response(data)
+        
+        try:
+            cursor = request.query_params.get('cursor')
+            cursor = int(cursor) if cursor else None
+            limit = min(max(int(request.query_params.get('limit', RESULTS_PAGE_SIZE)), 1), MAX_RESULTS_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'cursor and limit must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        results = compact_results(
+            self.get_object(),
+            cursor=cursor,
+            limit=limit,
+            include_questions=request.query_params.get('include') == 'questions',
+        )
+        if results is None:
+            raise Http404
+        return Response(results)
+
+
+class ExamResultsExplanationsView(generics.GenericAPIView):
+    """
+    GET /api/exam-attempts/{attempt_id}/explanations/?question_ids=12,15,19
+    Returns explanations for up to 50 questions of a finished attempt
+    Response: {explanations: {question_id: {explanation_text, explanation_html, ...}}}
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, attempt_id):
+        attempt = get_object_or_404(
+            UserExamAttempt.objects.only('id', 'exam_id'),
+            id=attempt_id,
+            user=request.user,
+            status__in=GRADED_STATUSES
+        )
+        
+        try:
+            question_ids = [int(value) for value in request.query_params.get('question_ids', '').split(',') if value]
+        except ValueError:
+            return Response({'error': 'question_ids must be a list of numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        if not question_ids or len(question_ids) > MAX_EXPLANATION_BATCH:
+            return Response(
+                {'error': f'Provide between 1 and {MAX_EXPLANATION_BATCH} question_ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({'explanations': attempt_explanations(attempt, question_ids)})
+
+
+class UserProgressView(CachedResponseMixin, generics.RetrieveAPIView):
+    """
+    GET /api/users/me/progress/
+    Dashboard summary: exam stats, study stats, weak and strong topics
+    Topic accuracy comes from the maintained UserTopicMastery rows
+    """
+    permission_classes = [IsAuthenticated]
+    cache_resource = 'user_progress'
+    cache_vary_on_user = True
+    
+    # Topics need this many answers before they are ranked as weak or strong
+    MIN_TOPIC_ATTEMPTS = 5
+    TOPICS_SHOWN = 5
+    
+    def retrieve(self, request, *args, **kwargs):
+        user = request.user
+        
+        exam_stats = UserExamAttempt.objects.filter(user=user, status__in=GRADED_STATUSES).aggregate(
+            exams_taken=Count('id'),
+            average_score=Avg('percentage'),
+            answered=Sum('answered_count'),
+            correct=Sum('correct_answers'),
+            exam_seconds=Sum('time_spent_seconds'),
+        )
+        study_stats = UserStudyProgress.objects.filter(user=user).aggregate(
+            courses_accessed=Count('topic__chapter__course', distinct=True),
+            topics_studied=Count('id', filter=~Q(status='not_started')),
+            topics_completed=Count('id', filter=Q(status='completed')),
+            study_minutes=Sum('study_time_minutes'),
+        )
+        topics_total = Topic.objects.filter(
+            is_active=True,
+            chapter__course__in=UserStudyProgress.objects.filter(user=user).values('topic__chapter__course')
+        ).count()
+        
+        mastery = list(UserTopicMastery.objects.filter(
+            user=user, attempts__gte=self.MIN_TOPIC_ATTEMPTS
+        ).values('topic_id', 'topic__name_fa', 'attempts', 'correct_answers', 'rolling_accuracy'))
+        mastery.sort(key=lambda row: row['rolling_accuracy'])
+        weak = mastery[:self.TOPICS_SHOWN]
+        strong = mastery[len(weak):][-self.TOPICS_SHOWN:][::-1]
+        
+        answered = exam_stats['answered'] or 0
+        study_hours = ((exam_stats['exam_seconds'] or 0) / 3600) + ((study_stats['study_minutes'] or 0) / 60)
+        
+        return Response({
+            'user': {
+                'id': user.id,
+                'first_name': user.first_name,
+                'email': user.email,
+                'primary_path': {
+                    'specialty': getattr(user.primary_specialty, 'name_fa', None),
+                    'exam_level': getattr(user.primary_exam_level, 'name_fa', None),
+                    'subspecialty': getattr(user.primary_subspecialty, 'name_fa', None),
+                },
+            },
+            'exam_stats': {
+                'exams_taken': exam_stats['exams_taken'],
+                'average_score': round(float(exam_stats['average_score'] or 0), 2),
+                'total_questions_answered': answered,
+                'accuracy': round((exam_stats['correct'] or 0) * 100 / answered, 2) if answered else 0,
+                'total_study_hours': round(study_hours, 1),
+            },
+            'study_stats': {
+                'courses_accessed': study_stats['courses_accessed'],
+                'topics_studied': study_stats['topics_studied'],
+                'topics_completed': study_stats['topics_completed'],
+                'topics_total': topics_total,
+                'completion_percentage': round(study_stats['topics_completed'] * 100 / topics_total) if topics_total else 0,
+            },
+            'weak_topics': [self._topic(row) for row in weak],
+            'strong_topics': [self._topic(row) for row in strong],
+        })
+    
+    @staticmethod
+    def _topic(row):
+        return {
+            'topic_id': row['topic_id'],
+            'topic': row['topic__name_fa'],
+            'accuracy': round(row['rolling_accuracy']),
+            'attempts': row['attempts'],
+            'correct': row['correct_answers'],
+        }
+
+
+class TopicQuestionAnswerView(generics.CreateAPIView):
+    """
+    POST /api/users/me/topic-questions/{question_id}/answer/
+    Record a topic-practice answer
+    Request: {topic_id, selected_option_id}
+    Response: {answered, is_correct, correct_option_id, attempt_number, explanation,
+               user_accuracy_on_topic: {attempts, correct, percentage}}
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 10
+    
+    def post(self, request, question_id):
+        try:
+            selected_option_id = int(request.data.get('selected_option_id'))
+            topic_id = int(request.data['topic_id']) if request.data.get('topic_id') else None
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'selected_option_id and topic_id must be numbers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            result = record_practice_answer(request.user, int(question_id), selected_option_id, topic_id=topic_id)
+        except PracticeAnswerError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(result)
+
+
+class _ExportView(generics.GenericAPIView):
+    """Shared GET handler of the attempt and answer exports"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        fmt = request.query_params.get('output', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return Response({'error': f"output must be one of {', '.join(EXPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            filters = self.parse_filters(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return stream_response(self.export_chunks(filters), fmt, self.columns, self.filename)
+
+
+class ExamAttemptExportView(_ExportView):
+    """
+    GET /api/exam-attempts/export/?output=csv&exam=12&status=completed&date_from=2024-01-01
+    Stream exam attempts as NDJSON (default) or CSV
+    Filters: exam, user, specialty, exam_level, subspecialty (ids), status, date range on started_at
+    """
+    columns = ATTEMPT_COLUMNS
+    filename = 'exam_attempts'
+    parse_filters = staticmethod(attempt_filters)
+    export_chunks = staticmethod(attempt_export_chunks)
+
+
+class UserAnswerExportView(_ExportView):
+    """
+    GET /api/exam-attempts/answers/export/?output=csv&exam=12&topic=40&date_to=2024-06-30
+    Stream exam answers as NDJSON (default) or CSV
+    Filters: exam, attempt, user, specialty, exam_level, subspecialty, course, chapter, topic (ids),
+    date range on answered_at
+    """
+    columns = ANSWER_COLUMNS
+    filename = 'user_answers'
+    parse_filters = staticmethod(answer_filters)
+    export_chunks = staticmethod(answer_export_chunks)
+
+
+class _LeaderboardView(generics.GenericAPIView):
+    """Shared GET handler: top entries plus the requesting user's rank"""
+    permission_classes = [AllowAny]
+    
+    def board_response(self, request, key, **extra):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), MAX_TOP)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({'error': 'limit and offset must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        board = get_board(key)
+        if offset + limit > len(board) and not board.complete:
+            return Response(
+                {'error': f'Only the top {len(board)} entries are listed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({
+            'board': key,
+            **extra,
+            'entries': board.top(limit, offset),
+            'me': user_rank(key, request.user.id) if request.user.is_authenticated else None,
+        })
+
+
+class ExamLeaderboardView(_LeaderboardView):
+    """
+    GET /api/exams/{exam_id}/leaderboard/?limit=20&offset=0
+    Top scorers of an exam: each user's first finished attempt, ties broken by less time spent
+    Response: {board, entries: [{rank, user_id, name, score, time_spent_seconds, completed_at}], me}
+    """
+    
+    def get(self, request, exam_id):
+        return self.board_response(request, exam_board_key(exam_id))
+
+
+class PathLeaderboardView(_LeaderboardView):
+    """
+    GET /api/leaderboards/?specialty=1&exam_level=2&subspecialty=5&limit=20
+    Top first-attempt scores over the exams of a specialty / exam level / subspecialty
+    finished in the rolling window
+    Response: {board, window_days, entries: [{rank, user_id, name, exam_id, score, ...}], me}
+    """
+    
+    def get(self, request):
+        try:
+            specialty_id = int(request.query_params['specialty'])
+            exam_level_id = int(request.query_params['exam_level'])
+            subspecialty_id = int(request.query_params['subspecialty']) if request.query_params.get('subspecialty') else None
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'specialty and exam_level are required; specialty, exam_level and subspecialty must be numbers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        key = path_board_key(specialty_id, exam_level_id, subspecialty_id)
+        return self.board_response(request, key, window_days=WINDOW_DAYS)